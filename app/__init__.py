@@ -1,20 +1,16 @@
 # 文件路径：app/__init__.py
-# 更新日期：2026-02-17
+# 更新日期：2026-10-19
 # 功能说明：Flask 应用工厂函数，负责全局配置加载、扩展初始化、蓝图统一注册、日志设置、安全检查、Jinja 过滤器定义、未授权处理等，是整个应用的启动入口与核心配置中心
 
 import os
-import logging
-from logging.handlers import RotatingFileHandler
 from flask import Flask, redirect, url_for, request, flash, jsonify, render_template
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 from datetime import datetime
 
 # 全局扩展实例（只在此文件定义一次，避免重复初始化）
 db = SQLAlchemy()
-migrate = Migrate()
 login_manager = LoginManager()
 csrf = CSRFProtect()
 
@@ -78,14 +74,22 @@ def create_app(config_name='default'):
 
     # ── 3. 初始化 Flask 扩展 ──
     db.init_app(app)
-    migrate.init_app(app, db)
+    # 数据库迁移（flask db ...）只在命令行使用，按需导入 alembic，Web worker 启动不承担这部分开销
+    from app.utils.optional_deps import init_lazy_migrate
+    init_lazy_migrate(app, db)
     login_manager.init_app(app)
     csrf.init_app(app)
+    # 部署在反向代理之后时按可信代理层数还原客户端地址 / 协议（登录限流按 IP 计数、日志记录的来源地址依赖于此）；
+    # 未配置时不信任 X-Forwarded-*，避免客户端伪造来源地址
+    trusted_proxies = int(app.config.get('TRUSTED_PROXY_COUNT') or 0)
+    if trusted_proxies > 0:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies, x_proto=trusted_proxies)
 
     # ── 4. 自定义 Jinja2 过滤器（用于模板中的防缓存与时间格式化） ──
     @app.template_filter('timestamp')
     def timestamp_filter(dummy=None):
-        """返回当前时间戳（精确到秒），常用于静态资源版本号防缓存"""
+        """返回当前时间戳（精确到秒）；静态资源版本号请使用 static_url()（内容哈希），勿用本过滤器"""
         return datetime.now().strftime('%Y%m%d%H%M%S')
 
     @app.template_filter('now_format')
@@ -93,24 +97,10 @@ def create_app(config_name='default'):
         """灵活格式化当前时间，支持自定义格式字符串"""
         return datetime.now().strftime(format_str)
 
-    # ── 5. 日志配置（生产/非调试模式下写入旋转文件） ──
+    # ── 5. 日志配置（生产/非调试模式下经队列由后台线程写入多进程安全的旋转文件） ──
     if not app.debug and not app.testing:
-        log_dir = 'logs'
-        os.makedirs(log_dir, exist_ok=True)
-
-        file_handler = RotatingFileHandler(
-            os.path.join(log_dir, 'ffe.log'),
-            maxBytes=10 * 1024 * 1024,   # 10MB
-            backupCount=5,
-            encoding='utf-8'
-        )
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s %(levelname)s [%(name)s:%(lineno)d] %(message)s'
-        ))
-        file_handler.setLevel(logging.INFO)
-
-        app.logger.addHandler(file_handler)
-        app.logger.setLevel(logging.INFO)
+        from app.utils.log_queue import init_logging
+        init_logging(app)
         app.logger.info('FFE 项目跟进系统 - 应用启动成功')
 
     # ── 6. 未授权访问统一处理（支持 AJAX/JSON 与普通页面） ──
@@ -126,21 +116,88 @@ def create_app(config_name='default'):
 
         return redirect(url_for('auth.login', next=request.full_path))
 
-    # ── 7. 用户加载器（从数据库加载当前登录用户） ──
+    # ── 7. 用户加载器（先比对会话纪元，已吊销的会话不查库直接视为未登录） ──
     from app.models import User
+    from app.utils.session_epoch import init_session_epochs, parse_user_token
+    init_session_epochs(app)
+    # 权限位编译缓存（@require / has_perm，角色或授权变更经变更戳失效）
+    from app.utils.permissions import init_permissions
+    init_permissions(app)
 
     @login_manager.user_loader
-    def load_user(user_id):
-        try:
-            return User.query.get(int(user_id))
-        except (ValueError, TypeError):
-            app.logger.warning(f"无效 user_id 尝试加载: {user_id}")
+    def load_user(token):
+        user_id, epoch = parse_user_token(token)
+        if user_id is None:
+            app.logger.warning(f"无效 user_id 尝试加载: {token}")
             return None
+        if not app.extensions['session_epochs'].is_valid(user_id, epoch):
+            return None
+        return db.session.get(User, user_id)
 
     # ── 8. 统一注册所有蓝图（通过 routes/__init__.py 集中管理） ──
     from app.routes import register_blueprints
     register_blueprints(app)
 
+    # ── 9. 请求性能指标（端点耗时直方图 + Server-Timing；须先于其他 after_request 钩子注册） ──
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+
+    # ── 10. 导出 / 计算器响应 gzip 压缩（按 Accept-Encoding 协商） ──
+    from app.utils.compression import init_compression
+    init_compression(app)
+
+    # ── 11. 静态资源内容哈希清单（static_url 模板函数 + 长缓存头） ──
+    from app.utils.assets import init_assets
+    init_assets(app)
+
+    # ── 12. 按主题预编译 CSS 合并包（单请求加载整套样式） ──
+    from app.utils.css_bundle import init_css_bundles
+    init_css_bundles(app)
+
+    # ── 13. Jinja 字节码缓存 + 模板预编译（生产环境关闭自动重载） ──
+    from app.utils.template_cache import init_template_cache
+    init_template_cache(app)
+
+    # ── 14. 页面片段缓存（仪表盘统计面板等，按数据版本失效） ──
+    from app.utils.fragment_cache import init_fragment_cache
+    init_fragment_cache(app)
+
+    # ── 15. Prometheus 文本格式 /metrics（多 worker 进程文件合并） ──
+    from app.utils.prometheus import init_prometheus
+    init_prometheus(app)
+
+    # ── 16. 按需请求采样分析（后台开关，多 worker 共享名额） ──
+    from app.utils.profiler import init_profiler
+    init_profiler(app)
+
+    # ── 17. 请求链路追踪（关联ID + 服务层 / 数据库区段采样记录） ──
+    from app.utils.tracing import init_tracing
+    init_tracing(app)
+
+    # ── 18. 登录限流（令牌桶，超限的登录提交在查库 / 密码哈希之前返回 429） ──
+    from app.utils.rate_limit import init_rate_limit
+    init_rate_limit(app)
+
+    # ── 19. 慢查询日志（阈值 / 采样比例取自系统设置快照） ──
+    from app.utils.slow_query import init_slow_query_log
+    init_slow_query_log(app)
+
+    # ── 20. 会话空闲超时（系统设置 session_timeout_minutes，最近活动时间节流写库） ──
+    from app.utils.session_activity import init_session_activity
+    init_session_activity(app)
+
+    # ── 21. 存活 / 就绪探针（/healthz、/readyz，不读写会话） ──
+    from app.utils.health import init_health
+    init_health(app)
+
+    # ── 22. 站内通知唤醒中心（角标长轮询在本进程挂起，跨 worker 写入经变更戳发现） ──
+    from app.utils.notification_hub import init_notifications
+    init_notifications(app)
+
+    # ── 23. 预热（接收流量前执行各模块登记的步骤：连接池、设置快照、模板、静态资源、KD 规则表，逐项计时） ──
+    from app.utils.warmup import init_warmup
+    init_warmup(app)
+
     # ── 可选：开发环境自动初始化默认数据（管理员账号、默认设置等） ──
     # if not is_production:
     #     with app.app_context():
@@ -1,12 +1,14 @@
 # 文件路径：app/forms/admin_forms.py
-# 更新日期：2026-02-17
-# 功能说明：后台管理相关 WTForms 表单定义，包括用户搜索表单、用户新建/编辑表单、系统设置批量编辑表单；所有表单均严格校验唯一性、密码强度、权限保护等规则
+# 更新日期：2026-10-19
+# 功能说明：后台管理相关 WTForms 表单定义，包括用户搜索表单、用户新建/编辑表单、用户批量导入表单、系统设置批量编辑表单、请求采样分析开关表单、角色编辑表单（可选继承角色）、部门编辑表单、站内通知群发表单；所有表单均严格校验唯一性、密码强度、权限保护等规则
 
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, BooleanField, SubmitField, IntegerField
-from wtforms.validators import DataRequired, Length, Email, Optional, ValidationError, NumberRange
+from flask_wtf.file import FileField, FileRequired, FileAllowed
+from wtforms import StringField, TextAreaField, PasswordField, BooleanField, SubmitField, IntegerField, FloatField, SelectField, SelectMultipleField
+from wtforms.validators import DataRequired, InputRequired, Length, Email, Optional, ValidationError, NumberRange
 from flask_login import current_user
 from app.models import User
+from app.utils.permissions import permission_choices
 
 
 class UserSearchForm(FlaskForm):
@@ -39,9 +41,13 @@ class UserSearchForm(FlaskForm):
 class UserForm(FlaskForm):
     """用户新建/编辑表单（用于 /admin/system-user/edit 和 /create）"""
 
-    def __init__(self, *args, is_edit=False, original_username=None, original_email=None, **kwargs):
+    def __init__(self, *args, is_edit=False, original_username=None, original_email=None, role_choices=None,
+                 department_choices=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.is_edit = is_edit
+        self.roles.choices = role_choices or []
+        self.department_id.choices = [(0, '（未分配）')] + (department_choices or [])
+        self.grants.choices = permission_choices()
         self.original_username = (original_username or '').strip()
         self.original_email = (original_email or '').strip()
 
@@ -121,6 +127,17 @@ class UserForm(FlaskForm):
         }
     )
 
+    # 角色与单独授权（仅拥有角色权限管理权限的操作人可见 / 生效）
+    roles = SelectMultipleField('所属角色', coerce=int, validators=[Optional()])
+    grants = SelectMultipleField('单独授予的权限', validators=[Optional()])
+    department_id = SelectField(
+        '所属部门',
+        coerce=int,
+        default=0,
+        validators=[Optional()],
+        render_kw={'class': 'form-select'}
+    )
+
     submit = SubmitField(
         '保存用户信息',
         render_kw={
@@ -178,6 +195,70 @@ class UserForm(FlaskForm):
             raise ValidationError('请填写确认密码')
 
 
+class UserImportForm(FlaskForm):
+    """用户批量导入表单（用于 /admin/system-users/import，上传 CSV / XLSX）"""
+    file = FileField(
+        '导入文件（CSV / XLSX）',
+        validators=[
+            FileRequired(message='请选择要导入的文件'),
+            FileAllowed(['csv', 'xlsx'], message='仅支持 CSV 或 XLSX 文件')
+        ],
+        render_kw={
+            'class': 'form-control form-control-lg',
+            'accept': '.csv,.xlsx'
+        }
+    )
+
+    submit = SubmitField(
+        '开始导入',
+        render_kw={
+            'class': 'btn btn-primary btn-lg px-5 fw-semibold'
+        }
+    )
+
+
+class ProfilerForm(FlaskForm):
+    """请求采样分析开关表单（用于 /admin/profiler），端点 / 用户留空表示不限定"""
+    max_requests = IntegerField(
+        '分析请求数',
+        default=10,
+        validators=[DataRequired(), NumberRange(min=1, max=1000)],
+        render_kw={'class': 'form-control'}
+    )
+
+    endpoint = StringField(
+        '限定端点',
+        validators=[Optional(), Length(max=128)],
+        render_kw={
+            'class': 'form-control',
+            'placeholder': '例如 main.dashboard，留空不限'
+        }
+    )
+
+    username = StringField(
+        '限定用户',
+        validators=[Optional(), Length(max=64)],
+        render_kw={
+            'class': 'form-control',
+            'placeholder': '用户名，留空不限'
+        }
+    )
+
+    duration_minutes = IntegerField(
+        '有效期 (分钟)',
+        default=30,
+        validators=[DataRequired(), NumberRange(min=1, max=240)],
+        render_kw={'class': 'form-control'}
+    )
+
+    submit = SubmitField(
+        '开启分析',
+        render_kw={
+            'class': 'btn btn-primary px-4 fw-semibold'
+        }
+    )
+
+
 class SystemSettingsForm(FlaskForm):
     """
     系统设置表单 - 用于 /admin/system-settings 页面
@@ -218,6 +299,24 @@ class SystemSettingsForm(FlaskForm):
         }
     )
 
+    slow_query_threshold_ms = IntegerField(
+        '慢查询阈值 (毫秒)',
+        validators=[DataRequired(), NumberRange(min=1, max=60000)],
+        render_kw={
+            'class': 'form-control form-control-lg',
+            'placeholder': '超过该耗时的 SQL 记入慢查询日志，建议 100-500'
+        }
+    )
+
+    slow_query_sample_rate = FloatField(
+        '慢查询记录比例',
+        validators=[InputRequired(), NumberRange(min=0, max=1)],
+        render_kw={
+            'class': 'form-control form-control-lg',
+            'placeholder': '0 ~ 1，1 表示全部记录，0 表示关闭'
+        }
+    )
+
     report_watermark_text = StringField(
         '导出报表水印文字',
         validators=[Optional(), Length(max=60)],
@@ -239,3 +338,128 @@ class SystemSettingsForm(FlaskForm):
         if field.data > 512:
             # 可选警告，但不阻断
             pass  # 未来可加 flash 提示
+
+
+class RoleForm(FlaskForm):
+    """角色新建 / 编辑表单（用于 /admin/roles），权限为 Perm 成员名多选，parent_id 为继承的角色（0 表示不继承）"""
+
+    def __init__(self, *args, parent_choices=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.permissions.choices = permission_choices()
+        self.parent_id.choices = [(0, '（不继承）')] + (parent_choices or [])
+
+    name = StringField(
+        '角色名称 *',
+        validators=[DataRequired(message='角色名称不能为空'), Length(max=64)],
+        render_kw={
+            'class': 'form-control',
+            'placeholder': '例如 采购专员、项目经理'
+        }
+    )
+
+    description = StringField(
+        '说明',
+        validators=[Optional(), Length(max=255)],
+        render_kw={'class': 'form-control'}
+    )
+
+    parent_id = SelectField(
+        '继承角色',
+        coerce=int,
+        default=0,
+        validators=[Optional()],
+        render_kw={'class': 'form-select'}
+    )
+
+    permissions = SelectMultipleField('权限', validators=[Optional()])
+
+    submit = SubmitField(
+        '保存角色',
+        render_kw={
+            'class': 'btn btn-primary px-4 fw-semibold'
+        }
+    )
+
+
+class DepartmentForm(FlaskForm):
+    """部门新建 / 编辑表单（用于 /admin/departments），parent_id 为上级部门（0 表示顶级部门）"""
+
+    def __init__(self, *args, parent_choices=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.parent_id.choices = [(0, '（顶级部门）')] + (parent_choices or [])
+
+    name = StringField(
+        '部门名称 *',
+        validators=[DataRequired(message='部门名称不能为空'), Length(max=64)],
+        render_kw={
+            'class': 'form-control',
+            'placeholder': '例如 销售一部、华东区'
+        }
+    )
+
+    parent_id = SelectField(
+        '上级部门',
+        coerce=int,
+        default=0,
+        validators=[Optional()],
+        render_kw={'class': 'form-select'}
+    )
+
+    submit = SubmitField(
+        '保存部门',
+        render_kw={
+            'class': 'btn btn-primary px-4 fw-semibold'
+        }
+    )
+
+
+class NotificationForm(FlaskForm):
+    """站内通知群发表单（用于 /admin/notifications），role_id 为 0 表示全部用户"""
+
+    def __init__(self, *args, role_choices=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.role_id.choices = [(0, '全部用户')] + (role_choices or [])
+
+    title = StringField(
+        '标题 *',
+        validators=[DataRequired(message='通知标题不能为空'), Length(max=120)],
+        render_kw={'class': 'form-control', 'placeholder': '例如 系统将于今晚 22:00 维护'}
+    )
+
+    body = TextAreaField(
+        '正文',
+        validators=[Optional(), Length(max=2000)],
+        render_kw={'class': 'form-control', 'rows': 4}
+    )
+
+    link = StringField(
+        '跳转链接',
+        validators=[Optional(), Length(max=255)],
+        render_kw={'class': 'form-control', 'placeholder': '站内路径，例如 /project/'}
+    )
+
+    category = SelectField(
+        '类别',
+        choices=[('info', '通知'), ('success', '完成'), ('warning', '提醒'), ('danger', '紧急')],
+        default='info',
+        render_kw={'class': 'form-select'}
+    )
+
+    role_id = SelectField(
+        '接收人',
+        coerce=int,
+        default=0,
+        render_kw={'class': 'form-select'}
+    )
+
+    submit = SubmitField(
+        '发送通知',
+        render_kw={
+            'class': 'btn btn-primary px-4 fw-semibold'
+        }
+    )
+
+    def validate_link(self, field):
+        from app.services.notification_service import is_local_link
+        if field.data and not is_local_link(field.data):
+            raise ValidationError('只能填写站内路径（以 / 开头，不含主机名）')
@@ -1,13 +1,24 @@
 # 文件路径：app/models.py
-# 更新日期：2026-02-17
-# 功能说明：核心数据库模型定义，包括 User（用户实体，支持登录、权限、偏好）和 SystemSetting（系统全局配置键值对表），供 SQLAlchemy 使用
+# 更新日期：2026-10-19
+# 功能说明：核心数据库模型定义，包括 User（用户实体，支持登录、权限、偏好）、Role / Department（可继承的角色与树形部门）、Notification（站内通知）、SystemSetting（系统全局配置键值对表）、Project / ProjectItem（项目及明细）与 UserStats（按用户汇总），项目汇总值在同一事务内增量维护
 
+from collections import defaultdict
 from flask_login import UserMixin
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
 from app import db
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 
 
+# 用户 ↔ 角色（多对多）
+user_roles = db.Table(
+    'user_roles',
+    db.Column('user_id', db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('role_id', db.Integer, db.ForeignKey('roles.id', ondelete='CASCADE'), primary_key=True),
+)
+
+
 class User(db.Model, UserMixin):
     """
     用户表 - 系统核心实体
@@ -16,6 +27,9 @@ class User(db.Model, UserMixin):
     """
     __tablename__ = 'users'
 
+    # 密码哈希算法（pbkdf2:sha256 + 600,000 次迭代，2026年推荐；批量导入等处共用）
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:600000'  # 可根据服务器性能调高到 1000000+
+
     # 主键
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment="用户ID（主键）")
 
@@ -112,11 +126,49 @@ class User(db.Model, UserMixin):
         nullable=True,
         comment="最后一次成功登录时间（UTC）"
     )
+    last_seen_at = db.Column(
+        db.DateTime,
+        nullable=True,
+        comment="最近活动时间（UTC，按间隔节流写入，精度为几分钟）"
+    )
+    session_epoch = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+        server_default='0',
+        comment="会话纪元：禁用账号 / 重置密码时递增，已签发的会话与记住我 Cookie 随之失效"
+    )
+
+    # 权限：角色 + 单独授予的权限位（见 app/utils/permissions.py 的 Perm）
+    granted_permissions = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+        server_default='0',
+        comment="在角色之外单独授予该用户的权限位掩码"
+    )
+    roles = db.relationship('Role', secondary=user_roles, back_populates='users')
+    department_id = db.Column(
+        db.Integer,
+        db.ForeignKey('departments.id', ondelete='SET NULL'),
+        nullable=True,
+        index=True,
+        comment="所属部门ID（决定“查看本部门项目”权限的可见范围）"
+    )
+    department = db.relationship('Department', back_populates='users')
 
     def __repr__(self):
         display_name = self.nickname or self.username
         return f'<User {display_name} (id:{self.id})>'
 
+    def get_id(self) -> str:
+        """Flask-Login 用户标识 '<ID>:<会话纪元>'（见 app/utils/session_epoch.py）"""
+        return f'{self.id}:{self.session_epoch or 0}'
+
+    def revoke_sessions(self) -> None:
+        """吊销该用户全部已登录会话（调用后需 commit，再调用 notify_sessions_revoked()）"""
+        self.session_epoch = (self.session_epoch or 0) + 1
+
     # ──────────────────────────────────────────────
     # 密码相关方法（安全强化）
     # ──────────────────────────────────────────────
@@ -124,7 +176,7 @@ class User(db.Model, UserMixin):
         """设置密码，使用高强度哈希（pbkdf2:sha256 + 600,000 次迭代，2026年推荐）"""
         self.password_hash = generate_password_hash(
             password,
-            method='pbkdf2:sha256:600000'  # 可根据服务器性能调高到 1000000+
+            method=self.PASSWORD_HASH_METHOD
         )
 
     def check_password(self, password: str) -> bool:
@@ -155,6 +207,66 @@ class User(db.Model, UserMixin):
         self.last_login_at = datetime.utcnow()
 
 
+class Role(db.Model):
+    """
+    角色表 - 一组权限位的命名集合
+    用户的有效权限 = 基础权限（普通用户默认 / 管理员全部）| 所属角色权限（含 parent_id 继承链）| 单独授予的权限，
+    编译结果按用户缓存在进程内，角色或授权变更后经变更戳失效（见 app/utils/permissions.py）
+    """
+    __tablename__ = 'roles'
+
+    id = db.Column(db.Integer, primary_key=True, comment="主键")
+    name = db.Column(db.String(64), unique=True, nullable=False, comment="角色名称（唯一）")
+    description = db.Column(db.String(255), nullable=True, comment="角色说明")
+    permissions = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+        server_default='0',
+        comment="权限位掩码（Perm 各位按位或），不含继承自上级角色的部分"
+    )
+    parent_id = db.Column(
+        db.Integer,
+        db.ForeignKey('roles.id', ondelete='SET NULL'),
+        nullable=True,
+        index=True,
+        comment="继承的角色ID：本角色拥有该角色（及其继承链）的全部权限"
+    )
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, comment="创建时间（UTC）")
+
+    parent = db.relationship('Role', remote_side=[id])
+    users = db.relationship('User', secondary=user_roles, back_populates='roles')
+
+    def __repr__(self):
+        return f'<Role {self.name} (id:{self.id})>'
+
+
+class Department(db.Model):
+    """
+    部门表 - 树形组织结构（parent_id 指向上级部门）
+    拥有“查看本部门项目”权限的用户可见本部门及全部下级部门的项目；
+    部门树的传递闭包随权限缓存一起预先计算（见 app/utils/permissions.py）
+    """
+    __tablename__ = 'departments'
+
+    id = db.Column(db.Integer, primary_key=True, comment="主键")
+    name = db.Column(db.String(64), unique=True, nullable=False, comment="部门名称（唯一）")
+    parent_id = db.Column(
+        db.Integer,
+        db.ForeignKey('departments.id', ondelete='SET NULL'),
+        nullable=True,
+        index=True,
+        comment="上级部门ID"
+    )
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, comment="创建时间（UTC）")
+
+    parent = db.relationship('Department', remote_side=[id])
+    users = db.relationship('User', back_populates='department')
+
+    def __repr__(self):
+        return f'<Department {self.name} (id:{self.id})>'
+
+
 class SystemSetting(db.Model):
     """
     系统设置表 - 键值对存储（每条配置一行）
@@ -195,3 +307,497 @@ class SystemSetting(db.Model):
 
     def __repr__(self):
         return f'<SystemSetting {self.key}: {self.value}>'
+
+
+class Project(db.Model):
+    """
+    项目表 - 项目跟进的核心组织单位
+    volume_m3 / freight_usd / item_count 为明细汇总值，由下方 before_flush 钩子在明细增删改时
+    于同一事务内增量维护，列表页与导出直接读取，不再逐条求和
+    """
+    __tablename__ = 'projects'
+
+    # 项目状态流转（报价中 → … → 已交付），CLOSED_STATUSES 之外均视为进行中
+    STATUSES = ('报价中', '已打包', '已发货', '已到港', '已清关', '已交付')
+    CLOSED_STATUSES = ('已交付',)
+
+    id = db.Column(db.Integer, primary_key=True, comment="项目ID（主键）")
+
+    name = db.Column(
+        db.String(120),
+        nullable=False,
+        index=True,
+        comment="项目名称"
+    )
+    client_name = db.Column(
+        db.String(120),
+        nullable=True,
+        comment="客户名称"
+    )
+    destination = db.Column(
+        db.String(64),
+        nullable=True,
+        comment="目的港 / 国家（例如 Djibouti、Dubai、Kigali）"
+    )
+    container_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=1,
+        comment="计划柜数（40'HC）"
+    )
+
+    # status / owner_id 开启 active_history，汇总钩子需要拿到变更前的旧值
+    status = db.column_property(
+        db.Column(
+            db.String(20),
+            nullable=False,
+            default='报价中',
+            comment="项目状态：报价中 / 已打包 / 已发货 / 已到港 / 已清关 / 已交付"
+        ),
+        active_history=True
+    )
+    owner_id = db.column_property(
+        db.Column(
+            db.Integer,
+            db.ForeignKey('users.id'),
+            nullable=False,
+            index=True,
+            comment="项目负责人（项目经理）用户ID"
+        ),
+        active_history=True
+    )
+    department_id = db.Column(
+        db.Integer,
+        db.ForeignKey('departments.id', ondelete='SET NULL'),
+        nullable=True,
+        index=True,
+        comment="所属部门ID（随负责人部门维护，用于部门范围的可见性判断）"
+    )
+
+    remark = db.Column(
+        db.Text,
+        nullable=True,
+        comment="备注"
+    )
+    freight_rate_usd_m3 = db.Column(
+        db.Float,
+        nullable=False,
+        default=0.0,
+        comment="海运单价 USD/m³（房型 BOM 运费估算用）"
+    )
+
+    # 汇总值（增量维护，勿在业务代码中直接赋值）
+    item_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+        comment="明细条数（汇总值）"
+    )
+    volume_m3 = db.Column(
+        db.Float,
+        nullable=False,
+        default=0.0,
+        comment="总体积 m³（汇总值）"
+    )
+    freight_usd = db.Column(
+        db.Float,
+        nullable=False,
+        default=0.0,
+        comment="总运费 USD（汇总值）"
+    )
+
+    created_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        nullable=False,
+        comment="创建时间（UTC）"
+    )
+    updated_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+        comment="最后更新时间（UTC）"
+    )
+
+    owner = db.relationship('User', backref=db.backref('projects', lazy='dynamic'))
+    items = db.relationship(
+        'ProjectItem',
+        back_populates='project',
+        cascade='all, delete-orphan',
+        order_by='ProjectItem.id'
+    )
+    room_types = db.relationship(
+        'ProjectRoomType',
+        back_populates='project',
+        cascade='all, delete-orphan',
+        order_by='ProjectRoomType.id'
+    )
+
+    def __repr__(self):
+        return f'<Project {self.name} (id:{self.id})>'
+
+    @property
+    def is_in_progress(self) -> bool:
+        """是否为进行中项目（未交付）"""
+        return self.status not in self.CLOSED_STATUSES
+
+
+class ProjectItem(db.Model):
+    """
+    项目明细表 - 每条记录代表一个家具条目（一行 FFE 清单）
+    volume_m3 / freight_usd 为整行合计（单件 × 数量），写入时由服务层计算
+    """
+    __tablename__ = 'project_items'
+    __table_args__ = (
+        db.Index('ix_project_items_project_room', 'project_id', 'room'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, comment="明细ID（主键）")
+
+    project_id = db.column_property(
+        db.Column(
+            db.Integer,
+            db.ForeignKey('projects.id'),
+            nullable=False,
+            index=True,
+            comment="所属项目ID"
+        ),
+        active_history=True
+    )
+
+    room = db.Column(db.String(64), nullable=True, comment="房型 / 区域（例如 King Standard、Lobby）")
+    name = db.Column(db.String(120), nullable=False, comment="产品名称 / 房号")
+    model = db.Column(db.String(120), nullable=True, comment="型号规格")
+    category = db.Column(db.String(32), nullable=True, comment="家具品类")
+    width_mm = db.Column(db.Integer, nullable=True, comment="宽度 W (mm)")
+    depth_mm = db.Column(db.Integer, nullable=True, comment="深度 D (mm)")
+    height_mm = db.Column(db.Integer, nullable=True, comment="高度 H (mm)")
+    packing = db.Column(db.String(16), nullable=True, comment="包装方式")
+    quantity = db.Column(db.Integer, nullable=False, default=1, comment="数量")
+    unit_volume_m3 = db.Column(db.Float, nullable=False, default=0.0, comment="单件体积 m³")
+
+    # 整行合计，开启 active_history 以便汇总钩子计算差值
+    volume_m3 = db.column_property(
+        db.Column(db.Float, nullable=False, default=0.0, comment="整行体积 m³（单件 × 数量）"),
+        active_history=True
+    )
+    freight_usd = db.column_property(
+        db.Column(db.Float, nullable=False, default=0.0, comment="整行分摊运费 USD"),
+        active_history=True
+    )
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, comment="创建时间（UTC）")
+    updated_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+        comment="最后更新时间（UTC）"
+    )
+
+    project = db.relationship('Project', back_populates='items')
+
+    def __repr__(self):
+        return f'<ProjectItem {self.name} x{self.quantity} (project:{self.project_id})>'
+
+
+class ProjectRoomType(db.Model):
+    """
+    项目房型表 - 酒店项目的 BOM 结构：房型 × 房间数
+    同一房型的家具清单只保存一份（RoomTypeItem），体积与费用按唯一条目计算一次后乘以房间数放大
+    """
+    __tablename__ = 'project_room_types'
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'name', name='uq_project_room_type_name'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, comment="房型ID（主键）")
+    project_id = db.Column(
+        db.Integer,
+        db.ForeignKey('projects.id'),
+        nullable=False,
+        index=True,
+        comment="所属项目ID"
+    )
+    name = db.Column(db.String(64), nullable=False, comment="房型名称（例如 King Standard）")
+    room_count = db.Column(db.Integer, nullable=False, default=1, comment="房间数（该房型重复次数）")
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, comment="创建时间（UTC）")
+    updated_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+        comment="最后更新时间（UTC）"
+    )
+
+    project = db.relationship('Project', back_populates='room_types')
+    items = db.relationship(
+        'RoomTypeItem',
+        back_populates='room_type',
+        cascade='all, delete-orphan',
+        order_by='RoomTypeItem.id'
+    )
+
+    def __repr__(self):
+        return f'<ProjectRoomType {self.name} x{self.room_count} (project:{self.project_id})>'
+
+
+class RoomTypeItem(db.Model):
+    """
+    房型家具清单 - 单个房间内的一行家具（数量为每间房的件数）
+    品类 / 包装 / 压薄字段保存 KD 引擎代码（见 app/services/calc/volume_kd.py）
+    """
+    __tablename__ = 'room_type_items'
+
+    id = db.Column(db.Integer, primary_key=True, comment="条目ID（主键）")
+    room_type_id = db.Column(
+        db.Integer,
+        db.ForeignKey('project_room_types.id'),
+        nullable=False,
+        index=True,
+        comment="所属房型ID"
+    )
+
+    name = db.Column(db.String(120), nullable=False, comment="产品名称")
+    model = db.Column(db.String(120), nullable=True, comment="型号规格")
+    category = db.Column(db.String(32), nullable=False, comment="家具品类代码")
+    width_mm = db.Column(db.Integer, nullable=True, comment="宽度 W (mm)，为空时取品类默认值")
+    depth_mm = db.Column(db.Integer, nullable=True, comment="深度 D (mm)，为空时取品类默认值")
+    height_mm = db.Column(db.Integer, nullable=True, comment="高度 H (mm)，为空时取品类默认值")
+    packing = db.Column(db.String(16), nullable=False, default='kd', comment="包装方式代码")
+    kd_level = db.Column(db.String(16), nullable=False, default='standard', comment="KD 压薄程度代码")
+    quantity = db.Column(db.Integer, nullable=False, default=1, comment="每间房件数")
+    unit_price_usd = db.Column(db.Float, nullable=False, default=0.0, comment="单价 USD")
+
+    room_type = db.relationship('ProjectRoomType', back_populates='items')
+
+    def __repr__(self):
+        return f'<RoomTypeItem {self.name} x{self.quantity} (room_type:{self.room_type_id})>'
+
+
+class UserStats(db.Model):
+    """
+    用户汇总表 - 每个用户一行，保存其名下项目的汇总值
+    仪表盘按主键读取一行即可得到统计数据（O(1)），由 before_flush 钩子增量维护
+    data_version 随每次汇总变化递增，仪表盘统计片段按 (用户, 版本) 缓存渲染结果
+    """
+    __tablename__ = 'user_stats'
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey('users.id'),
+        primary_key=True,
+        comment="用户ID（主键）"
+    )
+    project_count = db.Column(db.Integer, nullable=False, default=0, comment="名下项目总数")
+    active_projects = db.Column(db.Integer, nullable=False, default=0, comment="进行中项目数")
+    total_volume_m3 = db.Column(db.Float, nullable=False, default=0.0, comment="名下项目累计体积 m³")
+    total_freight_usd = db.Column(db.Float, nullable=False, default=0.0, comment="名下项目累计运费 USD")
+    unread_notifications = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+        server_default='0',
+        comment="未读通知数（通知写入 / 标记已读时同一事务内增减）"
+    )
+    data_version = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0,
+        comment="数据版本号（汇总值或未读通知数每次变化 +1，仪表盘片段缓存键的一部分）"
+    )
+    updated_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+        comment="最后更新时间（UTC）"
+    )
+
+    def __repr__(self):
+        return f'<UserStats user:{self.user_id} projects:{self.project_count}>'
+
+
+class Notification(db.Model):
+    """
+    站内通知表 - 每个接收人一行（写时扇出）
+    群发时按批插入，接收人的未读数在 user_stats.unread_notifications 中同一事务内维护，
+    导航栏角标只读该计数，不统计本表（见 app/services/notification_service.py）
+    """
+    __tablename__ = 'notifications'
+    __table_args__ = (
+        # 个人通知列表（按 ID 倒序分页）与“标记全部已读”都走此索引
+        db.Index('ix_notifications_user_read', 'user_id', 'is_read', 'id'),
+    )
+
+    CATEGORIES = ('info', 'success', 'warning', 'danger')
+
+    id = db.Column(db.Integer, primary_key=True, comment="主键")
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey('users.id', ondelete='CASCADE'),
+        nullable=False,
+        comment="接收人用户ID"
+    )
+    title = db.Column(db.String(120), nullable=False, comment="标题")
+    body = db.Column(db.Text, nullable=True, comment="正文")
+    link = db.Column(db.String(255), nullable=True, comment="点击跳转的站内链接")
+    category = db.Column(db.String(16), nullable=False, default='info', comment="类别：info / success / warning / danger")
+    is_read = db.Column(db.Boolean, nullable=False, default=False, comment="是否已读")
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, comment="创建时间（UTC）")
+    read_at = db.Column(db.DateTime, nullable=True, comment="阅读时间（UTC）")
+
+    def __repr__(self):
+        return f'<Notification {self.title} user:{self.user_id} read:{self.is_read}>'
+
+
+# ──────────────────────────────────────────────
+# 汇总值增量维护（before_flush，与明细写入处于同一事务）
+# ──────────────────────────────────────────────
+
+def _history_pair(obj, attr):
+    """返回属性 (旧值, 新值)；未变更时两者相同（依赖 active_history 拿到旧值）"""
+    hist = inspect(obj).attrs[attr].history
+    new = hist.added[0] if hist.added else getattr(obj, attr)
+    if hist.deleted:
+        old = hist.deleted[0]
+    elif hist.added:
+        old = None
+    else:
+        old = new
+    return old, new
+
+
+def _apply_delta(obj, attr, delta):
+    """
+    累加增量：新建对象直接改值；已持久化对象赋 SQL 表达式，
+    生成 UPDATE ... SET col = col + ?，多进程并发写入时不会丢失更新
+    """
+    if not delta:
+        return
+    if inspect(obj).pending:
+        setattr(obj, attr, (getattr(obj, attr) or 0) + delta)
+    else:
+        setattr(obj, attr, getattr(type(obj), attr) + delta)
+
+
+def _owner_id_of(project):
+    if project.owner_id is not None:
+        return project.owner_id
+    return project.owner.id if project.owner is not None else None
+
+
+@event.listens_for(Session, 'before_flush')
+def _maintain_project_rollups(session, flush_context, instances):
+    # Project → [明细数, 体积, 运费]；owner_id → [项目数, 进行中, 体积, 运费]
+    project_deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    owner_deltas = defaultdict(lambda: [0, 0, 0.0, 0.0])
+
+    def item_project(item, project_id=None):
+        if project_id is None:
+            if item.project is not None:
+                return item.project
+            project_id = item.project_id
+        return session.get(Project, project_id) if project_id else None
+
+    def add_item_delta(project, count, volume, freight):
+        if project is not None:
+            delta = project_deltas[project]
+            delta[0] += count
+            delta[1] += volume or 0.0
+            delta[2] += freight or 0.0
+
+    def add_owner_delta(owner_id, count, active, volume, freight):
+        if owner_id is not None:
+            delta = owner_deltas[owner_id]
+            delta[0] += count
+            delta[1] += active
+            delta[2] += volume or 0.0
+            delta[3] += freight or 0.0
+
+    with session.no_autoflush:
+        deleted_projects = {obj for obj in session.deleted if isinstance(obj, Project)}
+
+        # ── 1. 明细变化 → 项目增量 ──
+        for obj in session.new:
+            if isinstance(obj, ProjectItem):
+                add_item_delta(item_project(obj), 1, obj.volume_m3, obj.freight_usd)
+
+        for obj in session.deleted:
+            if isinstance(obj, ProjectItem):
+                add_item_delta(item_project(obj), -1, -(obj.volume_m3 or 0.0), -(obj.freight_usd or 0.0))
+
+        for obj in session.dirty:
+            if not isinstance(obj, ProjectItem) or obj in session.deleted or not session.is_modified(obj):
+                continue
+            old_pid, new_pid = _history_pair(obj, 'project_id')
+            old_volume, new_volume = _history_pair(obj, 'volume_m3')
+            old_freight, new_freight = _history_pair(obj, 'freight_usd')
+            if old_pid is not None and old_pid != new_pid:
+                # 明细迁移到其他项目：旧项目扣减，新项目累加
+                add_item_delta(item_project(obj, old_pid), -1, -(old_volume or 0.0), -(old_freight or 0.0))
+                add_item_delta(item_project(obj, new_pid), 1, new_volume, new_freight)
+            else:
+                add_item_delta(
+                    item_project(obj), 0,
+                    (new_volume or 0.0) - (old_volume or 0.0),
+                    (new_freight or 0.0) - (old_freight or 0.0)
+                )
+
+        # ── 2. 项目自身变化（新建 / 删除 / 状态 / 负责人）→ 用户增量 ──
+        for obj in session.new:
+            if isinstance(obj, Project):
+                add_owner_delta(_owner_id_of(obj), 1, int(obj.is_in_progress), 0.0, 0.0)
+
+        for obj in deleted_projects:
+            add_owner_delta(
+                obj.owner_id, -1, -int(obj.is_in_progress),
+                -(obj.volume_m3 or 0.0), -(obj.freight_usd or 0.0)
+            )
+
+        for obj in session.dirty:
+            if not isinstance(obj, Project) or obj in deleted_projects or not session.is_modified(obj):
+                continue
+            old_owner, new_owner = _history_pair(obj, 'owner_id')
+            old_status, new_status = _history_pair(obj, 'status')
+            old_active = int(old_status not in Project.CLOSED_STATUSES)
+            new_active = int(new_status not in Project.CLOSED_STATUSES)
+            if old_owner is not None and old_owner != new_owner:
+                # 负责人变更：整体从旧负责人迁到新负责人（体积/运费取持久化值，本次明细增量在步骤 3 计入新负责人）
+                volume, freight = obj.volume_m3 or 0.0, obj.freight_usd or 0.0
+                add_owner_delta(old_owner, -1, -old_active, -volume, -freight)
+                add_owner_delta(new_owner, 1, new_active, volume, freight)
+            elif old_active != new_active:
+                add_owner_delta(new_owner, 0, new_active - old_active, 0.0, 0.0)
+
+        # ── 3. 写入项目汇总，并向上累加到负责人 ──
+        for project, (count, volume, freight) in project_deltas.items():
+            if project in deleted_projects or not (count or volume or freight):
+                continue
+            _apply_delta(project, 'item_count', count)
+            _apply_delta(project, 'volume_m3', volume)
+            _apply_delta(project, 'freight_usd', freight)
+            add_owner_delta(_owner_id_of(project), 0, 0, volume, freight)
+
+        # ── 4. 写入用户汇总（不存在则创建） ──
+        for owner_id, (count, active, volume, freight) in owner_deltas.items():
+            if not (count or active or volume or freight):
+                continue
+            stats = session.get(UserStats, owner_id)
+            if stats is None:
+                stats = UserStats(
+                    user_id=owner_id,
+                    project_count=0,
+                    active_projects=0,
+                    total_volume_m3=0.0,
+                    total_freight_usd=0.0,
+                    data_version=0
+                )
+                session.add(stats)
+            _apply_delta(stats, 'project_count', count)
+            _apply_delta(stats, 'active_projects', active)
+            _apply_delta(stats, 'total_volume_m3', volume)
+            _apply_delta(stats, 'total_freight_usd', freight)
+            _apply_delta(stats, 'data_version', 1)  # 仪表盘片段缓存据此失效
@@ -1,5 +1,5 @@
 # 文件路径：app/routes/__init__.py
-# 更新日期：2026-02-17
+# 更新日期：2026-10-19
 # 功能说明：所有蓝图（Blueprint）的统一注册入口文件，在应用工厂中调用此函数一次性注册所有路由模块，确保路由结构模块化、可维护、易扩展
 
 from flask import Blueprint
@@ -9,13 +9,10 @@ from flask import Blueprint
 from .auth import auth_bp           # 认证相关路由（登录、登出、忘记密码等）
 from .main import main_bp           # 主页面路由（仪表盘、个人中心、偏好设置等）
 from .admin import admin_bp         # 后台管理路由（用户管理、系统设置等）
-
-# 计算器模块暂时禁用（文件未完整实现，避免启动报错）
-# from .calculator import calculator_bp  # 计算器模块路由（KD体积、海运费用等）
-
-# 尚未实现的模块（保持注释，待开发后再放开）
-# from .project import project_bp     # 项目跟进相关路由
-# from .export import export_bp       # 数据导出路由（Excel/PDF 等）
+from .project import project_bp     # 项目跟进相关路由（项目列表、详情）
+from .export import export_bp       # 数据导出路由（CSV / JSON 流式导出）
+from .calculator import calculator_bp  # 计算器模块路由（KD 体积计算、FFE 清单导入）
+from .notification import notification_bp  # 站内通知路由（通知列表、标记已读、角标长轮询）
 
 # 可选：未来 API 蓝图（版本化）
 # from .api.v1 import api_v1_bp
@@ -36,18 +33,23 @@ def register_blueprints(app):
     # 管理后台（需管理员权限）
     app.register_blueprint(admin_bp, url_prefix='/admin')
 
-    # 计算器模块暂时禁用（文件未完整实现，避免启动报错）
-    # app.register_blueprint(calculator_bp, url_prefix='/calculator')
+    # 计算器模块
+    app.register_blueprint(calculator_bp, url_prefix='/calculator')
+
+    # 项目跟进
+    app.register_blueprint(project_bp, url_prefix='/project')
+
+    # 数据导出
+    app.register_blueprint(export_bp, url_prefix='/export')
 
-    # 待开发模块（示例）
-    # app.register_blueprint(project_bp, url_prefix='/project')
-    # app.register_blueprint(export_bp, url_prefix='/export')
+    # 站内通知
+    app.register_blueprint(notification_bp, url_prefix='/notifications')
 
     # 未来可能的 API 蓝图
     # app.register_blueprint(api_v1_bp, url_prefix='/api/v1')
 
     # 注册完成日志（生产环境可见，便于排查启动问题）
-    app.logger.info("所有蓝图注册完成：auth, main, admin 已加载")
+    app.logger.info("所有蓝图注册完成：auth, main, admin, calculator, project, export, notification 已加载")
 
 
 # 额外提示：
@@ -60,4 +62,3 @@ def register_blueprints(app):
 #     @login_required
 #     def require_login():
 #         pass
-# - 当前 calculator 蓝图已临时禁用，待 calculator.py 文件完整实现（包含 calculator_bp 定义）后再放开注册
@@ -1,23 +1,25 @@
 # 文件路径：app/routes/admin.py
-# 更新日期：2026-02-17
+# 更新日期：2026-10-19
 # 功能说明：后台管理模块路由集合，负责接收请求、表单校验、调用用户/设置服务层、渲染模板或返回响应，不包含任何数据库操作或核心业务逻辑
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app, send_from_directory, abort
 from flask_login import login_required, current_user
-from app.forms.admin_forms import UserSearchForm, UserForm, SystemSettingsForm
+from app.forms.admin_forms import UserSearchForm, UserForm, UserImportForm, SystemSettingsForm, ProfilerForm, RoleForm, DepartmentForm, NotificationForm
 from app.services.user_service import UserService
 from app.services.settings_service import SettingsService
+from app.services.permission_service import PermissionService
+from app.services.notification_service import NotificationService
+from app.utils.permissions import Perm, ADMIN_AREA_PERMISSIONS, require, has_perm, names_from_mask, access_graph
 from werkzeug.exceptions import Forbidden
+from datetime import datetime
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
 @admin_bp.before_request
-@login_required
+@require(ADMIN_AREA_PERMISSIONS, any_of=True)
 def require_admin():
-    """所有后台路由要求登录且必须是管理员"""
-    if not current_user.is_admin:
-        flash('需要管理员权限访问该页面', 'danger')
-        return redirect(url_for('main.dashboard'))
+    """所有后台路由要求登录且至少拥有一项后台权限（各页面再按具体权限检查）"""
+    pass
 
 
 @admin_bp.route('/dashboard', methods=['GET'])
@@ -33,6 +35,7 @@ def admin_dashboard():
 
 
 @admin_bp.route('/system-users', methods=['GET'])
+@require(Perm.MANAGE_USERS)
 def system_users():
     """系统用户列表页面 - 支持搜索和活跃过滤"""
     form = UserSearchForm(request.args)
@@ -54,6 +57,7 @@ def system_users():
 
 @admin_bp.route('/system-user/edit/<int:user_id>', methods=['GET', 'POST'])
 @admin_bp.route('/system-user/create', methods=['GET', 'POST'], defaults={'user_id': None})
+@require(Perm.MANAGE_USERS)
 def user_edit(user_id=None):
     """用户编辑 / 新建页面"""
     is_edit = user_id is not None
@@ -64,13 +68,28 @@ def user_edit(user_id=None):
         if not user:
             flash('用户不存在或无权限访问', 'danger')
             return redirect(url_for('admin.system_users'))
+        try:
+            # 重置密码即可冒用对方身份：只能编辑有效权限不超过自己的用户（保存时服务层再校验一次）
+            PermissionService.ensure_can_manage(current_user, user)
+        except PermissionError as pe:
+            flash(str(pe), 'danger')
+            return redirect(url_for('admin.system_users'))
 
+    # 管理员标记等同于全部权限，只有管理员本人可以授予 / 撤销（仅有人员管理权限者不可见、不生效）
+    can_set_admin = current_user.is_admin
+    can_manage_roles = has_perm(Perm.MANAGE_ROLES)
     form = UserForm(
         obj=user,
         is_edit=is_edit,
         original_username=user.username if user else None,
-        original_email=user.email if user else None
+        original_email=user.email if user else None,
+        role_choices=[(role.id, role.name) for role in PermissionService.list_roles()] if can_manage_roles else None,
+        department_choices=[(dept.id, dept.name) for dept in PermissionService.list_departments()] if can_manage_roles else None
     )
+    if user and not form.is_submitted():
+        form.roles.data = [role.id for role in user.roles]
+        form.grants.data = names_from_mask(user.granted_permissions)
+        form.department_id.data = user.department_id or 0
 
     if form.validate_on_submit():
         try:
@@ -81,26 +100,34 @@ def user_edit(user_id=None):
                     nickname=form.nickname.data,
                     email=form.email.data,
                     password=form.password.data if form.password.data else None,
-                    is_admin=form.is_admin.data,
-                    is_active=form.is_active.data
+                    is_admin=form.is_admin.data if can_set_admin else None,
+                    is_active=form.is_active.data,
+                    actor=current_user
                 )
+                saved_id = user_id
                 flash('用户信息更新成功', 'success')
             else:
-                UserService.create_user(
+                saved_id = UserService.create_user(
                     username=form.username.data,
                     nickname=form.nickname.data,
                     email=form.email.data,
                     password=form.password.data,
-                    is_admin=form.is_admin.data
-                )
+                    is_admin=bool(form.is_admin.data) if can_set_admin else False
+                ).id
                 flash('新用户创建成功', 'success')
 
+            if can_manage_roles:
+                PermissionService.set_user_access(
+                    saved_id, form.roles.data or [], form.grants.data or [], form.department_id.data or None,
+                    actor=current_user
+                )
+
             return redirect(url_for('admin.system_users'))
 
         except ValueError as ve:
             flash(str(ve), 'danger')
-        except PermissionError:
-            flash('系统管理员账号禁止编辑', 'danger')
+        except PermissionError as pe:
+            flash(str(pe), 'danger')
         except Exception as e:
             current_app.logger.error(f"用户保存失败: {str(e)}", exc_info=True)
             flash('保存失败，请检查输入或联系管理员', 'danger')
@@ -109,23 +136,49 @@ def user_edit(user_id=None):
         'admin/system_user_edit.html',
         form=form,
         user=user,
-        is_edit=is_edit
+        is_edit=is_edit,
+        can_set_admin=can_set_admin,
+        can_manage_roles=can_manage_roles
     )
 
 
+@admin_bp.route('/system-users/import', methods=['GET', 'POST'])
+@require(Perm.MANAGE_USERS)
+def user_import():
+    """批量导入用户（CSV / XLSX），逐行报告失败原因"""
+    form = UserImportForm()
+    result = None
+
+    if form.validate_on_submit():
+        upload = form.file.data
+        try:
+            rows = UserService.parse_import_file(upload.filename, upload.stream)
+            result = UserService.bulk_import_users(rows, allow_admin=current_user.is_admin)
+            category = 'success' if not result['errors'] else 'warning'
+            flash(f"导入完成：共 {result['total']} 行，成功 {result['created']} 行，失败 {len(result['errors'])} 行", category)
+        except ValueError as ve:
+            flash(str(ve), 'danger')
+        except Exception as e:
+            current_app.logger.error(f"批量导入用户失败: {str(e)}", exc_info=True)
+            flash('导入失败，请检查文件格式或联系管理员', 'danger')
+
+    return render_template('admin/system_user_import.html', form=form, result=result)
+
+
 @admin_bp.route('/system-user/toggle-active/<int:user_id>', methods=['POST'])
+@require(Perm.MANAGE_USERS)
 def toggle_active(user_id):
     """AJAX 或表单切换用户启用/禁用状态"""
     active = request.form.get('active') == 'true'
 
     try:
-        UserService.toggle_user_active(user_id, active)
+        UserService.toggle_user_active(user_id, active, actor=current_user)
         status_text = "启用" if active else "禁用"
         flash(f'用户已{status_text}', 'success')
     except ValueError as ve:
         flash(str(ve), 'danger')
-    except PermissionError:
-        flash('系统管理员账号禁止更改状态', 'danger')
+    except PermissionError as pe:
+        flash(str(pe), 'danger')
     except Exception as e:
         current_app.logger.error(f"用户状态切换失败: {str(e)}", exc_info=True)
         flash('操作失败，请稍后重试', 'danger')
@@ -134,6 +187,7 @@ def toggle_active(user_id):
 
 
 @admin_bp.route('/system-settings', methods=['GET', 'POST'])
+@require(Perm.MANAGE_SETTINGS)
 def system_settings():
     """系统设置页面 - 查看/保存全局配置"""
     # 获取当前设置用于预填充表单
@@ -167,6 +221,277 @@ def system_settings():
     )
 
 
+@admin_bp.route('/metrics', methods=['GET'])
+@require(Perm.VIEW_DIAGNOSTICS)
+def metrics():
+    """请求性能指标：各端点耗时 / 数据库 / 模板 / 响应大小分位数（当前 worker 进程自启动或重置以来）"""
+    registry = current_app.extensions.get('metrics')
+    return render_template(
+        'admin/metrics.html',
+        rows=registry.snapshot() if registry else [],
+        started_at=datetime.fromtimestamp(registry.started_at).strftime('%Y-%m-%d %H:%M:%S') if registry else None,
+        enabled=registry is not None,
+        active_section='metrics'
+    )
+
+
+@admin_bp.route('/metrics/reset', methods=['POST'])
+@require(Perm.VIEW_DIAGNOSTICS)
+def metrics_reset():
+    """清空当前 worker 进程的指标"""
+    registry = current_app.extensions.get('metrics')
+    if registry:
+        registry.reset()
+        current_app.logger.info(f"请求性能指标已重置 (操作人: {current_user.username})")
+        flash('当前进程的性能指标已重置', 'success')
+    return redirect(url_for('admin.metrics'))
+
+
+@admin_bp.route('/slow-queries', methods=['GET'])
+@require(Perm.VIEW_DIAGNOSTICS)
+def slow_queries():
+    """慢查询排行：按总耗时降序（当前 worker 进程自启动或重置以来），阈值在系统设置中调整"""
+    store = current_app.extensions.get('slow_query')
+    return render_template(
+        'admin/slow_queries.html',
+        rows=store.top() if store else [],
+        started_at=datetime.fromtimestamp(store.started_at).strftime('%Y-%m-%d %H:%M:%S') if store else None,
+        settings=SettingsService.get_snapshot(),
+        enabled=store is not None,
+        active_section='slow_queries'
+    )
+
+
+@admin_bp.route('/slow-queries/reset', methods=['POST'])
+@require(Perm.VIEW_DIAGNOSTICS)
+def slow_queries_reset():
+    """清空当前 worker 进程的慢查询汇总"""
+    store = current_app.extensions.get('slow_query')
+    if store:
+        store.reset()
+        current_app.logger.info(f"慢查询汇总已重置 (操作人: {current_user.username})")
+        flash('当前进程的慢查询汇总已重置', 'success')
+    return redirect(url_for('admin.slow_queries'))
+
+
+@admin_bp.route('/profiler', methods=['GET'])
+@require(Perm.VIEW_DIAGNOSTICS)
+def profiler():
+    """请求采样分析：当前开关状态 + 已生成的折叠栈文件列表"""
+    from app.utils.profiler import list_profiles
+    control = current_app.extensions.get('profiler')
+    state = control.state() if control else None
+    target_user = UserService.get_user_by_id(state['user_id']) if state and state.get('user_id') else None
+    return render_template(
+        'admin/profiler.html',
+        form=ProfilerForm(),
+        enabled=control is not None,
+        state=state,
+        target_user=target_user,
+        expires_at=datetime.fromtimestamp(state['expires_at']).strftime('%Y-%m-%d %H:%M:%S') if state else None,
+        profiles=list_profiles(control.directory) if control else [],
+        active_section='profiler'
+    )
+
+
+@admin_bp.route('/profiler/enable', methods=['POST'])
+@require(Perm.VIEW_DIAGNOSTICS)
+def profiler_enable():
+    """开启采样分析（所有 worker 进程共享同一份名额）"""
+    control = current_app.extensions.get('profiler')
+    form = ProfilerForm()
+    if control is None:
+        flash('请求采样分析未开启（PROFILER_ENABLED=false）', 'warning')
+        return redirect(url_for('admin.profiler'))
+    if not form.validate_on_submit():
+        flash('表单验证失败，请检查输入内容', 'danger')
+        return redirect(url_for('admin.profiler'))
+
+    endpoint = (form.endpoint.data or '').strip() or None
+    if endpoint and endpoint not in current_app.view_functions:
+        flash(f'端点不存在：{endpoint}', 'danger')
+        return redirect(url_for('admin.profiler'))
+
+    user_id = None
+    username = (form.username.data or '').strip()
+    if username:
+        user = UserService.get_user_by_username(username)
+        if not user:
+            flash(f'用户不存在：{username}', 'danger')
+            return redirect(url_for('admin.profiler'))
+        user_id = user.id
+
+    control.enable(form.max_requests.data, endpoint, user_id, form.duration_minutes.data, current_user.username)
+    current_app.logger.info(
+        f"请求采样分析已开启: {form.max_requests.data} 个请求, 端点={endpoint or '不限'}, "
+        f"用户={username or '不限'} (操作人: {current_user.username})"
+    )
+    flash(f'已开启采样分析，将记录接下来 {form.max_requests.data} 个匹配的请求', 'success')
+    return redirect(url_for('admin.profiler'))
+
+
+@admin_bp.route('/profiler/disable', methods=['POST'])
+@require(Perm.VIEW_DIAGNOSTICS)
+def profiler_disable():
+    """立即关闭采样分析"""
+    control = current_app.extensions.get('profiler')
+    if control:
+        control.disable()
+        current_app.logger.info(f"请求采样分析已关闭 (操作人: {current_user.username})")
+        flash('采样分析已关闭', 'success')
+    return redirect(url_for('admin.profiler'))
+
+
+@admin_bp.route('/profiler/<name>', methods=['GET'])
+@require(Perm.VIEW_DIAGNOSTICS)
+def profiler_download(name):
+    """下载单个折叠栈文件"""
+    from app.utils.profiler import PROFILE_SUFFIX
+    control = current_app.extensions.get('profiler')
+    if control is None or not name.endswith(PROFILE_SUFFIX):
+        abort(404)
+    return send_from_directory(control.directory, name, as_attachment=True, mimetype='text/plain')
+
+
+@admin_bp.route('/roles', methods=['GET', 'POST'])
+@require(Perm.MANAGE_ROLES)
+def roles():
+    """角色列表 + 新建 / 编辑表单（?role_id= 编辑指定角色）"""
+    role_id = request.args.get('role_id', type=int)
+    role = PermissionService.get_role(role_id) if role_id else None
+    if role_id and not role:
+        flash('角色不存在', 'danger')
+        return redirect(url_for('admin.roles'))
+
+    all_roles = PermissionService.list_roles()
+    form = RoleForm(obj=role, parent_choices=[(item.id, item.name) for item in all_roles if item.id != role_id])
+    if role and not form.is_submitted():
+        form.permissions.data = names_from_mask(role.permissions)
+        form.parent_id.data = role.parent_id or 0
+
+    if form.validate_on_submit():
+        try:
+            saved = PermissionService.save_role(
+                role_id, form.name.data, form.description.data, form.permissions.data, form.parent_id.data or None
+            )
+            current_app.logger.info(f"角色已保存: {saved.name} (操作人: {current_user.username})")
+            flash(f'角色“{saved.name}”已保存', 'success')
+            return redirect(url_for('admin.roles'))
+        except ValueError as ve:
+            flash(str(ve), 'danger')
+
+    graph = access_graph()
+    names = {item.id: item.name for item in all_roles}
+    return render_template(
+        'admin/roles.html',
+        form=form,
+        role=role,
+        roles=[
+            {
+                'role': item,
+                'permissions': names_from_mask(item.permissions),
+                'inherited': names_from_mask(graph.role_masks.get(item.id, 0) & ~item.permissions),
+                'lineage': [names[ancestor] for ancestor in graph.role_lineage.get(item.id, ()) if ancestor != item.id],
+                'user_count': len(item.users)
+            }
+            for item in all_roles
+        ],
+        active_section='roles'
+    )
+
+
+@admin_bp.route('/roles/<int:role_id>/delete', methods=['POST'])
+@require(Perm.MANAGE_ROLES)
+def role_delete(role_id):
+    try:
+        PermissionService.delete_role(role_id)
+        current_app.logger.info(f"角色已删除: ID={role_id} (操作人: {current_user.username})")
+        flash('角色已删除', 'success')
+    except ValueError as ve:
+        flash(str(ve), 'danger')
+    return redirect(url_for('admin.roles'))
+
+
+@admin_bp.route('/departments', methods=['GET', 'POST'])
+@require(Perm.MANAGE_ROLES)
+def departments():
+    """部门列表 + 新建 / 编辑表单（?department_id= 编辑指定部门）"""
+    department_id = request.args.get('department_id', type=int)
+    department = PermissionService.get_department(department_id) if department_id else None
+    if department_id and not department:
+        flash('部门不存在', 'danger')
+        return redirect(url_for('admin.departments'))
+
+    all_departments = PermissionService.list_departments()
+    form = DepartmentForm(
+        obj=department,
+        parent_choices=[(item.id, item.name) for item in all_departments if item.id != department_id]
+    )
+    if department and not form.is_submitted():
+        form.parent_id.data = department.parent_id or 0
+
+    if form.validate_on_submit():
+        try:
+            saved = PermissionService.save_department(department_id, form.name.data, form.parent_id.data or None)
+            current_app.logger.info(f"部门已保存: {saved.name} (操作人: {current_user.username})")
+            flash(f'部门“{saved.name}”已保存', 'success')
+            return redirect(url_for('admin.departments'))
+        except ValueError as ve:
+            flash(str(ve), 'danger')
+
+    scope = access_graph().department_scope
+    return render_template(
+        'admin/departments.html',
+        form=form,
+        department=department,
+        departments=[
+            {
+                'department': item,
+                'parent': item.parent.name if item.parent else None,
+                'child_count': len(scope.get(item.id, ())) - 1,
+                'user_count': len(item.users)
+            }
+            for item in all_departments
+        ],
+        active_section='departments'
+    )
+
+
+@admin_bp.route('/departments/<int:department_id>/delete', methods=['POST'])
+@require(Perm.MANAGE_ROLES)
+def department_delete(department_id):
+    try:
+        PermissionService.delete_department(department_id)
+        current_app.logger.info(f"部门已删除: ID={department_id} (操作人: {current_user.username})")
+        flash('部门已删除', 'success')
+    except ValueError as ve:
+        flash(str(ve), 'danger')
+    return redirect(url_for('admin.departments'))
+
+
+@admin_bp.route('/notifications', methods=['GET', 'POST'])
+@require(Perm.MANAGE_USERS)
+def notifications():
+    """站内通知群发（全部用户或指定角色成员）"""
+    form = NotificationForm(role_choices=[(role.id, role.name) for role in PermissionService.list_roles()])
+    if form.validate_on_submit():
+        try:
+            sent = NotificationService.broadcast(
+                form.title.data,
+                body=form.body.data,
+                link=form.link.data,
+                category=form.category.data,
+                role_id=form.role_id.data or None
+            )
+            current_app.logger.info(f"群发通知: {form.title.data} → {sent} 人 (操作人: {current_user.username})")
+            flash(f'通知已发送给 {sent} 位用户', 'success')
+            return redirect(url_for('admin.notifications'))
+        except ValueError as ve:
+            flash(str(ve), 'danger')
+
+    return render_template('admin/notifications.html', form=form, active_section='notifications')
+
+
 @admin_bp.errorhandler(403)
 @admin_bp.errorhandler(Forbidden)
 def forbidden_error(e):
@@ -0,0 +1,100 @@
+# 文件路径：app/routes/calculator.py
+# 更新日期：2026-10-19
+# 功能说明：计算器蓝图路由集合，提供 KD 包装体积的单件计算、品类预设查询与 FFE 清单（XLSX / TSV）流式导入接口，均返回 JSON，可选将导入结果写入项目明细
+
+from flask import Blueprint, jsonify, request, current_app
+from flask_login import login_required, current_user
+from app.services.calc import volume_kd, ffe_import
+from app.services.project_service import ProjectService
+from app.utils.permissions import Perm, require, has_perm, project_scope
+
+calculator_bp = Blueprint('calculator', __name__, url_prefix='/calculator')
+
+
+@calculator_bp.before_request
+@require(Perm.USE_CALCULATOR)
+def require_login():
+    """所有计算器路由默认要求登录且拥有计算器权限（统一保护）"""
+    pass
+
+
+@calculator_bp.route('/kdsize/presets', methods=['GET'])
+def kdsize_presets():
+    """品类默认尺寸 / 包装方式 / KD 压薄程度（供前端下拉框使用）"""
+    return jsonify({
+        'categories': [
+            {'code': code, 'name': info['name'], 'group': info['group'], 'size': info['size']}
+            for code, info in volume_kd.CATEGORIES.items()
+        ],
+        'packing_types': [{'code': code, 'name': info['name']} for code, info in volume_kd.PACKING_TYPES.items()],
+        'kd_levels': [
+            {'code': code, 'name': info['name'], 'thickness': info['thickness']}
+            for code, info in volume_kd.KD_LEVELS.items()
+        ],
+        'provisional': volume_kd.TABLES_PROVISIONAL,
+    })
+
+
+@calculator_bp.route('/kdsize', methods=['POST'])
+def kdsize_calculate():
+    """单件 KD 包装体积计算（JSON 或表单参数，尺寸缺省时使用品类默认值）"""
+    data = request.get_json(silent=True) or request.form
+    try:
+        item = ffe_import.validate_row({key: str(data.get(key) or '').strip() for key in ffe_import.HEADER_ALIASES})
+        result = volume_kd.calculate_batch([item])[0]
+    except ValueError as ve:
+        return jsonify({'success': False, 'message': str(ve)}), 400
+    return jsonify({'success': True, 'result': result})
+
+
+@calculator_bp.route('/kdsize/import', methods=['POST'])
+@require(Perm.IMPORT_FFE)
+def kdsize_import():
+    """
+    FFE 清单导入：上传 XLSX / TSV 文件（file）或粘贴表格文本（text）
+    可选 project_id：逐块写入该项目明细（需编辑项目权限；仅限权限范围内的项目，见 project_scope()）；
+    KD 规则表仍为暂定值时不接受 project_id，只返回估算汇总
+    返回按房间与整单汇总的 CBM
+    """
+    upload = request.files.get('file')
+    project = None
+    project_id = request.form.get('project_id', type=int)
+    if project_id and volume_kd.TABLES_PROVISIONAL:
+        return jsonify({'success': False, 'message': 'KD 规则表尚未按原版计算器核对，暂不支持写入项目，请去掉项目后仅做估算'}), 409
+    if project_id:
+        if not has_perm(Perm.EDIT_PROJECTS):
+            return jsonify({'success': False, 'message': '没有编辑项目的权限'}), 403
+        project = ProjectService.get_project(project_id, **project_scope())
+        if not project:
+            return jsonify({'success': False, 'message': '项目不存在或无权限访问'}), 404
+
+    on_chunk = None
+    if project:
+        def on_chunk(items, results):
+            ProjectService.add_items_bulk(project.id, ffe_import.project_item_rows(items, results))
+
+    try:
+        rows = ffe_import.iter_source_rows(
+            filename=upload.filename if upload else None,
+            stream=upload.stream if upload else None,
+            text=request.form.get('text')
+        )
+        summary = ffe_import.import_rows(
+            rows,
+            chunk_size=current_app.config.get('FFE_IMPORT_CHUNK_SIZE', ffe_import.CHUNK_SIZE),
+            on_chunk=on_chunk
+        )
+    except ValueError as ve:
+        return jsonify({'success': False, 'message': str(ve)}), 400
+    except Exception as e:
+        current_app.logger.error(f"FFE 清单导入失败: {str(e)}", exc_info=True)
+        return jsonify({'success': False, 'message': '导入失败，请检查文件格式或联系管理员'}), 500
+
+    current_app.logger.info(
+        f"FFE 清单导入完成: {summary['rows']} 行, {summary['total_volume_m3']} m³, "
+        f"失败 {summary['error_count']} 行 (用户: {current_user.username}, 项目: {project_id or '-'})"
+    )
+    return jsonify({
+        'success': True, 'project_id': project.id if project else None,
+        'provisional': volume_kd.TABLES_PROVISIONAL, **summary
+    })
@@ -1,69 +1,118 @@
-# app/routes/export.py
+# 文件路径：app/routes/export.py
+# 更新日期：2026-10-19
+# 功能说明：导出功能蓝图，支持 CSV / JSON 流式导出（服务层按批读取、逐行生成，配合 gzip 协商压缩），需要登录保护，部分路由仅管理员可用
+
 """
 导出功能蓝图
-支持 Excel、CSV、PDF 等格式的报表导出
+支持 Excel、CSV、JSON 等格式的报表导出
 需要登录保护，部分路由仅管理员可用
 """
 
-from flask import Blueprint, Response, request, flash, redirect, url_for, current_app
+import csv
+import io
+import itertools
+import json
+import time
+from flask import Blueprint, Response, request, flash, redirect, url_for, current_app, stream_with_context
 from flask_login import login_required, current_user
 from datetime import datetime
-import io
-import csv
-from typing import Dict, Any
+from typing import Dict, Any, Iterable
+
+from app.models import User
+from app.services.project_service import ProjectService
+from app.utils.prometheus import EXPORT_DURATION
+from app.utils.tracing import start_span
+from app.utils.optional_deps import optional_import
+from app.utils.permissions import Perm, require
 
 # 假设未来会引入 openpyxl 或 pandas 用于 Excel 复杂导出
 # 这里先实现简单 CSV + Excel 基础版（可后续升级 openpyxl）
-try:
-    import pandas as pd
-    HAS_PANDAS = True
-except ImportError:
-    HAS_PANDAS = False
-    current_app.logger.warning("pandas 未安装，Excel 导出功能受限，仅支持 CSV")
-
-from app.models import User, Project  # 假设已有 Project 模型
-from app import db
+# pandas 为可选依赖：模块导入时只检查是否安装，真正生成 Excel 时才导入（导入耗时数百毫秒）
+pd = optional_import('pandas')
+HAS_PANDAS = pd.available
 
 export_bp = Blueprint('export', __name__, url_prefix='/export')
 
 
 @export_bp.before_request
-@login_required
+@require(Perm.EXPORT_DATA)
 def require_login():
-    """所有导出路由都需要登录"""
+    """所有导出路由都需要登录且拥有导出权限"""
     pass
 
 
-def generate_csv(data: list[Dict[str, Any]], filename: str) -> Response:
-    """生成 CSV 响应"""
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=data[0].keys() if data else [])
+def _timed(chunks: Iterable[str], fmt: str) -> Iterable[str]:
+    """
+    包装流式生成器：从开始到最后一块输出完毕（或客户端断开）计入导出耗时指标与追踪区段 export.<格式>
+    （区段开在生成器内部，覆盖逐批查库与输出，而不是只覆盖构造 Response）
+    """
+    start = time.perf_counter()
+    try:
+        with start_span(f'export.{fmt}'):
+            yield from chunks
+    finally:
+        EXPORT_DURATION.observe(time.perf_counter() - start, format=fmt)
+
+
+def _iter_csv(rows: Iterable[Dict[str, Any]]) -> Iterable[str]:
+    """逐行生成 CSV 文本（首块带 BOM，兼容 Excel 打开中文；表头取第一行的键）"""
+    rows = iter(rows)
+    first = next(rows, None)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(first.keys()) if first else [])
     writer.writeheader()
-    writer.writerows(data)
-
-    output.seek(0)
+    yield '\ufeff' + buffer.getvalue()
+    if first is None:
+        return
+
+    for row in itertools.chain([first], rows):
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+
+def generate_csv(data: Iterable[Dict[str, Any]], filename: str) -> Response:
+    """
+    生成 CSV 流式响应（是否 gzip 由 app.utils.compression 按 Accept-Encoding 协商）
+    data 可以是惰性生成器：输出期间保持请求上下文（数据库会话、追踪上下文），输出结束才收尾
+    """
     return Response(
-        output.getvalue(),
+        stream_with_context(_timed(_iter_csv(data), 'csv')),
         mimetype='text/csv',
         headers={
             'Content-Disposition': f'attachment; filename="{filename}"',
-            'Content-Type': 'text/csv; charset=utf-8-sig'  # 支持中文 Excel
+            'Content-Type': 'text/csv; charset=utf-8'
         }
     )
 
 
+def _iter_json(rows: Iterable[Dict[str, Any]]) -> Iterable[str]:
+    """逐条生成 JSON 数组文本，避免一次性 dumps 整个列表"""
+    yield '['
+    for index, row in enumerate(rows):
+        yield (',' if index else '') + json.dumps(row, ensure_ascii=False, default=str)
+    yield ']'
+
+
+def generate_json(data: Iterable[Dict[str, Any]], filename: str) -> Response:
+    """生成 JSON 流式下载响应（data 同 generate_csv，可为惰性生成器）"""
+    return Response(
+        stream_with_context(_timed(_iter_json(data), 'json')),
+        mimetype='application/json',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
 @export_bp.route('/users.csv', methods=['GET'])
-@login_required
+@require(Perm.EXPORT_USERS)
 def export_users_csv():
-    """导出用户列表（仅管理员）"""
-    if not current_user.is_admin:
-        flash('只有管理员可以导出用户数据', 'danger')
-        return redirect(url_for('main.dashboard'))
+    """导出用户列表（需导出用户列表权限）"""
 
     users = User.query.all()
     if not users:
         flash('暂无用户数据可导出', 'info')
-        return redirect(url_for('admin.users_list'))  # 假设有 admin 路由
+        return redirect(url_for('admin.system_users'))
 
     data = [
         {
@@ -87,29 +136,23 @@ def export_users_csv():
 @login_required
 def export_projects_csv():
     """导出项目列表（所有登录用户可见）"""
-    # 假设 Project 模型已有 owner_id、name、status、volume_m3、freight_usd 等字段
-    projects = Project.query.filter_by(owner_id=current_user.id).all()  # 先只导出自己的
-    # 如果是管理员，可放开全部： Project.query.all()
-
-    if not projects:
+    rows = ProjectService.iter_export_rows(current_user.id)
+    first = next(rows, None)   # 只取第一行判断是否为空，其余行在输出时逐批读取
+    if first is None:
         flash('您暂无项目可导出', 'info')
         return redirect(url_for('main.dashboard'))
 
-    data = [
-        {
-            '项目ID': p.id,
-            '项目名称': p.name,
-            '状态': p.status or '未知',
-            '总体积(m³)': round(p.volume_m3 or 0, 3),
-            '总运费(USD)': round(p.freight_usd or 0, 2),
-            '创建者': p.owner.username if p.owner else '未知',
-            '创建时间': p.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
-        for p in projects
-    ]
-
     filename = f"projects_{current_user.username}_{datetime.now().strftime('%Y%m%d')}.csv"
-    return generate_csv(data, filename)
+    return generate_csv(itertools.chain([first], rows), filename)
+
+
+@export_bp.route('/projects.json', methods=['GET'])
+@login_required
+def export_projects_json():
+    """导出项目列表（JSON 格式，便于其他系统对接）"""
+    data = ProjectService.iter_export_rows(current_user.id)
+    filename = f"projects_{current_user.username}_{datetime.now().strftime('%Y%m%d')}.json"
+    return generate_json(data, filename)
 
 
 # 未来可扩展：Excel 版本（依赖 openpyxl 或 pandas）
@@ -117,6 +160,7 @@ def export_projects_csv():
 @login_required
 def export_projects_excel():
     if not HAS_PANDAS:
+        current_app.logger.warning("pandas 未安装，Excel 导出功能受限，仅支持 CSV")
         flash('服务器未安装 pandas，无法生成 Excel 文件，请使用 CSV 导出', 'warning')
         return redirect(url_for('export.export_projects_csv'))
 
@@ -1,11 +1,13 @@
 # 文件路径：app/routes/main.py
-# 更新日期：2026-02-17
+# 更新日期：2026-10-19
 # 功能说明：主蓝图路由集合，负责仪表盘、个人中心、关于、帮助、设置等非管理类页面；严格遵守路由层薄原则，所有业务逻辑（如统计、用户更新）应逐步迁移到 service 层（当前版本部分仍直接操作模型，待重构）
 
-from flask import Blueprint, render_template, flash, redirect, url_for, request
+from flask import Blueprint, render_template, flash, redirect, url_for, request, current_app
 from flask_login import login_required, current_user, logout_user
 from datetime import datetime
 from app import db
+from app.services.project_service import ProjectService
+from app.utils.session_epoch import notify_sessions_revoked
 from app.forms.settings_forms import ProfileForm, PreferencesForm, ChangePasswordForm  # 假设表单已移到 forms/settings_forms.py
 
 main_bp = Blueprint('main', __name__)
@@ -24,17 +26,21 @@ def require_login():
 def dashboard():
     """
     系统仪表盘首页（已登录用户默认入口）
-    当前统计数据为占位，后续应调用 UserService 或 ProjectService 获取真实数据
+    项目统计与未读通知数读取 user_stats 汇总行（主键查询一次），不再逐条汇总项目明细
+    统计面板按 (用户, 数据版本) 缓存渲染结果，汇总变化时版本号递增自动失效
     """
-    # 占位统计数据（后续替换为 service 调用）
     stats = {
-        'project_count': 0,              # 项目总数
-        'active_projects': 0,            # 进行中项目
-        'pending_tasks': 0,              # 待办事项
-        'unread_notifications': 0,       # 未读通知
-        'total_volume_m3': 0.0,          # 累计体积（m³）
-        'total_freight_usd': 0.0,        # 累计运费（USD）
+        'pending_tasks': 0,              # 待办事项（待办模块未实现，占位）
     }
+    # data_version / project_count / active_projects / total_volume_m3 / total_freight_usd / unread_notifications
+    stats.update(ProjectService.get_dashboard_stats(current_user.id))
+
+    stats_html = current_app.extensions['fragment_cache'].get_or_render(
+        'dashboard_stats',
+        current_user.id,
+        stats['data_version'],
+        lambda: render_template('main/_dashboard_stats.html', stats=stats)
+    )
 
     context = {
         'title': '仪表盘 - FFE 项目跟进系统',
@@ -47,6 +53,7 @@ def dashboard():
         ),
         'current_time': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
         'stats': stats,
+        'stats_html': stats_html,
     }
 
     if not current_user.last_login_at:
@@ -119,7 +126,9 @@ def settings():
                 current_user.set_password(pwd_form.new_password.data)
                 current_user.last_login_at = datetime.utcnow()  # 可选：记录修改时间
                 current_user.reset_failed_attempts()  # 清零失败次数（如果模型有此方法）
+                current_user.revoke_sessions()  # 其他设备上的会话一并失效
                 db.session.commit()
+                notify_sessions_revoked()
                 flash('密码修改成功，请使用新密码重新登录', 'success')
                 logout_user()
                 return redirect(url_for('auth.login'))
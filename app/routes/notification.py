@@ -0,0 +1,109 @@
+# 文件路径：app/routes/notification.py
+# 更新日期：2026-10-19
+# 功能说明：站内通知蓝图，负责个人通知列表页面、标记已读、打开通知跳转，以及导航栏角标使用的长轮询接口（未读数不变时挂起等待，有新通知立即返回）
+
+import time
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
+from flask_login import login_required, current_user
+from app import db
+from app.services.notification_service import NotificationService, is_local_link
+
+notification_bp = Blueprint('notification', __name__, url_prefix='/notifications')
+
+PAGE_SIZE = 20
+
+
+@notification_bp.before_request
+@login_required
+def require_login():
+    """所有通知路由默认要求登录（统一保护）"""
+    pass
+
+
+def _wants_json() -> bool:
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest' or 'application/json' in request.headers.get('Accept', '')
+
+
+@notification_bp.route('/', methods=['GET'])
+def notification_list():
+    """我的通知（?unread=1 仅看未读，?before=<ID> 翻页）"""
+    only_unread = request.args.get('unread') == '1'
+    notifications = NotificationService.list_notifications(
+        current_user.id,
+        limit=PAGE_SIZE + 1,
+        before_id=request.args.get('before', type=int),
+        only_unread=only_unread
+    )
+    has_more = len(notifications) > PAGE_SIZE
+    notifications = notifications[:PAGE_SIZE]
+    return render_template(
+        'notification/list.html',
+        title='我的通知',
+        notifications=notifications,
+        only_unread=only_unread,
+        next_before=notifications[-1].id if has_more else None
+    )
+
+
+@notification_bp.route('/read', methods=['POST'])
+def mark_read():
+    """标记已读：表单 / JSON 中的 ids 为空时标记全部"""
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids') if data else request.form.getlist('ids', type=int)
+    try:
+        ids = [int(i) for i in ids] if ids else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': '无效的通知ID'}), 400
+
+    marked = NotificationService.mark_read(current_user.id, ids)
+    if _wants_json():
+        return jsonify({'success': True, 'marked': marked, 'unread': NotificationService.unread_count(current_user.id)})
+    flash(f'已将 {marked} 条通知标记为已读', 'success')
+    return redirect(url_for('notification.notification_list'))
+
+
+@notification_bp.route('/<int:notification_id>/open', methods=['POST'])
+def open_notification(notification_id):
+    """标记单条已读后跳转到通知链接（无链接时回到列表）"""
+    notification = NotificationService.get_notification(current_user.id, notification_id)
+    if not notification:
+        flash('通知不存在', 'danger')
+        return redirect(url_for('notification.notification_list'))
+    link = notification.link
+    NotificationService.mark_read(current_user.id, [notification_id])
+    # 写入时已校验，跳转前再校验一次（历史数据 / 直接写库的记录）
+    if link and not is_local_link(link):
+        current_app.logger.warning(f"通知链接不是站内路径，已忽略: id={notification_id} link={link!r}")
+        link = None
+    return redirect(link or url_for('notification.notification_list'))
+
+
+@notification_bp.route('/poll', methods=['GET'])
+def poll():
+    """
+    长轮询：?since=<客户端已知未读数>
+    未读数与 since 不同立即返回；相同则挂起至多 NOTIFICATION_LONG_POLL_SECONDS 秒，期间有新通知立即返回
+    本 worker 挂起数已满时立即返回并带 retry_after（秒），客户端按普通轮询退避
+    """
+    user_id = current_user.id
+    since = request.args.get('since', type=int)
+    unread = NotificationService.unread_count(user_id)
+    if since is None or unread != since:
+        return jsonify({'unread': unread})
+
+    hub = current_app.extensions['notification_hub']
+    if not hub.enter():
+        return jsonify({'unread': unread, 'retry_after': int(hub.fallback_seconds * 5)})
+    try:
+        # 挂起期间不占用数据库连接（也不持有 SQLite 读事务）
+        db.session.close()
+        deadline = time.monotonic() + current_app.config.get('NOTIFICATION_LONG_POLL_SECONDS', 25)
+        while hub.wait(user_id, deadline - time.monotonic()):
+            # 其他 worker 的写入会唤醒全部挂起者，计数未变时继续等待剩余时间
+            unread = NotificationService.unread_count(user_id)
+            db.session.close()
+            if unread != since:
+                break
+        return jsonify({'unread': unread})
+    finally:
+        hub.leave()
@@ -0,0 +1,75 @@
+# 文件路径：app/routes/project.py
+# 更新日期：2026-10-19
+# 功能说明：项目跟进蓝图路由集合，负责项目列表、项目详情（含房型 BOM 汇总）页面与房型 BOM 录入接口，只调用 ProjectService，列表直接展示项目表上的增量汇总值
+
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask_login import login_required, current_user
+from app.models import Project
+from app.services.project_service import ProjectService
+from app.utils.permissions import Perm, require, has_any_perm, project_scope
+
+project_bp = Blueprint('project', __name__, url_prefix='/project')
+
+
+@project_bp.before_request
+@require(Perm.VIEW_PROJECTS)
+def require_login():
+    """所有项目路由默认要求登录且拥有查看项目权限（统一保护）"""
+    pass
+
+
+@project_bp.route('/', methods=['GET'])
+def project_list():
+    """我的项目列表（有查看全部 / 本部门项目权限者可通过 ?all=1 查看权限范围内的全部项目）"""
+    status = request.args.get('status') or None
+    show_all = has_any_perm(Perm.VIEW_ALL_PROJECTS | Perm.VIEW_DEPARTMENT_PROJECTS) and request.args.get('all') == '1'
+
+    scope = project_scope() if show_all else {'owner_id': current_user.id}
+    projects = ProjectService.get_project_list(status=status, **scope)
+    return render_template(
+        'project/list.html',
+        title='项目管理',
+        projects=projects,
+        statuses=Project.STATUSES,
+        current_status=status,
+        show_all=show_all,
+        stats=ProjectService.get_dashboard_stats(current_user.id)
+    )
+
+
+@project_bp.route('/<int:project_id>', methods=['GET'])
+def project_detail(project_id):
+    """项目详情：基本信息 + 汇总值 + 明细列表"""
+    project = ProjectService.get_project(project_id, **project_scope())
+    if not project:
+        flash('项目不存在或无权限访问', 'danger')
+        return redirect(url_for('project.project_list'))
+
+    return render_template(
+        'project/detail.html',
+        title=f'项目 - {project.name}',
+        project=project,
+        bom=ProjectService.get_bom(project.id) if project.room_types else None
+    )
+
+
+@project_bp.route('/<int:project_id>/room-types', methods=['POST'])
+@require(Perm.EDIT_PROJECTS)
+def room_type_create(project_id):
+    """
+    新增房型 BOM（JSON）：{"name": "King Standard", "room_count": 240, "items": [...]}
+    items 每项为单间家具：category / width / depth / height / packing / kd_level / quantity / unit_price_usd
+    """
+    project = ProjectService.get_project(project_id, **project_scope())
+    if not project:
+        return jsonify({'success': False, 'message': '项目不存在或无权限访问'}), 404
+
+    data = request.get_json(silent=True) or {}
+    try:
+        room_type = ProjectService.create_room_type(
+            project.id, data.get('name'), data.get('room_count') or 1, data.get('items') or []
+        )
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    return jsonify({'success': True, 'room_type_id': room_type.id, 'bom': ProjectService.get_bom(project.id)})
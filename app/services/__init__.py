@@ -1,5 +1,5 @@
 # 文件路径：app/services/__init__.py
-# 更新日期：2026-02-17
+# 更新日期：2026-10-19
 # 功能说明：服务层模块统一入口文件，便于路由层或其他模块以简洁方式导入所有服务类/函数，避免长路径导入，提高代码可读性和维护性
 
 """
@@ -21,9 +21,20 @@ from .user_service import UserService
 # 系统设置服务
 from .settings_service import SettingsService
 
+# 项目管理服务
+from .project_service import ProjectService
+
+# 角色权限服务
+from .permission_service import PermissionService
+
+# 站内通知服务
+from .notification_service import NotificationService
+
 # 计算相关服务（按需导入子模块）
 from .calc import shipping
 from .calc import volume_kd
+from .calc import ffe_import
+from .calc import bom
 
 # 如果 calc 目录下未来有更多计算服务，可以在这里统一暴露
 # 示例：from .calc.volume_kd import VolumeKDService  # 如果改为类形式
@@ -32,6 +43,9 @@ from .calc import volume_kd
 SERVICES = {
     'user': UserService,
     'settings': SettingsService,
+    'project': ProjectService,
+    'permission': PermissionService,
+    'notification': NotificationService,
     # 'auth': {  # 如果未来想包装 auth 函数为对象，可在此添加
     #     'login_attempt': login_attempt,
     #     'get_post_login_redirect': get_post_login_redirect,
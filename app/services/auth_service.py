@@ -1,14 +1,18 @@
 # 文件路径：app/services/auth_service.py
-# 更新日期：2026-02-17
+# 更新日期：2026-10-19
 # 功能说明：认证相关核心业务逻辑，包括登录尝试、密码验证、登录后重定向逻辑、安全登出处理等，所有数据库操作封装在此层，路由层不应直接访问 User 模型
 
 from flask import current_app, request, url_for
 from flask_login import login_user, logout_user, current_user
 from app import db
 from app.models import User
-from datetime import datetime
+from app.utils.prometheus import LOGIN_ATTEMPTS
+from app.utils.tracing import traced
+from datetime import datetime, timedelta
+from sqlalchemy import or_
 
 
+@traced('auth.login_attempt')
 def login_attempt(username: str, password: str, remember: bool = False) -> tuple[bool, str | None, User | None]:
     """
     尝试用户登录，返回三元组：
@@ -22,10 +26,12 @@ def login_attempt(username: str, password: str, remember: bool = False) -> tuple
     user = User.query.filter_by(username=username).first()
 
     if not user:
+        LOGIN_ATTEMPTS.inc(result='unknown_user')
         return False, "用户名不存在", None
 
     # 检查是否锁定
     if user.is_locked():
+        LOGIN_ATTEMPTS.inc(result='locked')
         return False, "账号已被锁定，请稍后再试", None
 
     # 验证密码
@@ -33,11 +39,14 @@ def login_attempt(username: str, password: str, remember: bool = False) -> tuple
         user.record_failed_attempt()
         db.session.commit()
         if user.is_locked():
+            LOGIN_ATTEMPTS.inc(result='lockout')
             return False, "密码错误次数过多，账号已临时锁定", None
+        LOGIN_ATTEMPTS.inc(result='failure')
         return False, "密码错误", None
 
     # 检查账号是否启用
     if not user.is_active:
+        LOGIN_ATTEMPTS.inc(result='disabled')
         return False, "账号已被禁用，请联系管理员", None
 
     # 登录成功
@@ -47,6 +56,7 @@ def login_attempt(username: str, password: str, remember: bool = False) -> tuple
 
     # 执行登录（设置 session）
     login_user(user, remember=remember)
+    LOGIN_ATTEMPTS.inc(result='success')
 
     current_app.logger.info(f"用户登录成功: {username} (ID: {user.id})")
     return True, None, user
@@ -77,6 +87,20 @@ def safe_logout() -> None:
         current_app.logger.debug("尝试登出时未检测到已登录用户")
 
 
+def persist_last_seen(user_id: int, seen_at: datetime, min_interval_seconds: int) -> bool:
+    """
+    写入最近活动时间：条件更新，数据库中的值比 seen_at 早不到 min_interval_seconds 时不写
+    （多个 worker / 多个会话同时刷新同一用户时只有一条真正落库），返回是否更新
+    """
+    threshold = seen_at - timedelta(seconds=min_interval_seconds)
+    updated = User.query.filter(
+        User.id == user_id,
+        or_(User.last_seen_at.is_(None), User.last_seen_at < threshold)
+    ).update({User.last_seen_at: seen_at}, synchronize_session=False)
+    db.session.commit()
+    return bool(updated)
+
+
 def record_login_success(user: User) -> None:
     """
     记录成功登录（备用函数，已在 login_attempt 中调用）
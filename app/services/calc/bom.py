@@ -0,0 +1,94 @@
+# 文件路径：app/services/calc/bom.py
+# 更新日期：2026-10-19
+# 功能说明：酒店项目房型 BOM 展开计算（纯函数），按唯一条目签名只计算一次 KD 体积与费用，再按每间件数 × 房间数放大，汇总到房型与整个项目
+
+from app.utils.tracing import traced
+from . import volume_kd
+
+
+def item_signature(item: dict) -> tuple:
+    """
+    条目签名：决定单件体积与单价的全部字段
+    不同房型中签名相同的家具（如同款床头柜）共享一次计算结果
+    """
+    return (
+        item['category'],
+        float(item['width']) if item.get('width') else None,
+        float(item['depth']) if item.get('depth') else None,
+        float(item['height']) if item.get('height') else None,
+        item.get('packing') or 'kd',
+        item.get('kd_level') or 'standard',
+        float(item.get('unit_price_usd') or 0.0),
+    )
+
+
+def _unit_cost(signature: tuple, freight_rate: float) -> dict:
+    """单件成本：货值 = 单价，运费 = 建议报立方 × 海运单价"""
+    category, width, depth, height, packing, kd_level, unit_price = signature
+    result = volume_kd.calculate(category, width, depth, height, packing, kd_level)
+    return {
+        'volume_m3': result['volume_m3'],
+        'suggested_m3': result['suggested_m3'],
+        'goods_usd': unit_price,
+        'freight_usd': result['suggested_m3'] * freight_rate,
+    }
+
+
+@traced('calc.bom.expand')
+def expand(room_types: list[dict], freight_rate: float = 0.0) -> dict:
+    """
+    展开房型 BOM 并汇总
+
+    room_types：[{'name', 'room_count', 'items': [{'category', 'width', 'depth', 'height',
+                  'packing', 'kd_level', 'quantity', 'unit_price_usd'}]}]
+    计算量只与“唯一签名数 + 房型条目数”相关，与房间数无关（600 间客房与 1 间成本相同）
+
+    返回：
+        {'room_types': [{'name', 'room_count', 'pieces_per_room', 'pieces',
+                         'volume_m3', 'suggested_m3', 'goods_usd', 'freight_usd', 'total_usd'}],
+         'totals': {同上汇总字段 + 'room_count'}, 'unique_items': 唯一签名数}
+    """
+    freight_rate = float(freight_rate or 0.0)
+    unit_costs: dict[tuple, dict] = {}
+    fields = ('volume_m3', 'suggested_m3', 'goods_usd', 'freight_usd')
+
+    rows = []
+    totals = {'room_count': 0, 'pieces': 0, **{field: 0.0 for field in fields}}
+    for room_type in room_types:
+        room_count = int(room_type.get('room_count') or 0)
+
+        # 单间合计：每个条目按签名取（或首次计算）单件成本 × 每间件数
+        per_room = {field: 0.0 for field in fields}
+        pieces_per_room = 0
+        for item in room_type.get('items', ()):
+            signature = item_signature(item)
+            unit = unit_costs.get(signature)
+            if unit is None:
+                unit = unit_costs[signature] = _unit_cost(signature, freight_rate)
+            quantity = int(item.get('quantity') or 1)
+            pieces_per_room += quantity
+            for field in fields:
+                per_room[field] += unit[field] * quantity
+
+        # 房型合计 = 单间合计 × 房间数
+        row = {
+            'name': room_type.get('name'),
+            'room_count': room_count,
+            'pieces_per_room': pieces_per_room,
+            'pieces': pieces_per_room * room_count,
+        }
+        for field in fields:
+            row[field] = per_room[field] * room_count
+            totals[field] += row[field]
+        totals['room_count'] += room_count
+        totals['pieces'] += row['pieces']
+        rows.append(row)
+
+    for record in rows + [totals]:
+        for field in ('volume_m3', 'suggested_m3'):
+            record[field] = round(record[field], 3)
+        for field in ('goods_usd', 'freight_usd'):
+            record[field] = round(record[field], 2)
+        record['total_usd'] = round(record['goods_usd'] + record['freight_usd'], 2)
+
+    return {'room_types': rows, 'totals': totals, 'unique_items': len(unit_costs)}
@@ -0,0 +1,267 @@
+# 文件路径：app/services/calc/ffe_import.py
+# 更新日期：2026-10-19
+# 功能说明：FFE 清单导入管线，逐行读取 XLSX（openpyxl 只读模式）或粘贴的 TSV 文本，表头映射到品类/尺寸/包装列，分块校验后整批送入 KD 体积计算，返回按房间与项目汇总的 CBM，全程不整表载入内存
+
+import csv
+import io
+from collections import defaultdict
+from app.utils.optional_deps import optional_import
+from app.utils.tracing import traced
+from . import volume_kd
+
+# XLSX 读取依赖 openpyxl（可选，首次解析 XLSX 时才导入）
+openpyxl = optional_import('openpyxl')
+HAS_OPENPYXL = openpyxl.available
+
+# 每块校验 / 计算的行数
+CHUNK_SIZE = 500
+# 错误明细最多返回条数（超出只计数）
+MAX_ERRORS = 200
+
+# 表头别名（中英文 / 常见 FFE 清单写法均可，匹配时忽略大小写与首尾空格）
+HEADER_ALIASES = {
+    'room': ('room', 'room type', 'area', 'location', '房间', '房型', '区域', '位置'),
+    'name': ('name', 'item', 'description', 'item name', '产品名称', '名称', '品名', '描述'),
+    'model': ('model', 'code', 'item code', 'ref', '型号', '编号', '产品编号'),
+    'category': ('category', 'type', '品类', '类别', '家具类别'),
+    'width': ('w', 'width', 'w(mm)', '宽', '宽度', '宽(mm)'),
+    'depth': ('d', 'depth', 'd(mm)', '深', '深度', '深(mm)'),
+    'height': ('h', 'height', 'h(mm)', '高', '高度', '高(mm)'),
+    'packing': ('packing', 'package', '包装', '包装方式'),
+    'kd_level': ('kd level', 'kd', '压薄', '压薄程度'),
+    'quantity': ('qty', 'quantity', 'q\'ty', '数量'),
+}
+
+_ALIAS_LOOKUP = {
+    alias.lower(): field
+    for field, aliases in HEADER_ALIASES.items()
+    for alias in aliases
+}
+
+DEFAULT_ROOM = '未分配'
+
+
+# ──────────────────────────────────────────────
+# 行读取（生成器，逐行产出原始单元格）
+# ──────────────────────────────────────────────
+
+def iter_xlsx_rows(stream):
+    """逐行读取 XLSX 第一个工作表（只读模式，按需解压 XML，不构建整表对象）"""
+    if not HAS_OPENPYXL:
+        raise ValueError("服务器未安装 openpyxl，无法解析 XLSX，请改用粘贴 TSV 文本")
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        for row in sheet.iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def iter_tsv_rows(source):
+    """逐行读取 TSV：source 可为粘贴的字符串或二进制文件流（按行解码，不整体读入）"""
+    if isinstance(source, str):
+        text = io.StringIO(source)
+    else:
+        text = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+    yield from csv.reader(text, delimiter='\t')
+
+
+def iter_source_rows(filename: str | None = None, stream=None, text: str | None = None):
+    """根据输入类型选择行读取器：上传 .xlsx / .tsv / .txt 文件，或粘贴文本"""
+    if stream is not None and filename:
+        ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        if ext == 'xlsx':
+            return iter_xlsx_rows(stream)
+        if ext in ('tsv', 'txt'):
+            return iter_tsv_rows(stream)
+        raise ValueError("仅支持 XLSX / TSV 文件")
+    if text and text.strip():
+        return iter_tsv_rows(text)
+    raise ValueError("请上传 FFE 清单文件或粘贴表格内容")
+
+
+# ──────────────────────────────────────────────
+# 表头映射与行校验
+# ──────────────────────────────────────────────
+
+def _cell(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def map_header(row) -> dict[int, str]:
+    """表头行 → {列序号: 标准字段}；缺少品类列时视为无效表头"""
+    column_map = {}
+    for index, header in enumerate(row):
+        field = _ALIAS_LOOKUP.get(_cell(header).lower())
+        if field and field not in column_map.values():
+            column_map[index] = field
+    return column_map
+
+
+def _to_mm(value: str, label: str) -> float | None:
+    if not value:
+        return None
+    try:
+        number = float(value.replace(',', ''))
+    except ValueError:
+        raise ValueError(f"{label}不是有效数字: {value}")
+    if number <= 0:
+        raise ValueError(f"{label}必须大于 0")
+    return number
+
+
+def validate_row(record: dict) -> dict:
+    """
+    单行校验与归一化：品类 / 包装 / 压薄转为代码，尺寸与数量转为数值
+    未填写的尺寸留空，由 KD 引擎套用品类默认值；校验失败抛出 ValueError
+    """
+    category = volume_kd.resolve_category(record.get('category'))
+    if not category:
+        raise ValueError(f"无法识别的品类: {record.get('category') or '(空)'}")
+    packing = volume_kd.resolve_packing(record.get('packing'))
+    if not packing:
+        raise ValueError(f"无法识别的包装方式: {record.get('packing')}")
+    kd_level = volume_kd.resolve_kd_level(record.get('kd_level'))
+    if not kd_level:
+        raise ValueError(f"无法识别的 KD 压薄程度: {record.get('kd_level')}")
+
+    quantity_text = record.get('quantity') or '1'
+    try:
+        quantity = int(float(quantity_text))
+    except ValueError:
+        raise ValueError(f"数量不是有效数字: {quantity_text}")
+    if quantity < 1:
+        raise ValueError("数量必须大于 0")
+
+    return {
+        'room': record.get('room') or DEFAULT_ROOM,
+        'name': record.get('name') or volume_kd.CATEGORIES[category]['name'],
+        'model': record.get('model') or None,
+        'category': category,
+        'width': _to_mm(record.get('width'), '宽'),
+        'depth': _to_mm(record.get('depth'), '深'),
+        'height': _to_mm(record.get('height'), '高'),
+        'packing': packing,
+        'kd_level': kd_level,
+        'quantity': quantity,
+    }
+
+
+# ──────────────────────────────────────────────
+# 导入管线
+# ──────────────────────────────────────────────
+
+@traced('calc.ffe_import.rows')
+def import_rows(rows, chunk_size: int = CHUNK_SIZE, on_chunk=None) -> dict:
+    """
+    消费行迭代器（第一条非空行为表头），每满 chunk_size 行即整批计算并累加汇总，
+    计算完的块随即丢弃，内存占用只与块大小相关
+
+    on_chunk(items, results)：可选回调，每块计算完成后调用（如写入项目明细）
+
+    返回：
+        {'rows', 'total_quantity', 'total_volume_m3', 'total_suggested_m3',
+         'rooms': [{'room', 'items', 'quantity', 'volume_m3', 'suggested_m3'}],
+         'error_count', 'errors': [{'row', 'error'}]}
+    """
+    chunk_size = max(int(chunk_size or CHUNK_SIZE), 1)
+    rooms = defaultdict(lambda: {'items': 0, 'quantity': 0, 'volume_m3': 0.0, 'suggested_m3': 0.0})
+    summary = {'rows': 0, 'error_count': 0, 'errors': []}
+
+    def add_error(row_no, message):
+        summary['error_count'] += 1
+        if len(summary['errors']) < MAX_ERRORS:
+            summary['errors'].append({'row': row_no, 'error': message})
+
+    def flush(chunk):
+        if not chunk:
+            return
+        results = volume_kd.calculate_batch(chunk)
+        for item, result in zip(chunk, results):
+            room = rooms[item['room']]
+            room['items'] += 1
+            room['quantity'] += result['quantity']
+            room['volume_m3'] += result['line_volume_m3']
+            room['suggested_m3'] += result['line_suggested_m3']
+        summary['rows'] += len(chunk)
+        if on_chunk is not None:
+            on_chunk(chunk, results)
+
+    column_map = None
+    chunk = []
+    for row_no, row in enumerate(rows, start=1):
+        cells = [_cell(value) for value in row]
+        if not any(cells):
+            continue  # 跳过空行
+
+        if column_map is None:
+            column_map = map_header(cells)
+            if 'category' not in column_map.values():
+                raise ValueError("未找到表头行或缺少“品类 / Category”列")
+            continue
+
+        record = {
+            field: cells[index] if index < len(cells) else ''
+            for index, field in column_map.items()
+        }
+        try:
+            chunk.append(validate_row(record))
+        except ValueError as e:
+            add_error(row_no, str(e))
+            continue
+
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+
+    if column_map is None:
+        raise ValueError("导入内容为空")
+    flush(chunk)
+
+    room_list = [
+        {
+            'room': name,
+            'items': data['items'],
+            'quantity': data['quantity'],
+            'volume_m3': round(data['volume_m3'], 3),
+            'suggested_m3': round(data['suggested_m3'], 3),
+        }
+        for name, data in rooms.items()
+    ]
+    summary.update({
+        'total_quantity': sum(room['quantity'] for room in room_list),
+        'total_volume_m3': round(sum(data['volume_m3'] for data in rooms.values()), 3),
+        'total_suggested_m3': round(sum(data['suggested_m3'] for data in rooms.values()), 3),
+        'rooms': room_list,
+    })
+    return summary
+
+
+def project_item_rows(items: list[dict], results: list[dict]) -> list[dict]:
+    """
+    将一块计算结果转换为 ProjectService.add_items_bulk 所需的明细字典（单件体积取外箱体积）
+    KD 规则表仍为暂定值时拒绝转换，避免估算结果写入项目体积 / 运费
+    """
+    if volume_kd.TABLES_PROVISIONAL:
+        raise ValueError("KD 规则表尚未按原版计算器核对，计算结果暂不能写入项目明细")
+    rows = []
+    for item, result in zip(items, results):
+        dw, dd, dh = volume_kd.default_size(item['category'])
+        rows.append({
+            'room': item['room'],
+            'name': item['name'],
+            'model': item['model'],
+            'category': result['category_name'],
+            'width_mm': int(round(item['width'] or dw)),
+            'depth_mm': int(round(item['depth'] or dd)),
+            'height_mm': int(round(item['height'] or dh)),
+            'packing': volume_kd.PACKING_TYPES[result['packing']]['name'],
+            'quantity': result['quantity'],
+            'unit_volume_m3': result['volume_m3'],
+        })
+    return rows
@@ -0,0 +1,257 @@
+# 文件路径：app/services/calc/volume_kd.py
+# 更新日期：2026-10-19
+# 功能说明：KD 包装体积计算引擎（纯函数），包含家具品类默认尺寸、包装方式与 KD 压薄规则、外箱尺寸与建议报立方计算，供计算器页面、FFE 清单导入等共用；品类尺寸 / 层数 / 包装余量为暂定值（见 TABLES_PROVISIONAL），结果仅作估算
+
+"""
+KD 包装体积计算规则
+
+docs/module_kdsize_calculator.md 明确给出、可以信赖的部分：
+- 包装方式：KD平板包装 / 门+木架包装 / 散件+木架 / 全木箱
+- KD 压薄程度（仅 KD 有效）：标准KD 55mm / 压紧版 38mm / 极致压薄 22mm，镜柜额外 -30mm
+- 建议报立方：KD +0.02；其他包装 体积 ≥ 0.5m³ 时 +0.08，否则 +0.05
+- 体积保留三位小数，外箱尺寸四舍五入取整（mm）
+
+暂定部分（TABLES_PROVISIONAL = True）：文档要求与原版单文件 HTML 计算器结果完全一致，
+但未给出 26 个品类的默认尺寸、KD 板件层数、各包装方式余量与特殊品类规则，下列 CATEGORIES /
+PACKING_TYPES / SPECIAL_RULES 中的对应数值均为占位估算，须按原版计算器逐项替换核对后再将
+TABLES_PROVISIONAL 改为 False。在此之前计算结果只用于页面估算，不得写入项目明细（体积 / 运费）。
+"""
+
+import math
+from functools import lru_cache
+from app.utils.prometheus import CALC_BATCH_SIZE
+from app.utils.tracing import traced
+
+# ──────────────────────────────────────────────
+# 规则表
+# ──────────────────────────────────────────────
+
+# 规则表是否仍为暂定值：为 True 时计算结果不写入项目（见 ffe_import.project_item_rows）
+TABLES_PROVISIONAL = True
+
+# 品类代码 → 名称 / 分组 / 默认尺寸 (W, D, H) / KD 板件层数
+# 【暂定】默认尺寸与层数为占位估算，待按原版计算器核对
+CATEGORIES = {
+    # 床类
+    'headboard':      {'name': '床头板',     'group': '床类',     'size': (1900, 100, 1200), 'kd_layers': 1},
+    'bed_base':       {'name': '床箱',       'group': '床类',     'size': (1800, 2000, 300), 'kd_layers': 2},
+    'bed_finished':   {'name': '成品床',     'group': '床类',     'size': (1800, 2000, 450), 'kd_layers': 0},
+    'bench':          {'name': '床尾凳',     'group': '床类',     'size': (1400, 450, 450),  'kd_layers': 2},
+    # 柜类
+    'nightstand':     {'name': '床头柜',     'group': '柜类',     'size': (550, 450, 550),   'kd_layers': 3},
+    'wardrobe':       {'name': '衣柜',       'group': '柜类',     'size': (1200, 600, 2200), 'kd_layers': 4},
+    'tv_cabinet':     {'name': '电视柜',     'group': '柜类',     'size': (1800, 500, 750),  'kd_layers': 3},
+    'minibar':        {'name': '迷你吧柜',   'group': '柜类',     'size': (900, 550, 900),   'kd_layers': 3},
+    'luggage_rack':   {'name': '行李架',     'group': '柜类',     'size': (900, 550, 600),   'kd_layers': 2},
+    'dresser':        {'name': '书桌/梳妆台', 'group': '柜类',    'size': (1200, 550, 750),  'kd_layers': 3},
+    'mirror_cabinet': {'name': '镜柜',       'group': '柜类',     'size': (800, 150, 700),   'kd_layers': 2},
+    'vanity':         {'name': '浴室柜',     'group': '柜类',     'size': (1200, 550, 850),  'kd_layers': 3},
+    # 桌椅类
+    'desk_chair':     {'name': '书桌椅',     'group': '桌椅类',   'size': (550, 550, 850),   'kd_layers': 2},
+    'lounge_chair':   {'name': '休闲椅',     'group': '桌椅类',   'size': (750, 800, 800),   'kd_layers': 3},
+    'sofa':           {'name': '沙发',       'group': '桌椅类',   'size': (2000, 900, 800),  'kd_layers': 4},
+    'coffee_table':   {'name': '茶几',       'group': '桌椅类',   'size': (900, 600, 450),   'kd_layers': 2},
+    'side_table':     {'name': '边几',       'group': '桌椅类',   'size': (500, 500, 550),   'kd_layers': 2},
+    'dining_table':   {'name': '餐桌',       'group': '桌椅类',   'size': (1600, 900, 750),  'kd_layers': 2},
+    # 背景墙及装饰
+    'wall_panel':     {'name': '背景墙板',   'group': '背景墙类', 'size': (2400, 30, 1200),  'kd_layers': 0},
+    'wall_mirror':    {'name': '装饰镜',     'group': '背景墙类', 'size': (1000, 40, 1500),  'kd_layers': 0},
+    'skirting':       {'name': '踢脚线',     'group': '背景墙类', 'size': (2400, 20, 100),   'kd_layers': 0},
+    'door':           {'name': '室内门',     'group': '背景墙类', 'size': (900, 50, 2100),   'kd_layers': 0},
+    # 卫浴
+    'shower_glass':   {'name': '淋浴房玻璃', 'group': '卫浴',     'size': (1200, 10, 2000),  'kd_layers': 0},
+    'toilet':         {'name': '马桶',       'group': '卫浴',     'size': (700, 400, 800),   'kd_layers': 0},
+    'bathtub':        {'name': '浴缸',       'group': '卫浴',     'size': (1700, 800, 600),  'kd_layers': 0},
+    'basin':          {'name': '台盆',       'group': '卫浴',     'size': (600, 450, 200),   'kd_layers': 0},
+}
+
+# 包装方式 → 名称 / 每边外扩余量 (mm)
+# 【暂定】余量为占位估算，待按原版计算器核对
+PACKING_TYPES = {
+    'kd':          {'name': 'KD平板包装', 'margin': 50},
+    'door_frame':  {'name': '门+木架包装', 'margin': 80},
+    'loose_frame': {'name': '散件+木架',  'margin': 100},
+    'crate':       {'name': '全木箱',     'margin': 120},
+}
+
+# KD 压薄程度 → 名称 / 每层板件厚度 (mm)
+KD_LEVELS = {
+    'standard': {'name': '标准KD', 'thickness': 55},
+    'compact':  {'name': '压紧版', 'thickness': 38},
+    'extreme':  {'name': '极致压薄', 'thickness': 22},
+}
+
+MIRROR_CABINET_REDUCTION = 30      # 镜柜 KD 额外压薄 (mm)
+KD_MIN_THICKNESS = 22              # KD 外箱最薄厚度 (mm)
+
+# 特殊品类固定包装规则：品类 → (宽余量, 深余量, 高余量)，忽略所选包装方式
+# 【暂定】品类范围来自文档，余量为占位估算，待按原版计算器核对
+SPECIAL_RULES = {
+    'bed_finished': (100, 100, 100),   # 成品床整体出货，散件+木架余量
+    'wall_panel':   (60, 60, 60),      # 背景墙板本身为平板，纸箱+护角
+    'wall_mirror':  (80, 80, 80),      # 装饰镜加木架
+    'skirting':     (40, 40, 40),      # 踢脚线成捆打包
+    'shower_glass': (150, 100, 150),   # 淋浴房玻璃强制木架
+    'toilet':       (60, 60, 60),      # 马桶原厂纸箱
+}
+
+# 建议报立方加成
+SUGGEST_ADD_KD = 0.02
+SUGGEST_ADD_LARGE = 0.08
+SUGGEST_ADD_SMALL = 0.05
+SUGGEST_LARGE_THRESHOLD = 0.5      # m³
+
+# 名称 → 代码反查（支持中文名称 / 代码混用输入）
+_CATEGORY_LOOKUP = {code: code for code in CATEGORIES}
+_CATEGORY_LOOKUP.update({info['name']: code for code, info in CATEGORIES.items()})
+_PACKING_LOOKUP = {code: code for code in PACKING_TYPES}
+_PACKING_LOOKUP.update({info['name']: code for code, info in PACKING_TYPES.items()})
+_PACKING_LOOKUP.update({'KD': 'kd', '木架': 'loose_frame', '木箱': 'crate'})
+_KD_LEVEL_LOOKUP = {code: code for code in KD_LEVELS}
+_KD_LEVEL_LOOKUP.update({info['name']: code for code, info in KD_LEVELS.items()})
+_KD_LEVEL_LOOKUP.update({str(info['thickness']): code for code, info in KD_LEVELS.items()})
+
+
+# ──────────────────────────────────────────────
+# 输入归一化
+# ──────────────────────────────────────────────
+
+def resolve_category(value) -> str | None:
+    """品类代码或中文名称 → 品类代码；无法识别返回 None"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    return _CATEGORY_LOOKUP.get(text) or _CATEGORY_LOOKUP.get(text.lower())
+
+
+def resolve_packing(value) -> str | None:
+    """包装方式代码或中文名称 → 代码；为空时默认 KD"""
+    if value is None or str(value).strip() == '':
+        return 'kd'
+    text = str(value).strip()
+    return _PACKING_LOOKUP.get(text) or _PACKING_LOOKUP.get(text.lower())
+
+
+def resolve_kd_level(value) -> str | None:
+    """KD 压薄程度代码 / 名称 / 厚度 → 代码；为空时默认标准KD"""
+    if value is None or str(value).strip() == '':
+        return 'standard'
+    text = str(value).strip()
+    return _KD_LEVEL_LOOKUP.get(text) or _KD_LEVEL_LOOKUP.get(text.lower())
+
+
+def default_size(category: str) -> tuple[int, int, int]:
+    """品类默认尺寸 (W, D, H)"""
+    return CATEGORIES[category]['size']
+
+
+# ──────────────────────────────────────────────
+# 计算
+# ──────────────────────────────────────────────
+
+def _suggested(volume: float, packing: str) -> float:
+    if packing == 'kd':
+        return round(volume + SUGGEST_ADD_KD, 3)
+    add = SUGGEST_ADD_LARGE if volume >= SUGGEST_LARGE_THRESHOLD else SUGGEST_ADD_SMALL
+    return round(volume + add, 3)
+
+
+def calculate(
+    category: str,
+    width: float | None = None,
+    depth: float | None = None,
+    height: float | None = None,
+    packing: str = 'kd',
+    kd_level: str = 'standard'
+) -> dict:
+    """
+    计算单件包装外箱尺寸与体积
+    参数须为已归一化的代码（见 resolve_*），未提供的尺寸使用品类默认值
+    返回 dict：outer_w / outer_d / outer_h (mm)、volume_m3、suggested_m3 及实际采用的包装参数
+    相同签名的结果按进程缓存（纯函数），返回副本，调用方可自由修改
+    """
+    return dict(_calculate_cached(
+        category,
+        float(width) if width else None,
+        float(depth) if depth else None,
+        float(height) if height else None,
+        packing,
+        kd_level,
+    ))
+
+
+@lru_cache(maxsize=4096)
+def _calculate_cached(category, width, depth, height, packing, kd_level) -> dict:
+    if category not in CATEGORIES:
+        raise ValueError(f"未知品类: {category}")
+    if packing not in PACKING_TYPES:
+        raise ValueError(f"未知包装方式: {packing}")
+    if kd_level not in KD_LEVELS:
+        raise ValueError(f"未知 KD 压薄程度: {kd_level}")
+
+    info = CATEGORIES[category]
+    dw, dd, dh = info['size']
+    w = float(width or dw)
+    d = float(depth or dd)
+    h = float(height or dh)
+    if min(w, d, h) <= 0:
+        raise ValueError("尺寸必须大于 0")
+
+    if category in SPECIAL_RULES:
+        # 特殊品类：固定包装余量，不参与 KD 拆装
+        mw, md, mh = SPECIAL_RULES[category]
+        outer = (w + mw, d + md, h + mh)
+        packing = 'loose_frame' if category in ('bed_finished', 'shower_glass', 'wall_mirror') else packing
+    elif packing == 'kd' and info['kd_layers'] > 0:
+        # KD 平板：板件平放叠层，外箱厚度 = 层数 × 每层厚度（镜柜额外压薄）
+        margin = PACKING_TYPES['kd']['margin']
+        thickness = KD_LEVELS[kd_level]['thickness'] * max(info['kd_layers'], math.ceil(d / 300))
+        if category == 'mirror_cabinet':
+            thickness -= MIRROR_CABINET_REDUCTION
+        thickness = max(min(thickness, d), KD_MIN_THICKNESS)
+        outer = (w + margin, thickness + margin, h + margin)
+    else:
+        # 不可拆装品类选择 KD 时按整件纸箱处理；其余按包装方式外扩余量
+        margin = PACKING_TYPES[packing]['margin']
+        outer = (w + margin, d + margin, h + margin)
+
+    outer_w, outer_d, outer_h = (int(round(v)) for v in outer)
+    volume = round(outer_w * outer_d * outer_h / 1e9, 3)
+
+    return {
+        'category': category,
+        'category_name': info['name'],
+        'packing': packing,
+        'kd_level': kd_level if packing == 'kd' else None,
+        'outer_w': outer_w,
+        'outer_d': outer_d,
+        'outer_h': outer_h,
+        'volume_m3': volume,
+        'suggested_m3': _suggested(volume, packing),
+        'provisional': TABLES_PROVISIONAL,
+    }
+
+
+@traced('calc.kd_volume.batch')
+def calculate_batch(items: list[dict]) -> list[dict]:
+    """
+    批量计算：items 每项包含 category / width / depth / height / packing / kd_level / quantity
+    返回与输入等长的结果列表，每项追加 quantity 与整行合计 line_volume_m3 / line_suggested_m3
+    """
+    CALC_BATCH_SIZE.observe(len(items), engine='kd_volume')
+    results = []
+    for item in items:
+        result = calculate(
+            item['category'],
+            item.get('width'),
+            item.get('depth'),
+            item.get('height'),
+            item.get('packing') or 'kd',
+            item.get('kd_level') or 'standard',
+        )
+        quantity = int(item.get('quantity') or 1)
+        result['quantity'] = quantity
+        result['line_volume_m3'] = round(result['volume_m3'] * quantity, 3)
+        result['line_suggested_m3'] = round(result['suggested_m3'] * quantity, 3)
+        results.append(result)
+    return results
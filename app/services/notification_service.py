@@ -0,0 +1,196 @@
+# 文件路径：app/services/notification_service.py
+# 更新日期：2026-10-19
+# 功能说明：站内通知业务逻辑，包括写时扇出（按批插入每个接收人一行，并在同一事务内给接收人的未读计数 +1）、群发、个人通知列表、标记已读（计数同步扣减）与未读数读取；每批提交后唤醒挂起的长轮询请求
+
+from datetime import datetime
+from urllib.parse import urlsplit
+from flask import current_app
+from sqlalchemy import case, insert, update
+from app import db
+from app.models import Notification, Role, User, UserStats, user_roles
+from app.utils.notification_hub import notify_users
+from app.utils.tracing import trace_class
+
+
+def is_local_link(link: str | None) -> bool:
+    """
+    通知链接只允许站内绝对路径：以单个 / 开头、无协议、无主机名；
+    '//host'、'/\\host' 会被浏览器当作其他站点，反斜杠与空白 / 控制字符（浏览器会忽略或转换）一律拒绝
+    """
+    if not link or not link.startswith('/') or link.startswith(('//', '/\\')):
+        return False
+    if '\\' in link or any(ord(ch) <= 32 or ord(ch) == 127 for ch in link):
+        return False
+    parts = urlsplit(link)
+    return not parts.scheme and not parts.netloc
+
+
+@trace_class
+class NotificationService:
+    """
+    通知服务层：未读数只从 user_stats.unread_notifications 读取（主键查询），
+    所有改变未读状态的写入都必须经过本服务，以保证计数与通知表一致
+    （计数出现偏差时可用 ProjectService.rebuild_rollups() 按通知表重算）
+    """
+
+    @staticmethod
+    def _recipients(user_ids) -> list[int]:
+        """过滤出启用且开启了通知的接收人"""
+        user_ids = sorted(set(user_ids or ()))
+        if not user_ids:
+            return []
+        rows = User.query.with_entities(User.id).filter(
+            User.id.in_(user_ids),
+            User.is_active.is_(True),
+            User.notifications_enabled.is_(True)
+        )
+        return [user_id for (user_id,) in rows]
+
+    @staticmethod
+    def _ensure_stats_rows(user_ids: list[int]) -> None:
+        """接收人还没有汇总行时先补零值行，之后统一用 UPDATE 累加"""
+        existing = {
+            user_id for (user_id,) in
+            db.session.query(UserStats.user_id).filter(UserStats.user_id.in_(user_ids))
+        }
+        missing = [user_id for user_id in user_ids if user_id not in existing]
+        if missing:
+            db.session.execute(insert(UserStats), [
+                {
+                    'user_id': user_id, 'project_count': 0, 'active_projects': 0,
+                    'total_volume_m3': 0.0, 'total_freight_usd': 0.0,
+                    'unread_notifications': 0, 'data_version': 0
+                }
+                for user_id in missing
+            ])
+
+    @staticmethod
+    def notify(
+        user_ids,
+        title: str,
+        body: str | None = None,
+        link: str | None = None,
+        category: str = 'info',
+        batch_size: int | None = None
+    ) -> int:
+        """
+        写时扇出：给每个接收人插入一行通知，按批提交（每批一个事务：批量 INSERT + 一条累加计数的 UPDATE）
+        返回实际送达人数（已禁用或关闭通知的用户跳过）
+        """
+        title = (title or '').strip()
+        if not title:
+            raise ValueError("通知标题不能为空")
+        if len(title) > 120:
+            raise ValueError("通知标题不能超过 120 个字符")
+        if category not in Notification.CATEGORIES:
+            raise ValueError(f"无效的通知类别: {category}")
+        if link and not is_local_link(link):
+            raise ValueError("通知链接只能是站内路径（以 / 开头，不含主机名）")
+
+        batch_size = batch_size or current_app.config.get('NOTIFICATION_BATCH_SIZE', 500)
+        recipients = NotificationService._recipients(user_ids)
+        body = (body or '').strip() or None
+        now = datetime.utcnow()
+
+        for start in range(0, len(recipients), batch_size):
+            batch = recipients[start:start + batch_size]
+            db.session.execute(insert(Notification), [
+                {
+                    'user_id': user_id, 'title': title, 'body': body, 'link': link or None,
+                    'category': category, 'is_read': False, 'created_at': now
+                }
+                for user_id in batch
+            ])
+            NotificationService._ensure_stats_rows(batch)
+            db.session.execute(
+                update(UserStats)
+                .where(UserStats.user_id.in_(batch))
+                .values(
+                    unread_notifications=UserStats.unread_notifications + 1,
+                    data_version=UserStats.data_version + 1  # 仪表盘片段缓存据此失效
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            notify_users(batch)
+
+        current_app.logger.info(f"通知已发送: {title} → {len(recipients)} 人")
+        return len(recipients)
+
+    @staticmethod
+    def broadcast(
+        title: str,
+        body: str | None = None,
+        link: str | None = None,
+        category: str = 'info',
+        role_id: int | None = None
+    ) -> int:
+        """群发：全部用户，或指定角色的成员"""
+        if role_id is not None:
+            if not db.session.get(Role, role_id):
+                raise ValueError(f"角色不存在 (ID: {role_id})")
+            user_ids = [
+                user_id for (user_id,) in
+                db.session.query(user_roles.c.user_id).filter(user_roles.c.role_id == role_id)
+            ]
+        else:
+            user_ids = [user_id for (user_id,) in db.session.query(User.id)]
+        return NotificationService.notify(user_ids, title, body=body, link=link, category=category)
+
+    @staticmethod
+    def unread_count(user_id: int) -> int:
+        """未读数（按主键读取 user_stats 一行）"""
+        count = db.session.query(UserStats.unread_notifications).filter(UserStats.user_id == user_id).scalar()
+        return count or 0
+
+    @staticmethod
+    def get_notification(user_id: int, notification_id: int) -> Notification | None:
+        """获取本人的一条通知（不属于该用户时返回 None）"""
+        notification = db.session.get(Notification, notification_id)
+        if notification and notification.user_id != user_id:
+            return None
+        return notification
+
+    @staticmethod
+    def list_notifications(user_id: int, limit: int = 20, before_id: int | None = None,
+                           only_unread: bool = False) -> list[Notification]:
+        """个人通知列表（按 ID 倒序，before_id 用于向后翻页）"""
+        query = Notification.query.filter(Notification.user_id == user_id)
+        if only_unread:
+            query = query.filter(Notification.is_read.is_(False))
+        if before_id:
+            query = query.filter(Notification.id < before_id)
+        return query.order_by(Notification.id.desc()).limit(limit).all()
+
+    @staticmethod
+    def mark_read(user_id: int, notification_ids: list[int] | None = None) -> int:
+        """标记已读（不传 notification_ids 表示全部），未读计数按实际更新行数扣减；返回标记的条数"""
+        stmt = update(Notification).where(
+            Notification.user_id == user_id,
+            Notification.is_read.is_(False)
+        )
+        if notification_ids is not None:
+            if not notification_ids:
+                return 0
+            stmt = stmt.where(Notification.id.in_(notification_ids))
+        marked = db.session.execute(
+            stmt.values(is_read=True, read_at=datetime.utcnow()).execution_options(synchronize_session=False)
+        ).rowcount
+
+        if marked:
+            db.session.execute(
+                update(UserStats)
+                .where(UserStats.user_id == user_id)
+                .values(
+                    unread_notifications=case(
+                        (UserStats.unread_notifications > marked, UserStats.unread_notifications - marked),
+                        else_=0
+                    ),
+                    data_version=UserStats.data_version + 1
+                )
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+        if marked:
+            notify_users([user_id])  # 同一用户的其他标签页角标随之更新
+        return marked
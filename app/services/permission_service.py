@@ -0,0 +1,203 @@
+# 文件路径：app/services/permission_service.py
+# 更新日期：2026-10-19
+# 功能说明：角色与权限授予的业务逻辑，包括角色（可继承上级角色）与部门（树形）的列表 / 新建 / 编辑 / 删除、设置用户所属角色、部门与单独授权，以及"只能管理权限不超过自己的用户"的校验；每次变更提交后通知各 worker 清空权限缓存并重建闭包
+
+from flask import current_app
+from app import db
+from app.models import Department, Project, Role, User
+from app.utils.permissions import (
+    PERMISSION_LABELS, Perm, closure, mask_from_names, notify_permissions_changed, permission_mask
+)
+from app.utils.tracing import trace_class
+
+
+@trace_class
+class PermissionService:
+    """
+    角色权限服务层
+    路由层只传权限名列表（Perm 成员名），位掩码的换算与缓存失效都在此处理
+    """
+
+    # ──────────────────────────────────────────────
+    # 角色
+    # ──────────────────────────────────────────────
+
+    @staticmethod
+    def list_roles() -> list[Role]:
+        return Role.query.order_by(Role.name).all()
+
+    @staticmethod
+    def get_role(role_id: int) -> Role | None:
+        return db.session.get(Role, role_id)
+
+    @staticmethod
+    def _check_parent(model, item_id: int | None, parent_id: int | None, label: str) -> None:
+        """校验上级：必须存在，且不能是自身或自身的下级（否则继承链成环）"""
+        if parent_id is None:
+            return
+        parents = dict(model.query.with_entities(model.id, model.parent_id).all())
+        if parent_id not in parents:
+            raise ValueError(f"上级{label}不存在 (ID: {parent_id})")
+        if item_id is not None and item_id in closure(parents)[parent_id]:
+            raise ValueError(f"不能选择自身或下级{label}作为上级{label}")
+
+    @staticmethod
+    def save_role(
+        role_id: int | None,
+        name: str,
+        description: str | None,
+        permission_names: list[str],
+        parent_id: int | None = None
+    ) -> Role:
+        """新建（role_id 为 None）或更新角色；parent_id 为继承的角色"""
+        name = (name or '').strip()
+        if not name:
+            raise ValueError("角色名称不能为空")
+
+        existing = Role.query.filter(Role.name == name).first()
+        if existing and existing.id != role_id:
+            raise ValueError("角色名称已存在")
+        PermissionService._check_parent(Role, role_id, parent_id, '角色')
+
+        if role_id is None:
+            role = Role(name=name)
+            db.session.add(role)
+        else:
+            role = db.session.get(Role, role_id)
+            if not role:
+                raise ValueError(f"角色不存在 (ID: {role_id})")
+            role.name = name
+
+        role.description = (description or '').strip() or None
+        role.permissions = mask_from_names(permission_names)
+        role.parent_id = parent_id
+        db.session.commit()
+        notify_permissions_changed()
+
+        current_app.logger.info(f"角色已保存: {role.name} (ID: {role.id}) 权限掩码={role.permissions}")
+        return role
+
+    @staticmethod
+    def delete_role(role_id: int) -> None:
+        """删除角色（继承该角色的下级角色改为继承被删角色的上级）"""
+        role = db.session.get(Role, role_id)
+        if not role:
+            raise ValueError(f"角色不存在 (ID: {role_id})")
+        name = role.name
+        Role.query.filter(Role.parent_id == role_id).update({'parent_id': role.parent_id})
+        db.session.delete(role)
+        db.session.commit()
+        notify_permissions_changed()
+        current_app.logger.info(f"角色已删除: {name} (ID: {role_id})")
+
+    # ──────────────────────────────────────────────
+    # 部门
+    # ──────────────────────────────────────────────
+
+    @staticmethod
+    def list_departments() -> list[Department]:
+        return Department.query.order_by(Department.name).all()
+
+    @staticmethod
+    def get_department(department_id: int) -> Department | None:
+        return db.session.get(Department, department_id)
+
+    @staticmethod
+    def save_department(department_id: int | None, name: str, parent_id: int | None = None) -> Department:
+        """新建（department_id 为 None）或更新部门"""
+        name = (name or '').strip()
+        if not name:
+            raise ValueError("部门名称不能为空")
+
+        existing = Department.query.filter(Department.name == name).first()
+        if existing and existing.id != department_id:
+            raise ValueError("部门名称已存在")
+        PermissionService._check_parent(Department, department_id, parent_id, '部门')
+
+        if department_id is None:
+            department = Department(name=name)
+            db.session.add(department)
+        else:
+            department = db.session.get(Department, department_id)
+            if not department:
+                raise ValueError(f"部门不存在 (ID: {department_id})")
+            department.name = name
+
+        department.parent_id = parent_id
+        db.session.commit()
+        notify_permissions_changed()
+
+        current_app.logger.info(f"部门已保存: {department.name} (ID: {department.id}) 上级={parent_id}")
+        return department
+
+    @staticmethod
+    def delete_department(department_id: int) -> None:
+        """删除部门（成员与项目的部门置空，下级部门挂到被删部门的上级）"""
+        department = db.session.get(Department, department_id)
+        if not department:
+            raise ValueError(f"部门不存在 (ID: {department_id})")
+        name, parent_id = department.name, department.parent_id
+
+        # SQLite 默认不启用外键约束，ON DELETE SET NULL 不一定生效，这里显式处理
+        Department.query.filter(Department.parent_id == department_id).update({'parent_id': parent_id})
+        User.query.filter(User.department_id == department_id).update({'department_id': None})
+        Project.query.filter(Project.department_id == department_id).update({'department_id': None})
+        db.session.delete(department)
+        db.session.commit()
+        notify_permissions_changed()
+        current_app.logger.info(f"部门已删除: {name} (ID: {department_id})")
+
+    # ──────────────────────────────────────────────
+    # 用户授权
+    # ──────────────────────────────────────────────
+
+    @staticmethod
+    def ensure_can_manage(actor, target: User) -> None:
+        """
+        actor 只能编辑 / 重置密码 / 启用禁用有效权限不超过自己的用户：
+        否则重置对方密码后以其身份登录即可获得自己没有的权限（如角色管理，进而给自己授予全部权限）
+        """
+        if target.is_admin and not actor.is_admin:
+            raise PermissionError("只有管理员可以管理管理员账号")
+        extra = permission_mask(target) & ~permission_mask(actor)
+        if extra:
+            labels = '、'.join(label for perm, label in PERMISSION_LABELS.items() if extra & perm)
+            raise PermissionError(f"该用户拥有您没有的权限（{labels}），无权管理")
+
+    @staticmethod
+    def set_user_access(
+        user_id: int,
+        role_ids: list[int],
+        permission_names: list[str],
+        department_id: int | None = None,
+        actor=None
+    ) -> User:
+        """
+        设置用户所属角色、部门与单独授予的权限（整体替换）；部门变化时名下项目随之转到新部门
+        传入 actor 时校验其有权管理该用户
+        """
+        user = db.session.get(User, user_id)
+        if not user:
+            raise ValueError(f"用户不存在 (ID: {user_id})")
+        if actor is not None:
+            PermissionService.ensure_can_manage(actor, user)
+        if department_id is not None and not db.session.get(Department, department_id):
+            raise ValueError(f"部门不存在 (ID: {department_id})")
+
+        roles = Role.query.filter(Role.id.in_(role_ids)).all() if role_ids else []
+        if len(roles) != len(set(role_ids or [])):
+            raise ValueError("包含不存在的角色")
+
+        user.roles = roles
+        user.granted_permissions = mask_from_names(permission_names)
+        if department_id != user.department_id:
+            user.department_id = department_id
+            Project.query.filter(Project.owner_id == user_id).update({'department_id': department_id})
+        db.session.commit()
+        notify_permissions_changed()
+
+        current_app.logger.info(
+            f"用户权限已更新: {user.username} (ID: {user.id}) 角色={[role.name for role in roles]} 部门={department_id} "
+            f"单独授权={user.granted_permissions}"
+        )
+        return user
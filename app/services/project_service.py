@@ -0,0 +1,477 @@
+# 文件路径：app/services/project_service.py
+# 更新日期：2026-10-19
+# 功能说明：项目管理核心业务逻辑，包括项目与明细的增删改查、整行体积/运费计算、房型 BOM 维护与展开汇总、导出行流式读取、仪表盘汇总读取及汇总值全量重建（汇总值由模型层 before_flush 钩子增量维护）
+
+from flask import current_app
+from typing import Iterator
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import joinedload, selectinload
+from datetime import datetime
+from app import db
+from app.models import Notification, Project, ProjectItem, ProjectRoomType, RoomTypeItem, User, UserStats
+from app.services.calc import bom, volume_kd
+from app.utils.tracing import trace_class, untraced
+
+EXPORT_YIELD_PER = 500   # 流式导出每批从数据库读取的行数
+
+
+@trace_class
+class ProjectService:
+    """
+    项目服务层：封装所有与项目 / 明细相关的数据库操作和业务规则
+    路由层不应直接操作 Project / ProjectItem 模型或 db.session
+    """
+
+    # 可编辑的项目字段（白名单，防止误改汇总字段）
+    EDITABLE_FIELDS = ('name', 'client_name', 'destination', 'container_count', 'status', 'remark', 'freight_rate_usd_m3')
+    ITEM_FIELDS = ('room', 'name', 'model', 'category', 'width_mm', 'depth_mm', 'height_mm', 'packing')
+
+    # ──────────────────────────────────────────────
+    # 项目
+    # ──────────────────────────────────────────────
+
+    @staticmethod
+    def get_project(project_id: int, owner_id: int | None = None, department_ids=None) -> Project | None:
+        """
+        获取项目；传入 owner_id 时仅返回该用户名下的项目，
+        或所属部门在 department_ids 中的项目（参数通常来自 permissions.project_scope()）
+        """
+        project = db.session.get(Project, project_id)
+        if project and owner_id is not None and project.owner_id != owner_id \
+                and project.department_id not in (department_ids or ()):
+            return None
+        return project
+
+    @staticmethod
+    def get_project_list(owner_id: int | None = None, status: str | None = None, department_ids=None) -> list[Project]:
+        """项目列表（直接读取项目表上的汇总列，不关联明细）；owner_id / department_ids 含义同 get_project"""
+        query = Project.query.options(joinedload(Project.owner))
+        if owner_id is not None and department_ids:
+            query = query.filter(or_(Project.owner_id == owner_id, Project.department_id.in_(department_ids)))
+        elif owner_id is not None:
+            query = query.filter(Project.owner_id == owner_id)
+        if status:
+            query = query.filter(Project.status == status)
+        return query.order_by(Project.updated_at.desc()).all()
+
+    @staticmethod
+    @untraced   # 生成器：调用时只创建迭代器，耗时由导出路由的 export.<格式> 区段覆盖
+    def iter_export_rows(owner_id: int, batch_size: int = EXPORT_YIELD_PER) -> Iterator[dict]:
+        """
+        指定用户名下项目的导出行（体积 / 运费直接取项目汇总列），惰性生成：
+        按 batch_size 分批从游标读取，负责人随项目一起 JOIN 加载（不逐行懒加载），内存占用与项目总数无关
+        须在请求上下文内迭代完（路由用 stream_with_context 包装流式响应）
+        """
+        stmt = (
+            select(Project)
+            .where(Project.owner_id == owner_id)   # 先只导出自己的
+            .options(joinedload(Project.owner))
+            .order_by(Project.updated_at.desc())
+            .execution_options(yield_per=batch_size)
+        )
+        for p in db.session.execute(stmt).scalars():
+            yield {
+                '项目ID': p.id,
+                '项目名称': p.name,
+                '状态': p.status or '未知',
+                '总体积(m³)': round(p.volume_m3 or 0, 3),
+                '总运费(USD)': round(p.freight_usd or 0, 2),
+                '创建者': p.owner.username if p.owner else '未知',
+                '创建时间': p.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            }
+
+    @staticmethod
+    def create_project(
+        owner_id: int,
+        name: str,
+        client_name: str | None = None,
+        destination: str | None = None,
+        container_count: int = 1,
+        status: str = '报价中',
+        remark: str | None = None
+    ) -> Project:
+        """新建项目（负责人汇总行在同一事务内 +1）"""
+        name = (name or '').strip()
+        if not name:
+            raise ValueError("项目名称不能为空")
+        if status not in Project.STATUSES:
+            raise ValueError(f"无效的项目状态: {status}")
+
+        owner = db.session.get(User, owner_id)
+        project = Project(
+            owner_id=owner_id,
+            department_id=owner.department_id if owner else None,
+            name=name,
+            client_name=client_name.strip() if client_name else None,
+            destination=destination.strip() if destination else None,
+            container_count=max(int(container_count or 1), 1),
+            status=status,
+            remark=remark,
+            freight_rate_usd_m3=0.0,
+            item_count=0,
+            volume_m3=0.0,
+            freight_usd=0.0
+        )
+        db.session.add(project)
+        db.session.commit()
+
+        current_app.logger.info(f"新建项目成功: {name} (ID: {project.id}, 负责人: {owner_id})")
+        return project
+
+    @staticmethod
+    def update_project(project_id: int, **fields) -> Project:
+        """更新项目基本信息（仅白名单字段，状态 / 负责人变化由钩子同步到汇总表）"""
+        project = db.session.get(Project, project_id)
+        if not project:
+            raise ValueError(f"项目不存在 (ID: {project_id})")
+
+        for key, value in fields.items():
+            if key not in ProjectService.EDITABLE_FIELDS or value is None:
+                continue
+            if key == 'status' and value not in Project.STATUSES:
+                raise ValueError(f"无效的项目状态: {value}")
+            setattr(project, key, value.strip() if isinstance(value, str) else value)
+
+        db.session.commit()
+        current_app.logger.info(f"项目更新成功: {project.name} (ID: {project.id})")
+        return project
+
+    @staticmethod
+    def delete_project(project_id: int) -> None:
+        """删除项目及其全部明细（负责人汇总同步扣减）"""
+        project = db.session.get(Project, project_id)
+        if not project:
+            raise ValueError(f"项目不存在 (ID: {project_id})")
+
+        name = project.name
+        db.session.delete(project)
+        db.session.commit()
+        current_app.logger.info(f"项目已删除: {name} (ID: {project_id})")
+
+    # ──────────────────────────────────────────────
+    # 明细
+    # ──────────────────────────────────────────────
+
+    @staticmethod
+    def _fill_item(item: ProjectItem, data: dict) -> None:
+        """写入明细字段并计算整行合计（单件体积缺省时按外形尺寸估算）"""
+        for key in ProjectService.ITEM_FIELDS:
+            if key in data and data[key] is not None:
+                value = data[key]
+                setattr(item, key, value.strip() if isinstance(value, str) else value)
+
+        if 'quantity' in data and data['quantity'] is not None:
+            quantity = int(data['quantity'])
+            if quantity < 1:
+                raise ValueError("数量必须大于 0")
+            item.quantity = quantity
+        quantity = item.quantity or 1
+
+        if data.get('unit_volume_m3') is not None:
+            item.unit_volume_m3 = float(data['unit_volume_m3'])
+        elif item.width_mm and item.depth_mm and item.height_mm:
+            item.unit_volume_m3 = round(item.width_mm * item.depth_mm * item.height_mm / 1e9, 4)
+        unit_volume = item.unit_volume_m3 or 0.0
+
+        item.volume_m3 = round(unit_volume * quantity, 4)
+        if data.get('freight_usd') is not None:
+            item.freight_usd = round(float(data['freight_usd']), 2)
+        elif item.freight_usd is None:
+            item.freight_usd = 0.0
+
+    @staticmethod
+    def add_item(project_id: int, data: dict) -> ProjectItem:
+        """新增明细（项目与负责人汇总在同一事务内累加）"""
+        project = db.session.get(Project, project_id)
+        if not project:
+            raise ValueError(f"项目不存在 (ID: {project_id})")
+        if not (data.get('name') or '').strip():
+            raise ValueError("产品名称不能为空")
+
+        item = ProjectItem(project_id=project.id, quantity=1, unit_volume_m3=0.0, freight_usd=None)
+        ProjectService._fill_item(item, data)
+        db.session.add(item)
+        db.session.commit()
+        return item
+
+    @staticmethod
+    def add_items_bulk(project_id: int, rows: list[dict]) -> int:
+        """批量新增明细（单次提交，汇总钩子按项目合并增量后只更新一次）"""
+        project = db.session.get(Project, project_id)
+        if not project:
+            raise ValueError(f"项目不存在 (ID: {project_id})")
+
+        items = []
+        for data in rows:
+            item = ProjectItem(project_id=project.id, quantity=1, unit_volume_m3=0.0, freight_usd=None)
+            ProjectService._fill_item(item, data)
+            items.append(item)
+
+        db.session.add_all(items)
+        db.session.commit()
+        current_app.logger.info(f"项目 {project.name} 批量新增明细 {len(items)} 条")
+        return len(items)
+
+    @staticmethod
+    def update_item(item_id: int, data: dict) -> ProjectItem:
+        """更新明细（差值由钩子同步到项目与负责人汇总）"""
+        item = db.session.get(ProjectItem, item_id)
+        if not item:
+            raise ValueError(f"明细不存在 (ID: {item_id})")
+
+        ProjectService._fill_item(item, data)
+        db.session.commit()
+        return item
+
+    @staticmethod
+    def delete_item(item_id: int) -> None:
+        """删除明细（项目与负责人汇总同步扣减）"""
+        item = db.session.get(ProjectItem, item_id)
+        if not item:
+            raise ValueError(f"明细不存在 (ID: {item_id})")
+
+        db.session.delete(item)
+        db.session.commit()
+
+    # ──────────────────────────────────────────────
+    # 房型 BOM（房型 × 房间数）
+    # ──────────────────────────────────────────────
+
+    @staticmethod
+    def _new_room_type(project_id: int, name: str, room_count: int) -> ProjectRoomType:
+        """校验并构造房型（未加入会话；同一项目内房型名称唯一）"""
+        project = db.session.get(Project, project_id)
+        if not project:
+            raise ValueError(f"项目不存在 (ID: {project_id})")
+        name = (name or '').strip()
+        if not name:
+            raise ValueError("房型名称不能为空")
+        if int(room_count or 0) < 1:
+            raise ValueError("房间数必须大于 0")
+        if ProjectRoomType.query.filter_by(project_id=project.id, name=name).first():
+            raise ValueError(f"房型已存在: {name}")
+        return ProjectRoomType(project_id=project.id, name=name, room_count=int(room_count))
+
+    @staticmethod
+    def add_room_type(project_id: int, name: str, room_count: int = 1) -> ProjectRoomType:
+        """新增房型（同一项目内房型名称唯一）"""
+        room_type = ProjectService._new_room_type(project_id, name, room_count)
+        db.session.add(room_type)
+        db.session.commit()
+        return room_type
+
+    @staticmethod
+    def create_room_type(project_id: int, name: str, room_count: int = 1, rows: list[dict] | None = None) -> ProjectRoomType:
+        """
+        新增房型及其家具清单（一个事务）：先校验房型与全部条目，再一次提交；
+        任一条目不合法时抛出 ValueError，不留下空房型。rows 格式同 add_room_type_items
+        """
+        room_type = ProjectService._new_room_type(project_id, name, room_count)
+        room_type.items = ProjectService._new_room_type_items(rows or [])
+        db.session.add(room_type)
+        db.session.commit()
+        return room_type
+
+    @staticmethod
+    def update_room_type(room_type_id: int, name: str | None = None, room_count: int | None = None) -> ProjectRoomType:
+        """修改房型名称 / 房间数（BOM 汇总按需计算，无需同步其他表）"""
+        room_type = db.session.get(ProjectRoomType, room_type_id)
+        if not room_type:
+            raise ValueError(f"房型不存在 (ID: {room_type_id})")
+        if name is not None and name.strip():
+            room_type.name = name.strip()
+        if room_count is not None:
+            if int(room_count) < 1:
+                raise ValueError("房间数必须大于 0")
+            room_type.room_count = int(room_count)
+        db.session.commit()
+        return room_type
+
+    @staticmethod
+    def delete_room_type(room_type_id: int) -> None:
+        """删除房型及其家具清单"""
+        room_type = db.session.get(ProjectRoomType, room_type_id)
+        if not room_type:
+            raise ValueError(f"房型不存在 (ID: {room_type_id})")
+        db.session.delete(room_type)
+        db.session.commit()
+
+    @staticmethod
+    def _new_room_type_items(rows: list[dict]) -> list[RoomTypeItem]:
+        """校验并构造房型家具条目（未关联房型、未加入会话）；任一行不合法时抛出 ValueError"""
+        items = []
+        for data in rows:
+            if not isinstance(data, dict):
+                raise ValueError("家具条目格式不正确")
+            category = volume_kd.resolve_category(data.get('category'))
+            packing = volume_kd.resolve_packing(data.get('packing'))
+            kd_level = volume_kd.resolve_kd_level(data.get('kd_level'))
+            if not category or not packing or not kd_level:
+                raise ValueError(f"品类 / 包装方式 / 压薄程度无法识别: {data.get('name') or data.get('category')}")
+            quantity = int(data.get('quantity') or 1)
+            if quantity < 1:
+                raise ValueError("数量必须大于 0")
+            items.append(RoomTypeItem(
+                name=(data.get('name') or volume_kd.CATEGORIES[category]['name']).strip(),
+                model=data.get('model') or None,
+                category=category,
+                width_mm=int(data['width']) if data.get('width') else None,
+                depth_mm=int(data['depth']) if data.get('depth') else None,
+                height_mm=int(data['height']) if data.get('height') else None,
+                packing=packing,
+                kd_level=kd_level,
+                quantity=quantity,
+                unit_price_usd=float(data.get('unit_price_usd') or 0.0),
+            ))
+        return items
+
+    @staticmethod
+    def add_room_type_items(room_type_id: int, rows: list[dict]) -> int:
+        """
+        批量新增房型家具条目（每间房的件数）
+        rows 字段同 KD 计算输入：category / width / depth / height / packing / kd_level / quantity，
+        另含 name / model / unit_price_usd；品类与包装可传代码或中文名称
+        """
+        room_type = db.session.get(ProjectRoomType, room_type_id)
+        if not room_type:
+            raise ValueError(f"房型不存在 (ID: {room_type_id})")
+
+        items = ProjectService._new_room_type_items(rows)
+        for item in items:
+            item.room_type_id = room_type.id
+        db.session.add_all(items)
+        db.session.commit()
+        return len(items)
+
+    @staticmethod
+    def get_bom(project_id: int) -> dict:
+        """
+        房型 BOM 汇总：按唯一条目签名计算一次体积 / 费用后按房间数放大
+        一次 selectin 查询载入全部房型条目，计算量与房间数无关
+        """
+        project = db.session.get(Project, project_id)
+        if not project:
+            raise ValueError(f"项目不存在 (ID: {project_id})")
+
+        room_types = (
+            ProjectRoomType.query
+            .options(selectinload(ProjectRoomType.items))
+            .filter(ProjectRoomType.project_id == project.id)
+            .order_by(ProjectRoomType.id)
+            .all()
+        )
+        return bom.expand(
+            [
+                {
+                    'name': room_type.name,
+                    'room_count': room_type.room_count,
+                    'items': [
+                        {
+                            'category': item.category,
+                            'width': item.width_mm,
+                            'depth': item.depth_mm,
+                            'height': item.height_mm,
+                            'packing': item.packing,
+                            'kd_level': item.kd_level,
+                            'quantity': item.quantity,
+                            'unit_price_usd': item.unit_price_usd,
+                        }
+                        for item in room_type.items
+                    ],
+                }
+                for room_type in room_types
+            ],
+            freight_rate=project.freight_rate_usd_m3
+        )
+
+    # ──────────────────────────────────────────────
+    # 汇总
+    # ──────────────────────────────────────────────
+
+    @staticmethod
+    def get_dashboard_stats(user_id: int) -> dict:
+        """仪表盘统计：按主键读取 user_stats 一行（无则返回全 0），data_version 供片段缓存使用"""
+        stats = db.session.get(UserStats, user_id)
+        if not stats:
+            return {
+                'data_version': 0,
+                'project_count': 0,
+                'active_projects': 0,
+                'total_volume_m3': 0.0,
+                'total_freight_usd': 0.0,
+                'unread_notifications': 0,
+            }
+        return {
+            'data_version': stats.data_version or 0,
+            'project_count': stats.project_count,
+            'active_projects': stats.active_projects,
+            'total_volume_m3': round(stats.total_volume_m3 or 0.0, 3),
+            'total_freight_usd': round(stats.total_freight_usd or 0.0, 2),
+            'unread_notifications': stats.unread_notifications or 0,
+        }
+
+    @staticmethod
+    def rebuild_rollups() -> int:
+        """
+        全量重建汇总值（运维修复用：浮点累计误差、手工改库后校准）
+        返回重建的项目数
+        """
+        item_totals = {
+            row.project_id: row
+            for row in db.session.query(
+                ProjectItem.project_id,
+                func.count(ProjectItem.id).label('item_count'),
+                func.coalesce(func.sum(ProjectItem.volume_m3), 0.0).label('volume_m3'),
+                func.coalesce(func.sum(ProjectItem.freight_usd), 0.0).label('freight_usd')
+            ).group_by(ProjectItem.project_id)
+        }
+
+        owner_totals: dict[int, list] = {}
+        projects = Project.query.all()
+        for project in projects:
+            totals = item_totals.get(project.id)
+            item_count = totals.item_count if totals else 0
+            volume = float(totals.volume_m3) if totals else 0.0
+            freight = float(totals.freight_usd) if totals else 0.0
+
+            owner = owner_totals.setdefault(project.owner_id, [0, 0, 0.0, 0.0])
+            owner[0] += 1
+            owner[1] += int(project.is_in_progress)
+            owner[2] += volume
+            owner[3] += freight
+
+            # 绕过增量钩子：直接以 SQL 覆盖写入
+            db.session.query(Project).filter(Project.id == project.id).update(
+                {'item_count': item_count, 'volume_m3': volume, 'freight_usd': freight},
+                synchronize_session=False
+            )
+
+        # 未读通知数同在汇总行上，一并按通知表重算
+        unread = dict(
+            db.session.query(Notification.user_id, func.count(Notification.id))
+            .filter(Notification.is_read.is_(False))
+            .group_by(Notification.user_id)
+        )
+
+        # 已有汇总行原地更新（会话中已载入的对象即同一实例，身份映射保持一致），缺失的补插；
+        # 重建后版本号继续递增，确保各 worker 的仪表盘片段缓存全部失效
+        stats_rows = {stats.user_id: stats for stats in UserStats.query.all()}
+        for owner_id in (stats_rows.keys() | unread.keys()) - owner_totals.keys():
+            owner_totals[owner_id] = [0, 0, 0.0, 0.0]  # 已无项目的用户保留零值行，版本号不回退
+        now = datetime.utcnow()
+        for owner_id, (count, active, volume, freight) in owner_totals.items():
+            stats = stats_rows.get(owner_id)
+            if stats is None:
+                stats = UserStats(user_id=owner_id, data_version=0)
+                db.session.add(stats)
+            stats.project_count = count
+            stats.active_projects = active
+            stats.total_volume_m3 = volume
+            stats.total_freight_usd = freight
+            stats.unread_notifications = unread.get(owner_id, 0)
+            stats.data_version = (stats.data_version or 0) + 1
+            stats.updated_at = now
+
+        db.session.commit()
+        current_app.logger.warning(f"项目汇总值已全量重建，共 {len(projects)} 个项目")
+        return len(projects)
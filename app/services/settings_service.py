@@ -1,14 +1,17 @@
 # 文件路径：app/services/settings_service.py
-# 更新日期：2026-02-17
-# 功能说明：系统全局设置的核心业务逻辑，包括读取所有设置、保存/更新设置项、类型转换校验、默认值处理等
+# 更新日期：2026-10-19
+# 功能说明：系统全局设置的核心业务逻辑，包括读取所有设置、保存/更新设置项、类型转换校验、默认值处理、供热路径读取的进程内设置快照等
 
+import time
 from typing import Dict, Any, Optional
 from flask import current_app
 from app import db
 from app.models import SystemSetting  # 依赖 SystemSetting 模型
+from app.utils.tracing import trace_class, untraced
 from datetime import datetime
 
 
+@trace_class
 class SettingsService:
     """
     系统设置服务层
@@ -37,8 +40,17 @@ class SettingsService:
         # 其他全局开关
         'maintenance_mode': 'false',
         'allow_registration': 'false',
+
+        # 慢查询日志
+        'slow_query_threshold_ms': '200',    # 超过该耗时的 SQL 记录为慢查询
+        'slow_query_sample_rate': '1.0',     # 超阈值语句的记录比例（0 ~ 1）
     }
 
+    # 进程内设置快照（请求钩子、数据库事件等热路径读取，避免每次查库）
+    # 本进程保存设置时立即失效；其他 worker 最迟 SETTINGS_SNAPSHOT_TTL 秒后重新加载
+    _snapshot: Dict[str, Any] | None = None
+    _snapshot_loaded_at = 0.0
+
     @staticmethod
     def get_all_settings(as_dict: bool = True) -> Dict[str, Any]:
         settings = SystemSetting.query.all()
@@ -62,6 +74,21 @@ class SettingsService:
 
         return result if as_dict else settings
 
+    @staticmethod
+    @untraced   # 每个请求都会调用（慢查询阈值同步等），快照命中时只是一次字典读取
+    def get_snapshot() -> Dict[str, Any]:
+        """返回全部设置的只读快照（含默认值），过期后重新查库"""
+        ttl = current_app.config.get('SETTINGS_SNAPSHOT_TTL', 30)
+        now = time.monotonic()
+        if SettingsService._snapshot is None or now - SettingsService._snapshot_loaded_at > ttl:
+            SettingsService._snapshot = SettingsService.get_all_settings()
+            SettingsService._snapshot_loaded_at = now
+        return SettingsService._snapshot
+
+    @staticmethod
+    def invalidate_snapshot() -> None:
+        SettingsService._snapshot = None
+
     @staticmethod
     def get_setting(key: str, default: Any = None) -> Any:
         setting = SystemSetting.query.filter_by(key=key).first()
@@ -98,6 +125,7 @@ class SettingsService:
             db.session.add(setting)
 
         db.session.commit()
+        SettingsService.invalidate_snapshot()
         current_app.logger.info(f"系统设置更新: {key} = {value_str}")
         return setting
 
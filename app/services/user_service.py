@@ -1,15 +1,52 @@
 # 文件路径：app/services/user_service.py
-# 更新日期：2026-02-17
-# 功能说明：用户管理核心业务逻辑，包括查询列表、新建、编辑、启用/禁用、密码处理、系统管理员保护、统计数据等
+# 更新日期：2026-10-19
+# 功能说明：用户管理核心业务逻辑，包括查询列表、新建、编辑、启用/禁用、密码处理、系统管理员保护、统计数据、CSV/XLSX 批量导入（集合查重 + 并行哈希 + 分批写入）等
 
+import csv
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app
-from sqlalchemy import or_
+from sqlalchemy import or_, insert
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 from app import db
 from app.models import User
+from app.services.permission_service import PermissionService
+from app.utils.prometheus import HASH_QUEUE_DEPTH
+from app.utils.tracing import trace_class
+from app.utils.optional_deps import optional_import
+from app.utils.session_epoch import notify_sessions_revoked
+from app.utils.permissions import notify_permissions_changed
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# XLSX 解析依赖 openpyxl（可选，首次解析 XLSX 时才导入）
+openpyxl = optional_import('openpyxl')
+HAS_OPENPYXL = openpyxl.available
 
+# 批量导入表头别名（中英文均可）
+IMPORT_HEADER_ALIASES = {
+    'username': ('username', '用户名', '登录账号', '账号'),
+    'nickname': ('nickname', '昵称', '显示昵称', '姓名'),
+    'email': ('email', '邮箱', '邮箱地址'),
+    'password': ('password', '密码', '初始密码'),
+    'is_admin': ('is_admin', 'admin', '管理员', '是否管理员'),
+}
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'on', '是', '√')
+
+
+def _hash_password(password: str) -> str:
+    """
+    单个密码哈希（供线程池并行调用）
+    hashlib.pbkdf2_hmac 计算期间会释放 GIL，多线程即可占满多核，无需 fork 子进程
+    """
+    try:
+        return generate_password_hash(password, method=User.PASSWORD_HASH_METHOD)
+    finally:
+        HASH_QUEUE_DEPTH.dec()
+
+
+@trace_class
 class UserService:
     """
     用户服务层：封装所有与用户相关的数据库操作和业务规则
@@ -91,15 +128,18 @@ class UserService:
         email: str | None = None,
         password: str | None = None,
         is_admin: bool | None = None,
-        is_active: bool | None = None
+        is_active: bool | None = None,
+        actor=None
     ) -> User:
-        """更新用户信息，严格保护 ID=1"""
+        """更新用户信息，严格保护 ID=1；传入 actor（操作人）时校验其有权管理该用户"""
         if user_id == 1:
             raise PermissionError("系统管理员账号（ID=1）禁止编辑")
 
         user = User.query.get(user_id)
         if not user:
             raise ValueError(f"用户不存在 (ID: {user_id})")
+        if actor is not None:
+            PermissionService.ensure_can_manage(actor, user)
 
         if username and username.strip() != user.username:
             if UserService.get_user_by_username(username):
@@ -118,6 +158,10 @@ class UserService:
             else:
                 user.email = None
 
+        # 重置密码 / 禁用账号：该用户已登录的会话立即失效；管理员标记变化：各 worker 重新编译权限
+        revoke = bool(password) or (is_active is False and user.is_active)
+        admin_changed = is_admin is not None and is_admin != user.is_admin
+
         if password:
             user.set_password(password)
 
@@ -127,28 +171,40 @@ class UserService:
         if is_active is not None:
             user.is_active = is_active
 
+        if revoke:
+            user.revoke_sessions()
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        if revoke:
+            notify_sessions_revoked()
+        if admin_changed:
+            notify_permissions_changed()
 
         current_app.logger.info(f"用户更新成功: {user.username} (ID: {user.id})")
         return user
 
     @staticmethod
-    def toggle_user_active(user_id: int, active: bool = True) -> User:
-        """切换用户启用/禁用状态，保护 ID=1"""
+    def toggle_user_active(user_id: int, active: bool = True, actor=None) -> User:
+        """切换用户启用/禁用状态，保护 ID=1；传入 actor（操作人）时校验其有权管理该用户"""
         if user_id == 1:
             raise PermissionError("系统管理员账号（ID=1）禁止启用/禁用")
 
         user = User.query.get(user_id)
         if not user:
             raise ValueError(f"用户不存在 (ID: {user_id})")
+        if actor is not None:
+            PermissionService.ensure_can_manage(actor, user)
 
         if user.is_active == active:
             return user  # 无需变更
 
         user.is_active = active
+        if not active:
+            user.revoke_sessions()
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        if not active:
+            notify_sessions_revoked()
 
         status = "启用" if active else "禁用"
         current_app.logger.info(f"用户状态变更: {user.username} 已{status} (ID: {user.id})")
@@ -166,3 +222,183 @@ class UserService:
             'admin_users': admins,
             'active_percentage': round((active / total * 100), 1) if total > 0 else 0.0
         }
+
+    # ──────────────────────────────────────────────
+    # 批量导入（CSV / XLSX）
+    # ──────────────────────────────────────────────
+
+    @staticmethod
+    def parse_import_file(filename: str, stream) -> list[dict]:
+        """
+        解析批量导入文件，返回行字典列表（键已按 IMPORT_HEADER_ALIASES 归一化）
+        每行附带 _row 行号（含表头，从 2 开始），用于错误报告
+        """
+        ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+
+        if ext == 'csv':
+            text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+            reader = csv.reader(text)
+            rows = list(reader)
+        elif ext == 'xlsx':
+            if not HAS_OPENPYXL:
+                raise ValueError("服务器未安装 openpyxl，无法解析 XLSX，请改用 CSV")
+            workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+            try:
+                sheet = workbook.worksheets[0]
+                rows = [
+                    ['' if cell is None else str(cell) for cell in row]
+                    for row in sheet.iter_rows(values_only=True)
+                ]
+            finally:
+                workbook.close()
+        else:
+            raise ValueError("仅支持 CSV 或 XLSX 文件")
+
+        if not rows:
+            raise ValueError("导入文件为空")
+
+        # 表头映射：原始列序号 → 标准字段名
+        alias_lookup = {
+            alias.strip().lower(): field
+            for field, aliases in IMPORT_HEADER_ALIASES.items()
+            for alias in aliases
+        }
+        column_map = {}
+        for index, header in enumerate(rows[0]):
+            field = alias_lookup.get((header or '').strip().lower())
+            if field:
+                column_map[index] = field
+        if 'username' not in column_map.values():
+            raise ValueError("导入文件缺少“用户名 / username”列")
+
+        parsed = []
+        for row_no, row in enumerate(rows[1:], start=2):
+            if not any((cell or '').strip() for cell in row):
+                continue  # 跳过空行
+            record = {'_row': row_no}
+            for index, field in column_map.items():
+                record[field] = row[index].strip() if index < len(row) and row[index] else ''
+            parsed.append(record)
+        return parsed
+
+    @staticmethod
+    def bulk_import_users(
+        rows: list[dict],
+        batch_size: int | None = None,
+        hash_workers: int | None = None,
+        allow_admin: bool = False
+    ) -> dict:
+        """
+        批量新建用户：
+        1. 逐行校验格式 + 文件内去重；allow_admin 为 False（操作人不是管理员）时，管理员列为“是”的行拒绝导入
+        2. 一次集合查询（IN）校验用户名 / 邮箱是否已存在
+        3. 线程池并行计算密码哈希
+        4. 按批次插入，每批一个事务；某批冲突时回退为逐行插入以定位错误行
+
+        返回 {'total', 'created', 'errors': [{'row', 'username', 'error'}]}
+        """
+        batch_size = batch_size or current_app.config.get('USER_IMPORT_BATCH_SIZE', 500)
+        hash_workers = hash_workers or current_app.config.get('USER_IMPORT_HASH_WORKERS') or min(os.cpu_count() or 1, 8)
+
+        errors = []
+        candidates = []
+        seen_usernames, seen_emails = set(), set()
+
+        # ── 1. 行级校验 ──
+        for record in rows:
+            row_no = record.get('_row')
+            username = (record.get('username') or '').strip()
+            nickname = (record.get('nickname') or '').strip() or username
+            email = (record.get('email') or '').strip() or None
+            password = record.get('password') or ''
+            is_admin = str(record.get('is_admin') or '').strip().lower() in TRUE_VALUES
+
+            error = None
+            if is_admin and not allow_admin:
+                error = "无权导入管理员账号（仅管理员可导入管理员）"
+            elif not 3 <= len(username) <= 64:
+                error = "用户名长度需为 3-64 个字符"
+            elif len(password) < 10:
+                error = "密码至少 10 个字符"
+            elif email and ('@' not in email or len(email) > 120):
+                error = "邮箱格式不正确"
+            elif username in seen_usernames:
+                error = "文件内用户名重复"
+            elif email and email in seen_emails:
+                error = "文件内邮箱重复"
+
+            if error:
+                errors.append({'row': row_no, 'username': username, 'error': error})
+                continue
+
+            seen_usernames.add(username)
+            if email:
+                seen_emails.add(email)
+            candidates.append({
+                '_row': row_no,
+                'username': username,
+                'nickname': nickname[:64],
+                'email': email,
+                'password': password,
+                'is_admin': is_admin,
+            })
+
+        # ── 2. 一次集合查询校验数据库唯一性 ──
+        if candidates:
+            conditions = [User.username.in_(seen_usernames)]
+            if seen_emails:
+                conditions.append(User.email.in_(seen_emails))
+            existing = db.session.query(User.username, User.email).filter(or_(*conditions)).all()
+            taken_usernames = {row.username for row in existing}
+            taken_emails = {row.email for row in existing if row.email}
+
+            remaining = []
+            for record in candidates:
+                if record['username'] in taken_usernames:
+                    errors.append({'row': record['_row'], 'username': record['username'], 'error': "用户名已存在"})
+                elif record['email'] and record['email'] in taken_emails:
+                    errors.append({'row': record['_row'], 'username': record['username'], 'error': "邮箱已存在"})
+                else:
+                    remaining.append(record)
+            candidates = remaining
+
+        # ── 3. 并行哈希 ──
+        if candidates:
+            HASH_QUEUE_DEPTH.inc(len(candidates))
+            with ThreadPoolExecutor(max_workers=hash_workers, thread_name_prefix='pwd-hash') as executor:
+                hashes = list(executor.map(_hash_password, (r.pop('password') for r in candidates)))
+            now = datetime.utcnow()
+            for record, password_hash in zip(candidates, hashes):
+                record.update(
+                    password_hash=password_hash,
+                    is_active=True,
+                    failed_login_attempts=0,
+                    created_at=now,
+                )
+
+        # ── 4. 分批插入 ──
+        created = 0
+        for start in range(0, len(candidates), batch_size):
+            batch = candidates[start:start + batch_size]
+            mappings = [{k: v for k, v in r.items() if k != '_row'} for r in batch]
+            try:
+                db.session.execute(insert(User), mappings)
+                db.session.commit()
+                created += len(batch)
+            except IntegrityError:
+                # 与并发写入冲突：回退为逐行插入，定位具体失败行
+                db.session.rollback()
+                for record, mapping in zip(batch, mappings):
+                    try:
+                        db.session.execute(insert(User), [mapping])
+                        db.session.commit()
+                        created += 1
+                    except IntegrityError:
+                        db.session.rollback()
+                        errors.append({'row': record['_row'], 'username': record['username'], 'error': "用户名或邮箱已存在"})
+
+        errors.sort(key=lambda e: e['row'] or 0)
+        current_app.logger.info(
+            f"批量导入用户完成：共 {len(rows)} 行，成功 {created} 行，失败 {len(errors)} 行"
+        )
+        return {'total': len(rows), 'created': created, 'errors': errors}
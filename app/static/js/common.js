@@ -14,6 +14,8 @@
         navbarScrolledClass: 'scrolled',        // 导航栏滚动后添加的类名
         scrollThreshold: 50,                    // 滚动多少像素后触发 navbar 变化（像素）
         toastDuration: 5000,                    // flash 消息自动消失时间（毫秒）
+        notificationStartDelay: 1000,           // 页面加载后多久开始通知长轮询（毫秒）
+        notificationMaxBackoff: 60000,          // 长轮询连续失败时的最长重试间隔（毫秒）
     };
 
 
@@ -70,7 +72,77 @@
 
 
     // =============================================
-    // 5. 页面加载完成后统一初始化
+    // 5. 导航栏通知角标（长轮询）
+    // =============================================
+    // 带上已知未读数请求 /notifications/poll，服务端在未读数变化前挂起（至多约 25 秒），
+    // 有新通知立即返回；返回后立刻发起下一轮，不定时拉取通知列表
+    // - 服务端挂起数已满时返回 retry_after（秒），按此间隔退避
+    // - 页面隐藏时暂停，重新可见时恢复；会话超时（401）后停止
+    function initNotificationBadge() {
+        const bell = document.getElementById('notificationBell');
+        if (!bell || !window.fetch) return;
+
+        const badge = bell.querySelector('.notification-badge');
+        const pollUrl = bell.dataset.pollUrl;
+        let unread = parseInt(bell.dataset.unread || '0', 10);
+        let failures = 0;
+        let paused = false;
+        let stopped = false;
+
+        function render(count) {
+            if (!badge) return;
+            badge.textContent = count > 99 ? '99+' : String(count);
+            badge.classList.toggle('d-none', count <= 0);
+        }
+
+        function schedule(delay) {
+            window.setTimeout(poll, delay);
+        }
+
+        function poll() {
+            if (stopped) return;
+            if (document.hidden) {
+                paused = true;
+                return;
+            }
+            fetch(`${pollUrl}?since=${unread}`, {
+                credentials: 'same-origin',
+                headers: { 'X-Requested-With': 'XMLHttpRequest', 'Accept': 'application/json' }
+            })
+                .then(resp => {
+                    if (resp.status === 401) {
+                        stopped = true;
+                        return null;
+                    }
+                    if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+                    return resp.json();
+                })
+                .then(data => {
+                    if (!data) return;
+                    failures = 0;
+                    unread = data.unread;
+                    render(unread);
+                    schedule(data.retry_after ? data.retry_after * 1000 : 0);
+                })
+                .catch(() => {
+                    failures += 1;
+                    schedule(Math.min(config.notificationMaxBackoff, 1000 * 2 ** failures));
+                });
+        }
+
+        document.addEventListener('visibilitychange', () => {
+            if (!document.hidden && paused) {
+                paused = false;
+                poll();
+            }
+        });
+
+        schedule(config.notificationStartDelay);
+    }
+
+
+    // =============================================
+    // 6. 页面加载完成后统一初始化
     // =============================================
     document.addEventListener('DOMContentLoaded', () => {
         console.log('FFE 项目跟进系统 - common.js 已加载');
@@ -84,13 +156,16 @@
         // 初始化全局 AJAX 错误处理（可选）
         setupGlobalAjaxError();
 
+        // 导航栏通知角标
+        initNotificationBadge();
+
         // 后续可在此添加更多全局初始化逻辑
         // 如：表单自动聚焦、暗黑模式切换、图片懒加载等
     });
 
 
     // =============================================
-    // 6. 暴露全局工具函数（可选）
+    // 7. 暴露全局工具函数（可选）
     // =============================================
     window.FFE = window.FFE || {};
 
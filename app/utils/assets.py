@@ -0,0 +1,87 @@
+# 文件路径：app/utils/assets.py
+# 更新日期：2026-10-19
+# 功能说明：静态资源内容哈希指纹，启动时为 app/static 下每个文件生成哈希清单，提供 static_url 模板函数输出带 ?v=<哈希> 的地址，并对哈希匹配的静态请求返回一年期 immutable 缓存头
+
+import hashlib
+import os
+from flask import request, url_for
+from app.utils.warmup import add_warmup_step
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def file_hash(path: str, length: int = 12) -> str:
+    """文件内容哈希（sha256 前 length 位），分块读取"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:length]
+
+
+class AssetManifest:
+    """
+    静态资源清单：相对路径（与 url_for('static', filename=...) 一致）→ (mtime, 内容哈希)
+    auto_reload 开启时（开发环境）每次查询比对 mtime，文件修改后自动换新哈希；
+    生产环境只在启动时构建一次，查询为纯字典读取
+    """
+
+    def __init__(self, static_folder: str, auto_reload: bool = False):
+        self.static_folder = static_folder
+        self.auto_reload = auto_reload
+        self.entries: dict[str, tuple[float, str]] = {}
+
+    def build(self) -> int:
+        """遍历静态目录生成全部哈希，返回文件数"""
+        entries = {}
+        for root, _dirs, files in os.walk(self.static_folder):
+            for name in files:
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, self.static_folder).replace(os.sep, '/')
+                entries[filename] = (os.path.getmtime(path), file_hash(path))
+        self.entries = entries
+        return len(entries)
+
+    def get(self, filename: str) -> str | None:
+        """返回文件当前哈希；文件不存在返回 None"""
+        entry = self.entries.get(filename)
+        if not self.auto_reload:
+            return entry[1] if entry else None
+
+        path = os.path.join(self.static_folder, filename)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self.entries.pop(filename, None)
+            return None
+        if entry is None or entry[0] != mtime:
+            entry = self.entries[filename] = (mtime, file_hash(path))
+        return entry[1]
+
+
+def init_assets(app) -> None:
+    """在 create_app() 中调用：登记清单构建（预热阶段执行），注册 static_url 模板函数与长缓存响应钩子"""
+    manifest = AssetManifest(
+        app.static_folder,
+        auto_reload=app.config.get('ASSET_MANIFEST_AUTO_RELOAD', app.debug)
+    )
+    app.extensions['asset_manifest'] = manifest
+    add_warmup_step(app, '静态资源清单', lambda: f'{manifest.build()} 个文件', required=True)
+
+    @app.template_global('static_url')
+    def static_url(filename: str, **kwargs) -> str:
+        """带内容哈希的静态资源地址：内容不变则地址不变，浏览器可长期缓存"""
+        version = manifest.get(filename)
+        if version:
+            kwargs['v'] = version
+        return url_for('static', filename=filename, **kwargs)
+
+    @app.after_request
+    def cache_fingerprinted_assets(response):
+        if request.endpoint != 'static' or response.status_code not in (200, 304):
+            return response
+        version = request.args.get('v')
+        filename = (request.view_args or {}).get('filename')
+        if version and filename and version == manifest.get(filename):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
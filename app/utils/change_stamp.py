@@ -0,0 +1,47 @@
+# 文件路径：app/utils/change_stamp.py
+# 更新日期：2026-10-19
+# 功能说明：跨 worker 的变更戳文件，写方在数据提交后 bump()（原子替换 instance/stamps 下的小文件），读方每次只做一次 os.stat 比对 (mtime_ns, inode)，发现变化才重新加载进程内缓存
+
+import os
+import time
+
+_UNSEEN = object()
+
+
+class ChangeStamp:
+    """
+    用法：
+        stamp = ChangeStamp(path)
+        if stamp.changed(): reload()      # 读方：先记下新戳再加载，加载期间的新变更下次仍能发现
+        stamp.bump()                      # 写方：数据库提交之后调用
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._seen = _UNSEEN
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def _token(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_ino
+
+    def changed(self) -> bool:
+        token = self._token()
+        if token == self._seen:
+            return False
+        self._seen = token
+        return True
+
+    def forget(self) -> None:
+        """读方重新加载失败时调用：忘记已记下的戳，下次 changed() 必定返回 True"""
+        self._seen = _UNSEEN
+
+    def bump(self) -> None:
+        # 写临时文件后替换：inode 必然变化，mtime 精度不足时也能被发现
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(time.time_ns()))
+        os.replace(tmp_path, self.path)
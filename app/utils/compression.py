@@ -0,0 +1,121 @@
+# 文件路径：app/utils/compression.py
+# 更新日期：2026-10-19
+# 功能说明：响应 gzip 压缩工具，按 Accept-Encoding 协商，对导出 / 计算器接口的响应做即时压缩；普通响应按大小阈值判断，流式响应逐块压缩输出
+
+import gzip
+import itertools
+import zlib
+from flask import request
+
+# 可压缩的 MIME 类型（图片 / 压缩包等已压缩格式不再处理）
+COMPRESSIBLE_MIMETYPES = {
+    'text/csv',
+    'text/plain',
+    'text/html',
+    'text/tab-separated-values',
+    'application/json',
+    'application/x-ndjson',
+}
+
+
+def client_accepts_gzip(accept_encoding: str | None) -> bool:
+    """
+    解析 Accept-Encoding 判断客户端是否接受 gzip
+    支持 q 值（gzip;q=0 表示明确拒绝）与通配符 *
+    """
+    if not accept_encoding:
+        return False
+
+    wildcard_q = None
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token in ('gzip', 'x-gzip'):
+            return q > 0
+        if token == '*':
+            wildcard_q = q
+
+    return bool(wildcard_q and wildcard_q > 0)
+
+
+def gzip_stream(chunks, level: int = 6, source=None):
+    """
+    流式 gzip 压缩生成器：逐块压缩并输出，内存占用与响应总大小无关
+    结束（或客户端断开）时关闭原始可迭代对象 source（默认即 chunks），保证数据库游标等资源被释放
+    """
+    source = chunks if source is None else source
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # 16+ → gzip 头
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        close = getattr(source, 'close', None)
+        if close is not None:
+            close()
+
+
+def _should_compress(app, response) -> bool:
+    if not app.config.get('GZIP_ENABLED', True):
+        return False
+    if request.blueprint not in app.config.get('GZIP_BLUEPRINTS', ()):
+        return False
+    if response.status_code != 200 or response.direct_passthrough:
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+    return client_accepts_gzip(request.headers.get('Accept-Encoding'))
+
+
+def init_compression(app) -> None:
+    """在 create_app() 中调用：注册 after_request 钩子，对指定蓝图的响应做 gzip 协商压缩"""
+
+    @app.after_request
+    def compress_response(response):
+        if not _should_compress(app, response):
+            return response
+
+        level = int(app.config.get('GZIP_COMPRESS_LEVEL', 6))
+
+        # 无论是否压缩，缓存都必须区分编码
+        response.vary.add('Accept-Encoding')
+
+        min_size = int(app.config.get('GZIP_MIN_SIZE', 1024))
+
+        if response.is_streamed:
+            # 流式响应（生成器）：先预读到阈值大小，不足阈值说明内容很小，按普通响应原样返回
+            source = response.response
+            chunks = response.iter_encoded()
+            head, head_size = [], 0
+            for chunk in chunks:
+                head.append(chunk)
+                head_size += len(chunk)
+                if head_size >= min_size:
+                    break
+            else:
+                response.set_data(b''.join(head))
+                return response
+
+            response.response = gzip_stream(itertools.chain(head, chunks), level, source=source)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < min_size:
+                return response
+            response.set_data(gzip.compress(body, compresslevel=level))
+
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
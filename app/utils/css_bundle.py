@@ -0,0 +1,188 @@
+# 文件路径：app/utils/css_bundle.py
+# 更新日期：2026-10-19
+# 功能说明：按主题预编译 CSS 合并包，将 custom.css（含 @import 的 variables / base / default）、用户主题文件与 frame.css 展开合并并压缩为单个文件，按内容哈希缓存在内存与 instance 目录，页面按 current_user.theme 一次请求加载
+
+import gzip
+import hashlib
+import os
+import re
+from flask import Response, abort, request, url_for
+from flask_login import current_user
+from app.utils.compression import client_accepts_gzip
+from app.utils.warmup import add_warmup_step
+
+# 合并顺序：入口（展开 @import）→ 用户主题 → 页面框架
+BUNDLE_HEAD = ('css/custom.css',)
+BUNDLE_TAIL = ('css/frame.css',)
+THEME_DIR = 'css/themes'
+NON_THEME_FILES = ('variables.css',)
+DEFAULT_THEME = 'default'
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# 压缩规则变更时递增，使旧的磁盘缓存失效
+BUNDLE_FORMAT = '1'
+
+_IMPORT_RE = re.compile(r'@import\s+(?:url\(\s*)?["\']?([^"\')\s]+)["\']?\s*\)?\s*;')
+# 字符串字面量 | 注释（字符串内的 /* 不视为注释）
+_STRING_OR_COMMENT_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)', re.S)
+_STRING_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+_SPACE_AROUND_RE = re.compile(r'\s*([{};,>])\s*')
+
+
+def _strip_comments(css: str) -> str:
+    return _STRING_OR_COMMENT_RE.sub(lambda m: m.group(1) or '', css)
+
+
+def minify_css(css: str) -> str:
+    """
+    保守压缩：去注释、折叠空白、去掉 { } ; , > 两侧空白与块末分号
+    字符串字面量（含 data URI）原样保留；不改写冒号两侧，避免破坏 a :hover 之类选择器
+    """
+    parts = _STRING_RE.split(_strip_comments(css))
+    for index in range(0, len(parts), 2):  # 偶数下标为字符串之外的部分
+        text = re.sub(r'\s+', ' ', parts[index])
+        text = _SPACE_AROUND_RE.sub(r'\1', text)
+        # 空值自定义属性（--primary: ;）保留一个空格，兼容旧版浏览器
+        parts[index] = text.replace(';}', '}').replace(':;', ': ;').replace(':}', ': }')
+    return ''.join(parts).strip()
+
+
+class CssBundler:
+    """
+    主题 CSS 合并包：
+    - 展开后的源码内容哈希作为版本号与磁盘缓存键，缓存命中时跳过压缩
+    - 内存中同时保存原文与 gzip 版本，请求时零计算
+    - auto_reload 开启时（开发环境）按源文件 mtime 判断是否重建
+    """
+
+    def __init__(self, static_folder: str, cache_dir: str, auto_reload: bool = False):
+        self.static_folder = static_folder
+        self.cache_dir = cache_dir
+        self.auto_reload = auto_reload
+        self.bundles: dict[str, dict] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def themes(self) -> list[str]:
+        """可用主题（themes 目录下除变量声明外的 css 文件名）"""
+        theme_dir = os.path.join(self.static_folder, THEME_DIR)
+        return sorted(
+            name[:-4] for name in os.listdir(theme_dir)
+            if name.endswith('.css') and name not in NON_THEME_FILES
+        )
+
+    def _read_expanded(self, relpath: str, seen: set, sources: list) -> str:
+        """读取文件并递归展开本地 @import（同一文件只展开一次）"""
+        relpath = os.path.normpath(relpath).replace(os.sep, '/')
+        if relpath in seen:
+            return ''
+        seen.add(relpath)
+        path = os.path.join(self.static_folder, relpath)
+        with open(path, encoding='utf-8') as f:
+            css = _strip_comments(f.read())  # 注释中示例的 @import 不展开
+        sources.append((path, os.path.getmtime(path)))
+        base = os.path.dirname(relpath)
+
+        def replace_import(match):
+            target = match.group(1)
+            if '://' in target or target.startswith('//'):
+                return match.group(0)  # 外部地址保留原样
+            return self._read_expanded(os.path.join(base, target), seen, sources)
+
+        return _IMPORT_RE.sub(replace_import, css)
+
+    def build(self, theme: str) -> dict:
+        """展开并压缩指定主题的合并包（优先读取磁盘缓存），返回 bundle 信息"""
+        seen, sources, chunks = set(), [], []
+        for relpath in (*BUNDLE_HEAD, f'{THEME_DIR}/{theme}.css', *BUNDLE_TAIL):
+            chunks.append(self._read_expanded(relpath, seen, sources))
+        source = '\n'.join(chunks)
+        version = hashlib.sha256(f'{BUNDLE_FORMAT}\n{source}'.encode('utf-8')).hexdigest()[:12]
+
+        cache_path = os.path.join(self.cache_dir, f'{theme}-{version}.css')
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                body = f.read()
+        else:
+            body = minify_css(source).encode('utf-8')
+            tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, cache_path)  # 原子替换，多进程同时构建互不干扰
+
+        bundle = {
+            'version': version,
+            'body': body,
+            'gzip': gzip.compress(body, compresslevel=9),
+            'sources': sources,
+        }
+        self.bundles[theme] = bundle
+        return bundle
+
+    def build_all(self) -> int:
+        """构建全部主题，返回主题数"""
+        themes = self.themes()
+        for theme in themes:
+            self.build(theme)
+        return len(themes)
+
+    def get(self, theme: str) -> dict | None:
+        """取主题合并包；未知主题返回 None"""
+        bundle = self.bundles.get(theme)
+        if bundle is None:
+            if theme not in self.themes():
+                return None
+            return self.build(theme)
+        if self.auto_reload and any(
+            not os.path.exists(path) or os.path.getmtime(path) != mtime
+            for path, mtime in bundle['sources']
+        ):
+            return self.build(theme)
+        return bundle
+
+
+def current_theme() -> str:
+    """当前请求应使用的主题（未登录或未设置时为默认主题）"""
+    if current_user and current_user.is_authenticated and current_user.theme:
+        return current_user.theme
+    return DEFAULT_THEME
+
+
+def init_css_bundles(app) -> None:
+    """在 create_app() 中调用：登记全部主题合并包的预构建（预热阶段执行），注册 theme_css_url 模板函数与合并包路由"""
+    bundler = CssBundler(
+        app.static_folder,
+        os.path.join(app.root_path, 'instance', 'css_bundles'),
+        auto_reload=app.config.get('ASSET_MANIFEST_AUTO_RELOAD', app.debug)
+    )
+    app.extensions['css_bundler'] = bundler
+    add_warmup_step(app, 'CSS 合并包', lambda: f'{bundler.build_all()} 个主题', required=True)
+
+    @app.template_global('theme_css_url')
+    def theme_css_url(theme: str | None = None) -> str:
+        """当前用户主题合并包地址（文件名带内容哈希）"""
+        theme = theme or current_theme()
+        bundle = bundler.get(theme)
+        if bundle is None:
+            theme, bundle = DEFAULT_THEME, bundler.get(DEFAULT_THEME)
+        return url_for('theme_css', theme=theme, version=bundle['version'])
+
+    def theme_css(theme, version):
+        bundle = bundler.get(theme)
+        if bundle is None:
+            abort(404)
+
+        use_gzip = client_accepts_gzip(request.headers.get('Accept-Encoding'))
+        response = Response(bundle['gzip'] if use_gzip else bundle['body'], mimetype='text/css')
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        response.set_etag(f"{bundle['version']}-gz" if use_gzip else bundle['version'])
+
+        if version == bundle['version']:
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        else:
+            # 旧页面引用的过期版本：返回当前内容但不允许长缓存
+            response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    app.add_url_rule('/assets/css/<version>/<theme>.css', 'theme_css', theme_css, methods=['GET'])
@@ -0,0 +1,77 @@
+# 文件路径：app/utils/fragment_cache.py
+# 更新日期：2026-10-19
+# 功能说明：页面片段渲染缓存（进程内 LRU），按 (片段名, 用户ID) 保存最近一次渲染结果及其数据版本号，版本号变化即视为失效，无需跨进程广播
+
+import threading
+from collections import OrderedDict
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """
+    片段缓存：每个 (片段名, 用户ID) 只保留一个槽位 → (数据版本, HTML)
+    - 读取时版本号不一致即未命中（数据版本由数据库汇总行维护，所有 worker 看到的是同一个值）
+    - 容量满时淘汰最久未使用的槽位
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, user_id: int, version) -> Markup | None:
+        key = (name, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, name: str, user_id: int, version, html: str) -> Markup:
+        html = Markup(html)
+        key = (name, user_id)
+        with self._lock:
+            self._entries[key] = (version, html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def invalidate(self, name: str, user_id: int | None = None) -> None:
+        """主动失效：指定用户的片段，或 user_id 为空时该片段全部用户"""
+        with self._lock:
+            if user_id is not None:
+                self._entries.pop((name, user_id), None)
+                return
+            for key in [key for key in self._entries if key[0] == name]:
+                del self._entries[key]
+
+    def get_or_render(self, name: str, user_id: int, version, render) -> Markup:
+        """命中则返回缓存，否则调用 render() 渲染并写入"""
+        html = self.get(name, user_id, version)
+        if html is None:
+            html = self.set(name, user_id, version, render())
+        return html
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            'entries': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def init_fragment_cache(app) -> None:
+    """在 create_app() 中调用：创建进程内片段缓存，挂在 app.extensions['fragment_cache']"""
+    app.extensions['fragment_cache'] = FragmentCache(
+        max_entries=int(app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 1024))
+    )
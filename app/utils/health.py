@@ -0,0 +1,71 @@
+# 文件路径：app/utils/health.py
+# 更新日期：2026-10-19
+# 功能说明：负载均衡 / 容器探针端点，/healthz 存活检查不做任何 I/O，/readyz 就绪检查（数据库 SELECT 1、上传目录可写、系统设置快照可加载）结果按进程短时缓存，每秒一次的探针几乎零开销，且两者都不读写会话、不下发 Cookie
+
+import os
+import threading
+import time
+from flask import jsonify
+from sqlalchemy import text
+
+PROBE_ENDPOINTS = ('healthz', 'readyz')
+
+
+def check_readiness(app) -> dict[str, str]:
+    """逐项检查，返回 {检查项: 'ok' 或错误说明}"""
+    from app import db
+    from app.services.settings_service import SettingsService
+
+    checks = {}
+    try:
+        db.session.execute(text('SELECT 1'))
+        checks['database'] = 'ok'
+    except Exception as e:
+        db.session.rollback()
+        checks['database'] = type(e).__name__
+
+    upload_folder = app.config['UPLOAD_FOLDER']
+    checks['upload_folder'] = 'ok' if os.path.isdir(upload_folder) and os.access(upload_folder, os.W_OK) else '不可写'
+
+    try:
+        SettingsService.get_snapshot()
+        checks['settings'] = 'ok'
+    except Exception as e:
+        db.session.rollback()
+        checks['settings'] = type(e).__name__
+    return checks
+
+
+def _no_store(response):
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def init_health(app) -> None:
+    """在 create_app() 中调用：注册 /healthz 与 /readyz（READINESS_CACHE_SECONDS 内复用上次就绪结果）"""
+    cache_seconds = float(app.config.get('READINESS_CACHE_SECONDS', 2))
+    lock = threading.Lock()
+    cached = {'checked_at': 0.0, 'checks': None}
+
+    def healthz():
+        return _no_store(jsonify(status='ok'))
+
+    def readyz():
+        # 缓存过期时只有一个线程去检查，其他并发探针直接用旧结果
+        now = time.monotonic()
+        if cached['checks'] is None or now - cached['checked_at'] > cache_seconds:
+            if lock.acquire(blocking=cached['checks'] is None):
+                try:
+                    cached['checks'] = check_readiness(app)
+                    cached['checked_at'] = time.monotonic()
+                finally:
+                    lock.release()
+
+        checks = cached['checks']
+        ready = all(value == 'ok' for value in checks.values())
+        response = jsonify(status='ready' if ready else 'not_ready', checks=checks)
+        response.status_code = 200 if ready else 503
+        return _no_store(response)
+
+    app.add_url_rule('/healthz', 'healthz', healthz, methods=['GET'])
+    app.add_url_rule('/readyz', 'readyz', readyz, methods=['GET'])
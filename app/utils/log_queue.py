@@ -0,0 +1,176 @@
+# 文件路径：app/utils/log_queue.py
+# 更新日期：2026-10-19
+# 功能说明：非阻塞日志管线，请求线程只把日志记录放入队列（QueueHandler），由后台 QueueListener 线程写文件；提供多进程安全的按大小轮转文件处理器与可选 JSON Lines 格式（含请求ID、用户ID、请求内耗时）
+
+import atexit
+import json
+import logging
+import os
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask import g, has_request_context
+from app.utils.session_epoch import session_user_id
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:  # Windows 开发环境：单进程运行，无需文件锁
+    HAS_FCNTL = False
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(name)s:%(lineno)d] [%(request_id)s] %(message)s'
+
+_listeners: list[QueueListener] = []
+
+
+class RequestContextFilter(logging.Filter):
+    """在请求线程内（入队前）补充请求ID / 用户ID / 请求已耗时，请求上下文之外填 '-'"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if has_request_context():
+            record.request_id = g.get('request_id') or '-'
+            record.user_id = session_user_id() or '-'
+            start = g.get('_log_request_start')
+            record.elapsed_ms = round((time.perf_counter() - start) * 1000, 1) if start else None
+        else:
+            record.request_id = '-'
+            record.user_id = '-'
+            record.elapsed_ms = None
+        return True
+
+
+class JsonLineFormatter(logging.Formatter):
+    """每条日志一行 JSON，便于日志平台直接解析"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'where': f'{record.module}:{record.lineno}',
+            'pid': record.process,
+            'request_id': getattr(record, 'request_id', '-'),
+            'user_id': getattr(record, 'user_id', '-'),
+            'elapsed_ms': getattr(record, 'elapsed_ms', None),
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class ProcessSafeRotatingFileHandler(RotatingFileHandler):
+    """
+    多 worker 共写同一文件时的轮转处理器：
+    - 每次写入持有 <文件>.lock 的排他文件锁，轮转判断与执行都在锁内完成
+    - 写入前检查路径上的文件是否已被其他进程轮转（inode 变化），是则重新打开，避免写进已改名的旧文件
+    - 锁文件按进程打开（fork 继承的文件描述共享同一把 flock，不能跨进程互斥）
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(filename, *args, **kwargs)
+        self._lock_path = f'{self.baseFilename}.lock'
+        self._lock_file = None
+        self._lock_pid = None
+
+    def _acquire_process_lock(self):
+        if not HAS_FCNTL:
+            return
+        if self._lock_pid != os.getpid():
+            self._lock_file = open(self._lock_path, 'a')
+            self._lock_pid = os.getpid()
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+
+    def _release_process_lock(self):
+        if HAS_FCNTL and self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            on_disk = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            on_disk = None
+        if on_disk is None or on_disk.st_ino != os.fstat(self.stream.fileno()).st_ino:
+            self.stream.close()
+            self.stream = self._open()
+
+    def emit(self, record):
+        try:
+            self._acquire_process_lock()
+        except OSError:
+            self.handleError(record)
+            return
+        try:
+            self._reopen_if_rotated()
+            super().emit(record)
+        finally:
+            self._release_process_lock()
+
+
+def queued(*handlers: logging.Handler) -> QueueHandler:
+    """
+    把若干（可能阻塞的）处理器挪到后台线程：返回挂在 logger 上的 QueueHandler
+    后台 QueueListener 在进程退出时停止并写完队列；gunicorn preload 模式 fork 出的 worker 中自动重建队列与线程
+    """
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener._queue_handler = queue_handler
+    listener.start()
+    _listeners.append(listener)
+    return queue_handler
+
+
+def _stop_listeners() -> None:
+    for listener in _listeners:
+        try:
+            listener.stop()
+        except Exception:
+            pass
+
+
+def _restart_listeners_after_fork() -> None:
+    # 子进程只继承了 fork 时的调用线程，写入线程不存在；队列锁也可能处于被持有状态，一并换新
+    for listener in _listeners:
+        listener.queue = listener._queue_handler.queue = queue.SimpleQueue()
+        listener._thread = None
+        listener.start()
+
+
+atexit.register(_stop_listeners)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listeners_after_fork)
+
+
+def rotating_file_handler(path: str, max_bytes: int, backup_count: int) -> RotatingFileHandler:
+    """创建多进程安全的按大小轮转文件处理器（目录不存在时自动创建）"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    return ProcessSafeRotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+
+
+def init_logging(app) -> None:
+    """在 create_app() 中调用（非调试 / 非测试模式）：app.logger 写 logs/ffe.log，经队列由后台线程落盘"""
+    file_handler = rotating_file_handler(
+        os.path.join('logs', 'ffe.log'),
+        max_bytes=int(app.config.get('LOG_MAX_BYTES', 10 * 1024 * 1024)),   # 10MB
+        backup_count=int(app.config.get('LOG_BACKUP_COUNT', 5)),
+    )
+    if app.config.get('LOG_JSON'):
+        file_handler.setFormatter(JsonLineFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    file_handler.setLevel(logging.INFO)
+
+    if app.config.get('LOG_QUEUE', True):
+        app.logger.addHandler(queued(file_handler))
+    else:
+        file_handler.addFilter(RequestContextFilter())
+        app.logger.addHandler(file_handler)
+    app.logger.setLevel(logging.INFO)
+
+    @app.before_request
+    def mark_log_request_start():
+        g._log_request_start = time.perf_counter()
@@ -0,0 +1,211 @@
+# 文件路径：app/utils/metrics.py
+# 更新日期：2026-10-19
+# 功能说明：请求性能指标采集，按端点记录总耗时、数据库耗时、模板渲染耗时与响应大小的固定分桶直方图（进程内存），供后台指标页计算 p50/p95/p99；Server-Timing 响应头只对拥有性能诊断权限的登录用户输出（生产环境默认关闭）
+
+import bisect
+import threading
+import time
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.utils.permissions import Perm, has_perm
+
+# 耗时分桶上界（毫秒），最后一档为 +Inf
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+# 响应大小分桶上界（字节）
+SIZE_BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, float('inf'))
+
+UNMATCHED_ENDPOINT = '<unmatched>'
+
+
+class Histogram:
+    """固定分桶直方图：O(1) 记录，分位数按桶内线性插值估算（精度取决于分桶粒度）"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                if upper == float('inf'):
+                    return self.max
+                fraction = (rank - cumulative) / bucket_count
+                return min(lower + (upper - lower) * fraction, self.max)
+            cumulative += bucket_count
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class EndpointMetrics:
+    """单个端点的指标集合"""
+
+    __slots__ = ('wall', 'db', 'template', 'size', 'db_queries', 'errors')
+
+    def __init__(self):
+        self.wall = Histogram(LATENCY_BUCKETS_MS)
+        self.db = Histogram(LATENCY_BUCKETS_MS)
+        self.template = Histogram(LATENCY_BUCKETS_MS)
+        self.size = Histogram(SIZE_BUCKETS_BYTES)
+        self.db_queries = 0
+        self.errors = 0
+
+
+class MetricsRegistry:
+    """进程内指标注册表（线程安全），键为端点名（blueprint.view）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints: dict[str, EndpointMetrics] = {}
+        self.started_at = time.time()
+
+    def record(self, endpoint: str, wall_ms: float, db_ms: float, db_queries: int,
+               template_ms: float, size: int | None, status: int) -> None:
+        with self._lock:
+            metrics = self.endpoints.get(endpoint)
+            if metrics is None:
+                metrics = self.endpoints[endpoint] = EndpointMetrics()
+            metrics.wall.observe(wall_ms)
+            metrics.db.observe(db_ms)
+            metrics.template.observe(template_ms)
+            if size is not None:
+                metrics.size.observe(size)
+            metrics.db_queries += db_queries
+            if status >= 500:
+                metrics.errors += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.endpoints = {}
+            self.started_at = time.time()
+
+    def snapshot(self) -> list[dict]:
+        """各端点汇总（按请求数降序），供后台指标页展示"""
+        with self._lock:
+            items = list(self.endpoints.items())
+            rows = []
+            for endpoint, m in items:
+                count = m.wall.count
+                rows.append({
+                    'endpoint': endpoint,
+                    'count': count,
+                    'errors': m.errors,
+                    'wall_p50': m.wall.quantile(0.50),
+                    'wall_p95': m.wall.quantile(0.95),
+                    'wall_p99': m.wall.quantile(0.99),
+                    'wall_max': m.wall.max,
+                    'db_p50': m.db.quantile(0.50),
+                    'db_p95': m.db.quantile(0.95),
+                    'db_p99': m.db.quantile(0.99),
+                    'db_queries_avg': m.db_queries / count if count else 0.0,
+                    'template_p50': m.template.quantile(0.50),
+                    'template_p95': m.template.quantile(0.95),
+                    'template_p99': m.template.quantile(0.99),
+                    'size_p50': m.size.quantile(0.50),
+                    'size_p95': m.size.quantile(0.95),
+                })
+        rows.sort(key=lambda row: row['count'], reverse=True)
+        return rows
+
+
+# ──────────────────────────────────────────────
+# 采集钩子
+# ──────────────────────────────────────────────
+
+def _on_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info.setdefault('_metrics_query_start', []).append(time.perf_counter())
+
+
+def _on_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_metrics_query_start')
+    if not starts or not has_request_context():
+        return
+    elapsed = (time.perf_counter() - starts.pop()) * 1000
+    g._metrics_db_ms = g.get('_metrics_db_ms', 0.0) + elapsed
+    g._metrics_db_queries = g.get('_metrics_db_queries', 0) + 1
+
+
+def _on_before_render(sender, template, context, **extra):
+    # 嵌套渲染（片段缓存内的 render_template）只计最外层，避免重复累计
+    depth = g.get('_metrics_tpl_depth', 0)
+    if depth == 0:
+        g._metrics_tpl_start = time.perf_counter()
+    g._metrics_tpl_depth = depth + 1
+
+
+def _on_rendered(sender, template, context, **extra):
+    depth = g.get('_metrics_tpl_depth', 1) - 1
+    g._metrics_tpl_depth = depth
+    if depth == 0 and '_metrics_tpl_start' in g:
+        g._metrics_tpl_ms = g.get('_metrics_tpl_ms', 0.0) + (time.perf_counter() - g._metrics_tpl_start) * 1000
+
+
+def init_metrics(app) -> None:
+    """
+    在 create_app() 中调用：注册请求计时钩子、数据库游标事件与模板渲染信号
+    须在其他 after_request 钩子（如 gzip 压缩）之前注册，使其最后执行，记录到最终响应大小
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    registry = MetricsRegistry()
+    app.extensions['metrics'] = registry
+    server_timing = app.config.get('METRICS_SERVER_TIMING', True)
+
+    # 事件监听挂在 Engine 类上：所有引擎（含测试库）统一生效，且只注册一次
+    if not event.contains(Engine, 'before_cursor_execute', _on_before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _on_before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _on_after_cursor_execute)
+    before_render_template.connect(_on_before_render, app)
+    template_rendered.connect(_on_rendered, app)
+
+    @app.before_request
+    def start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.get('_metrics_start')
+        if start is None:
+            return response
+
+        wall_ms = (time.perf_counter() - start) * 1000
+        db_ms = g.get('_metrics_db_ms', 0.0)
+        db_queries = g.get('_metrics_db_queries', 0)
+        template_ms = g.get('_metrics_tpl_ms', 0.0)
+        size = None if response.is_streamed else response.calculate_content_length()
+
+        registry.record(
+            request.endpoint or UNMATCHED_ENDPOINT,
+            wall_ms, db_ms, db_queries, template_ms, size, response.status_code
+        )
+
+        # 耗时明细（数据库查询数等）只给有诊断权限的用户看，避免向匿名访客暴露内部耗时结构
+        if server_timing and has_perm(Perm.VIEW_DIAGNOSTICS):
+            response.headers.add(
+                'Server-Timing',
+                f'app;dur={wall_ms:.1f}, db;dur={db_ms:.1f};desc="{db_queries} queries", tpl;dur={template_ms:.1f}'
+            )
+        return response
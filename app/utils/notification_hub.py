@@ -0,0 +1,100 @@
+# 文件路径：app/utils/notification_hub.py
+# 更新日期：2026-10-19
+# 功能说明：站内通知的进程内唤醒中心，长轮询请求在 threading.Condition 上挂起，本进程写入通知后按接收人立即唤醒；其他 worker 写入的通知经变更戳文件发现（挂起期间按间隔检查一次 os.stat），并限制每个 worker 同时挂起的请求数，避免占满 gthread 线程
+
+"""
+长轮询流程（见 app/routes/notification.py 的 poll）：
+1. 客户端带上已知的未读数 since，服务端读 user_stats 一行，不同则立即返回
+2. 相同则 hub.wait(user_id, timeout) 挂起：本进程 publish() 到该用户时立即醒来；
+   每隔 NOTIFICATION_FALLBACK_SECONDS 检查一次变更戳，其他进程有写入时唤醒全部挂起者各自重读计数
+3. 超时返回当前计数，客户端立即发起下一轮
+挂起数达到上限时 enter() 返回 False，由客户端按 retry_after 退化为普通间隔轮询
+"""
+
+import os
+import threading
+import time
+from app.utils.change_stamp import ChangeStamp
+
+
+class NotificationHub:
+    def __init__(self, stamp: ChangeStamp, max_waiters: int, fallback_seconds: float):
+        self.stamp = stamp
+        self.stamp.changed()  # 记下当前戳，启动前的写入不算变化
+        self.max_waiters = max_waiters
+        self.fallback_seconds = fallback_seconds
+        self._cond = threading.Condition()
+        self.waiters = 0
+        self.versions: dict[int, int] = {}   # 用户ID → 本进程内该用户的通知事件计数
+        self.remote_generation = 0           # 其他进程写入（变更戳变化）的次数
+
+    def enter(self) -> bool:
+        with self._cond:
+            if self.waiters >= self.max_waiters:
+                return False
+            self.waiters += 1
+            return True
+
+    def leave(self) -> None:
+        with self._cond:
+            self.waiters -= 1
+
+    def publish(self, user_ids) -> None:
+        """通知已提交后调用：唤醒本进程内这些用户的挂起请求，并通知其他 worker"""
+        with self._cond:
+            # 先消化此前其他 worker 的写入，再写戳并立即记下自己写的戳：
+            # 否则下一次 _check_remote 会把本进程的写入当作远程变化，唤醒全部挂起者各自重读计数
+            self._check_remote()
+            self.stamp.bump()
+            self.stamp.changed()
+            for user_id in user_ids:
+                self.versions[user_id] = self.versions.get(user_id, 0) + 1
+            self._cond.notify_all()
+
+    def _check_remote(self) -> None:
+        # 调用方已持有锁；changed() 有状态，只能由一处消费
+        if self.stamp.changed():
+            self.remote_generation += 1
+            self._cond.notify_all()
+
+    def wait(self, user_id: int, timeout: float) -> bool:
+        """挂起直到该用户可能有新通知（True）或超时（False）"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            version = self.versions.get(user_id, 0)
+            generation = self.remote_generation
+            while True:
+                if self.versions.get(user_id, 0) != version or self.remote_generation != generation:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, self.fallback_seconds))
+                self._check_remote()
+
+
+def notify_users(user_ids) -> None:
+    from flask import current_app
+    hub = current_app.extensions.get('notification_hub')
+    if hub is not None:
+        hub.publish(user_ids)
+
+
+def init_notifications(app) -> None:
+    """在 create_app() 中调用：创建唤醒中心，注册导航栏角标用的模板函数 unread_notifications()"""
+    threads = int(app.config.get('WSGI_THREADS') or 0) or 4
+    stamp = ChangeStamp(os.path.join(app.root_path, 'instance', 'stamps', 'notifications'))
+    app.extensions['notification_hub'] = NotificationHub(
+        stamp,
+        max_waiters=int(app.config.get('NOTIFICATION_MAX_WAITERS') or 0) or max(1, threads // 2),
+        fallback_seconds=float(app.config.get('NOTIFICATION_FALLBACK_SECONDS', 3))
+    )
+
+    def unread_notifications() -> int:
+        from flask_login import current_user
+        from app.services.notification_service import NotificationService
+        if not current_user.is_authenticated:
+            return 0
+        return NotificationService.unread_count(current_user.id)
+
+    app.jinja_env.globals['unread_notifications'] = unread_notifications
@@ -0,0 +1,76 @@
+# 文件路径：app/utils/optional_deps.py
+# 更新日期：2026-10-19
+# 功能说明：可选依赖延迟加载层，模块导入时只用 find_spec 判断是否安装（不执行导入），首次真正使用属性时才 import，避免 pandas / openpyxl 等重型库拖慢 worker 冷启动；Flask-Migrate（alembic）命令组按需加载
+
+import importlib
+import importlib.util
+from functools import lru_cache
+import click
+
+
+@lru_cache(maxsize=None)
+def is_available(name: str) -> bool:
+    """是否已安装（只查找模块规格，不执行模块代码）"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule:
+    """
+    可选模块代理：
+        openpyxl = optional_import('openpyxl')
+        if openpyxl.available: openpyxl.load_workbook(...)   # 第一次访问属性时才真正 import
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    @property
+    def available(self) -> bool:
+        return is_available(self._name)
+
+    def load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else ('lazy' if self.available else 'missing')
+        return f'<LazyModule {self._name} ({state})>'
+
+
+def optional_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def init_lazy_migrate(app, db, command: str = 'db') -> None:
+    """
+    注册占位的 flask db 命令组：只有执行 flask db ... 时才导入 flask_migrate / alembic（约 200ms）并完成 Migrate 初始化，
+    Web worker 启动不再承担这部分导入
+    """
+    def load_group() -> click.Group:
+        if 'migrate' not in app.extensions:
+            from flask_migrate import Migrate
+            Migrate(app, db, command=command)
+        from flask_migrate.cli import db as migrate_group
+        return migrate_group
+
+    # 参数原样转交真正的命令组（含 -d / -x 选项与 --help）
+    @click.command(
+        command,
+        help='数据库迁移（Flask-Migrate，按需加载）',
+        context_settings={'ignore_unknown_options': True, 'allow_extra_args': True, 'help_option_names': []}
+    )
+    @click.pass_context
+    def lazy_migrate(ctx):
+        group = load_group()
+        with group.make_context(ctx.info_name, list(ctx.args), parent=ctx.parent) as sub_ctx:
+            return group.invoke(sub_ctx)
+
+    app.cli.add_command(lazy_migrate)
@@ -0,0 +1,293 @@
+# 文件路径：app/utils/permissions.py
+# 更新日期：2026-10-19
+# 功能说明：权限位定义与编译缓存，用户的基础权限、角色权限（含继承链）与单独授权按位或编译为一个整数掩码，按用户ID缓存在进程内；角色继承与部门树的传递闭包预先计算为内存映射，项目可见性判断为一次集合查找；角色 / 部门 / 授权变更经变更戳文件通知各 worker 重建，@require(Perm.X) 装饰器与模板函数 has_perm() 的检查只是一次字典查找加按位与
+
+"""
+有效权限 = 基础权限 | 所属角色权限 | 用户单独授予的权限
+- 基础权限：管理员（User.is_admin）为全部权限；普通用户为 DEFAULT_USER_PERMISSIONS（与引入权限系统之前的可用功能一致）
+- 角色可继承一个上级角色（Role.parent_id，如 销售经理 → 销售 → 只读），角色的有效掩码为继承链上各角色掩码之和
+- 部门为树形（Department.parent_id），部门范围 = 本部门 + 全部下级部门
+- 角色有效掩码与部门范围在缓存重建时整表计算一次（两张表都很小），请求中不做递归遍历
+- 编译时查一次该用户的角色（只在缓存未命中时），之后每个请求不再产生额外查询
+- 变更流程：修改角色 / 部门 / 用户角色 / 单独授权 / 管理员标记 → db.session.commit() → notify_permissions_changed()
+
+项目可见性（project_scope() / can_view_project()）：
+- 本人负责的项目始终可见
+- VIEW_ALL_PROJECTS：全部项目
+- VIEW_DEPARTMENT_PROJECTS：Project.department_id 属于本人部门范围的项目
+"""
+
+import enum
+import functools
+import os
+import threading
+from flask import current_app, flash, jsonify, redirect, request, url_for
+from flask_login import current_user
+from app.utils.change_stamp import ChangeStamp
+
+
+class Perm(enum.IntFlag):
+    VIEW_PROJECTS = 1 << 0          # 查看自己的项目
+    EDIT_PROJECTS = 1 << 1          # 编辑自己的项目（房型 BOM、导入明细）
+    VIEW_ALL_PROJECTS = 1 << 2      # 查看 / 编辑全部项目
+    USE_CALCULATOR = 1 << 3         # 使用 KD 体积计算器
+    IMPORT_FFE = 1 << 4             # FFE 清单导入
+    EXPORT_DATA = 1 << 5            # 导出项目 / 计算结果
+    EXPORT_USERS = 1 << 6           # 导出用户列表
+    EDIT_TARIFFS = 1 << 7           # 维护运费 / 关税费率表
+    MANAGE_USERS = 1 << 8           # 人员管理（新建 / 编辑 / 导入 / 启用禁用）
+    MANAGE_ROLES = 1 << 9           # 角色与授权管理
+    MANAGE_SETTINGS = 1 << 10       # 系统基本设置
+    VIEW_DIAGNOSTICS = 1 << 11      # 性能指标 / 慢查询 / 请求采样分析
+    VIEW_DEPARTMENT_PROJECTS = 1 << 12  # 查看 / 编辑本部门及下级部门的项目
+
+
+PERMISSION_LABELS = {
+    Perm.VIEW_PROJECTS: '查看项目',
+    Perm.EDIT_PROJECTS: '编辑项目',
+    Perm.VIEW_ALL_PROJECTS: '查看全部项目',
+    Perm.USE_CALCULATOR: '使用计算器',
+    Perm.IMPORT_FFE: 'FFE 清单导入',
+    Perm.EXPORT_DATA: '导出数据',
+    Perm.EXPORT_USERS: '导出用户列表',
+    Perm.EDIT_TARIFFS: '维护费率表',
+    Perm.MANAGE_USERS: '人员管理',
+    Perm.MANAGE_ROLES: '角色权限管理',
+    Perm.MANAGE_SETTINGS: '系统设置',
+    Perm.VIEW_DIAGNOSTICS: '性能诊断',
+    Perm.VIEW_DEPARTMENT_PROJECTS: '查看本部门项目',
+}
+
+ALL_PERMISSIONS = functools.reduce(lambda mask, perm: mask | perm, Perm, Perm(0))
+DEFAULT_USER_PERMISSIONS = (
+    Perm.VIEW_PROJECTS | Perm.EDIT_PROJECTS | Perm.USE_CALCULATOR | Perm.IMPORT_FFE | Perm.EXPORT_DATA
+)
+# 持有其中任一权限即可进入后台（具体页面再按各自权限检查）
+ADMIN_AREA_PERMISSIONS = Perm.MANAGE_USERS | Perm.MANAGE_ROLES | Perm.MANAGE_SETTINGS | Perm.VIEW_DIAGNOSTICS
+# 导航栏"系统管理"入口：按顺序取用户有权访问的第一个后台页面
+ADMIN_HOME_PAGES = (
+    (Perm.MANAGE_SETTINGS, 'admin.system_settings'),
+    (Perm.MANAGE_USERS, 'admin.system_users'),
+    (Perm.MANAGE_ROLES, 'admin.roles'),
+    (Perm.VIEW_DIAGNOSTICS, 'admin.metrics'),
+)
+
+
+def permission_choices() -> list[tuple[str, str]]:
+    """表单多选项：(权限名, 中文说明)"""
+    return [(perm.name, PERMISSION_LABELS[perm]) for perm in Perm]
+
+
+def mask_from_names(names) -> int:
+    mask = 0
+    for name in names or ():
+        mask |= Perm[name]
+    return mask
+
+
+def names_from_mask(mask: int) -> list[str]:
+    return [perm.name for perm in Perm if mask & perm]
+
+
+def closure(parents: dict) -> dict[int, frozenset]:
+    """
+    传递闭包：{节点: 上级节点或 None} → {节点: 该节点及其全部上级}
+    按继承链逐个向上走并记忆已算出的结果；数据中若出现环（正常保存时已拒绝），环上节点只取到环为止
+    """
+    result: dict[int, frozenset] = {}
+    for start in parents:
+        chain = []
+        node = start
+        while node is not None and node not in result and node not in chain:
+            chain.append(node)
+            node = parents.get(node)
+        above = result.get(node, frozenset())
+        for node in reversed(chain):
+            above = result[node] = above | {node}
+    return result
+
+
+def descendants(parents: dict) -> dict[int, frozenset]:
+    """{节点: 上级节点} → {节点: 该节点及其全部下级}（由闭包反转得到）"""
+    result: dict[int, set] = {node: set() for node in parents}
+    for node, ancestors in closure(parents).items():
+        for ancestor in ancestors:
+            result.setdefault(ancestor, set()).add(node)
+    return {node: frozenset(nodes) for node, nodes in result.items()}
+
+
+class AccessGraph:
+    """角色继承与部门树的预计算结果（从数据库整表加载，变更戳变化时重建）"""
+
+    def __init__(self, role_rows=(), department_rows=()):
+        # role_rows: (id, parent_id, permissions)；department_rows: (id, parent_id)
+        role_parents = {role_id: parent_id for role_id, parent_id, _ in role_rows}
+        role_own = {role_id: permissions or 0 for role_id, _, permissions in role_rows}
+        self.role_lineage = closure(role_parents)
+        self.role_masks = {
+            role_id: functools.reduce(lambda mask, ancestor: mask | role_own.get(ancestor, 0), lineage, 0)
+            for role_id, lineage in self.role_lineage.items()
+        }
+        self.department_scope = descendants(dict(department_rows))
+
+    @classmethod
+    def load(cls) -> 'AccessGraph':
+        from app.models import Department, Role
+        return cls(
+            Role.query.with_entities(Role.id, Role.parent_id, Role.permissions).all(),
+            Department.query.with_entities(Department.id, Department.parent_id).all()
+        )
+
+
+def compile_mask(user, graph: AccessGraph | None = None) -> int:
+    """编译用户有效权限（会加载 user.roles；角色掩码取预计算的含继承结果）"""
+    mask = ALL_PERMISSIONS if user.is_admin else DEFAULT_USER_PERMISSIONS
+    mask |= user.granted_permissions or 0
+    for role in user.roles:
+        mask |= graph.role_masks.get(role.id, role.permissions or 0) if graph else role.permissions or 0
+    return int(mask)
+
+
+class PermissionCache:
+    """用户ID → 编译后的权限掩码 + 角色 / 部门闭包；变更戳变化时整体清空，闭包在下次使用时重建"""
+
+    def __init__(self, stamp: ChangeStamp):
+        self.stamp = stamp
+        self._lock = threading.Lock()
+        self.masks: dict[int, int] = {}
+        self._graph: AccessGraph | None = None
+        self.generation = 0   # 每次清空 +1，变更前开始加载的闭包不会写回清空后的缓存
+
+    def _check(self) -> None:
+        # 检查戳与清空在同一把锁内，其他线程看到"未变化"时清空已经完成
+        with self._lock:
+            if self.stamp.changed():
+                self.masks = {}
+                self._graph = None
+                self.generation += 1
+
+    @property
+    def graph(self) -> AccessGraph:
+        self._check()
+        with self._lock:
+            graph, generation = self._graph, self.generation
+        if graph is None:
+            graph = AccessGraph.load()
+            with self._lock:
+                if self.generation == generation:
+                    self._graph = graph
+        return graph
+
+    def mask_for(self, user) -> int:
+        self._check()
+        masks = self.masks   # 写入当前这张表：期间被清空时结果随旧表丢弃
+        mask = masks.get(user.id)
+        if mask is None:
+            mask = masks[user.id] = compile_mask(user, self.graph)
+        return mask
+
+
+def access_graph() -> AccessGraph:
+    cache = current_app.extensions.get('permissions')
+    return cache.graph if cache is not None else AccessGraph.load()
+
+
+def permission_mask(user=None) -> int:
+    user = user if user is not None else current_user
+    if not user or not user.is_authenticated:
+        return 0
+    cache = current_app.extensions.get('permissions')
+    return cache.mask_for(user) if cache is not None else compile_mask(user, AccessGraph.load())
+
+
+def has_perm(perm, user=None) -> bool:
+    """是否拥有 perm 中的全部权限位；perm 可为 Perm 或权限名字符串（模板中使用）"""
+    if isinstance(perm, str):
+        perm = Perm[perm]
+    return permission_mask(user) & perm == perm
+
+
+def has_any_perm(perm, user=None) -> bool:
+    return bool(permission_mask(user) & perm)
+
+
+def visible_departments(user=None) -> frozenset:
+    """用户因 VIEW_DEPARTMENT_PROJECTS 可见的部门ID集合（本部门 + 下级部门）；无该权限或未分配部门时为空"""
+    user = user if user is not None else current_user
+    if not user.department_id or not has_perm(Perm.VIEW_DEPARTMENT_PROJECTS, user):
+        return frozenset()
+    return access_graph().department_scope.get(user.department_id, frozenset({user.department_id}))
+
+
+def project_scope(user=None) -> dict:
+    """
+    项目查询范围，直接作为 ProjectService.get_project / get_project_list 的关键字参数：
+        ProjectService.get_project(project_id, **project_scope())
+    VIEW_ALL_PROJECTS 时两项均为 None（不限）
+    """
+    user = user if user is not None else current_user
+    if has_perm(Perm.VIEW_ALL_PROJECTS, user):
+        return {'owner_id': None, 'department_ids': None}
+    return {'owner_id': user.id, 'department_ids': visible_departments(user)}
+
+
+def can_view_project(project, user=None) -> bool:
+    scope = project_scope(user)
+    return (
+        scope['owner_id'] is None
+        or project.owner_id == scope['owner_id']
+        or project.department_id in scope['department_ids']
+    )
+
+
+def admin_home_endpoint(user=None) -> str | None:
+    """用户有权访问的第一个后台页面端点；没有任何后台权限时返回 None"""
+    mask = permission_mask(user)
+    return next((endpoint for perm, endpoint in ADMIN_HOME_PAGES if mask & perm), None)
+
+
+def deny_response(message: str = '权限不足，无法访问该页面'):
+    """无权限时的统一响应：AJAX / JSON 请求返回 403，页面请求提示后回到仪表盘"""
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or 'application/json' in request.headers.get('Accept', ''):
+        return jsonify({'error': 'forbidden', 'message': message}), 403
+    flash(message, 'danger')
+    return redirect(url_for('main.dashboard'))
+
+
+def require(perm, any_of: bool = False):
+    """
+    路由 / 蓝图 before_request 权限装饰器（未登录时走 login_manager 的未授权处理）：
+        @require(Perm.EXPORT_USERS)
+        @require(Perm.MANAGE_USERS | Perm.MANAGE_SETTINGS, any_of=True)
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_user.is_authenticated:
+                return current_app.login_manager.unauthorized()
+            allowed = has_any_perm(perm) if any_of else has_perm(perm)
+            if not allowed:
+                current_app.logger.warning(
+                    f"权限不足: user={current_user.username} 需要={Perm(perm)!r} 端点={request.endpoint}"
+                )
+                return deny_response()
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def notify_permissions_changed() -> None:
+    """在角色 / 部门 / 授权变更提交之后调用：通知所有 worker 清空权限缓存并重建闭包"""
+    cache = current_app.extensions.get('permissions')
+    if cache is not None:
+        cache.stamp.bump()
+
+
+def init_permissions(app) -> None:
+    """在 create_app() 中调用：创建权限缓存，注册模板函数 has_perm / can_view_project / admin_home_endpoint 与全局 Perm"""
+    stamp = ChangeStamp(os.path.join(app.root_path, 'instance', 'stamps', 'permissions'))
+    app.extensions['permissions'] = PermissionCache(stamp)
+    app.jinja_env.globals.update(
+        has_perm=has_perm, has_any_perm=has_any_perm, can_view_project=can_view_project,
+        admin_home_endpoint=admin_home_endpoint, Perm=Perm, ADMIN_AREA_PERMISSIONS=ADMIN_AREA_PERMISSIONS
+    )
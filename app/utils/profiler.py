@@ -0,0 +1,267 @@
+# 文件路径：app/utils/profiler.py
+# 更新日期：2026-10-19
+# 功能说明：线上请求按需采样分析器，后台开启后对后续 N 个请求（可限定端点 / 用户）以后台线程定时采样调用栈，每个请求写出一份折叠栈文件（flame graph 可直接读取）到 instance/profiles
+
+"""
+采样分析器（生产环境无需重启、无需开启 debug）：
+- 控制状态保存在 instance/profiles/control.json，所有 worker 共用；各进程按文件 mtime 变化重新加载，名额扣减时加文件锁
+- 采样方式：后台线程每隔 PROFILER_INTERVAL_MS 读取 sys._current_frames()，只记录正在被分析的请求线程
+  （不用 SIGPROF 信号定时器：信号只能投递到主线程，多线程 worker 下无法定位到具体请求）
+- 未开启时每个请求只多一次 os.stat；采样线程在无分析任务时阻塞等待，不占 CPU
+- 输出格式为折叠栈（每行 "帧;帧;帧 次数"），可直接交给 flamegraph.pl / speedscope 生成火焰图
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+from app.utils.health import PROBE_ENDPOINTS
+from app.utils.session_epoch import session_user_id
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:  # Windows 开发环境：单进程运行，无需文件锁
+    HAS_FCNTL = False
+
+CONTROL_FILE = 'control.json'
+PROFILE_SUFFIX = '.folded'
+# 这些端点本身不参与分析（静态资源、分析器后台页面、健康探针、挂起等待的通知长轮询）
+SKIP_ENDPOINTS = ('static', 'theme_css', 'admin.profiler', 'admin.profiler_enable',
+                  'admin.profiler_disable', 'admin.profiler_download', 'notification.poll') + PROBE_ENDPOINTS
+
+
+class StackSampler:
+    """后台采样线程：对登记的线程 ident 定时抓取调用栈，按折叠栈字符串计数"""
+
+    def __init__(self, interval: float, root: str):
+        self.interval = interval
+        self.root = root
+        self._active: dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._labels: dict = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(self.root):
+                filename = os.path.relpath(filename, self.root)
+            else:
+                filename = '/'.join(filename.replace('\\', '/').split('/')[-2:])
+            label = self._labels[code] = f'{code.co_name} ({filename}:{code.co_firstlineno})'
+        return label
+
+    def _ensure_thread(self) -> None:
+        # fork 后子进程中线程对象不存在，按 is_alive 判断重新启动
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+            self._thread.start()
+
+    def start(self, ident: int) -> None:
+        with self._lock:
+            self._active[ident] = Counter()
+        self._ensure_thread()
+        self._wakeup.set()
+
+    def stop(self, ident: int) -> Counter:
+        with self._lock:
+            return self._active.pop(ident, Counter())
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while True:
+            with self._lock:
+                idle = not self._active
+            if idle:
+                self._wakeup.clear()
+                self._wakeup.wait()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, counter in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is None or ident == own_ident:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(self._label(frame.f_code))
+                        frame = frame.f_back
+                    counter[';'.join(reversed(stack))] += 1
+            del frames
+
+
+class ProfilerControl:
+    """
+    多进程共享的开关状态：
+    {"remaining": 剩余请求名额, "endpoint": 限定端点或空, "user_id": 限定用户或空, "expires_at": 过期时间戳, "enabled_by": 操作人}
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, CONTROL_FILE)
+        os.makedirs(directory, exist_ok=True)
+        self._mtime = None
+        self._state: dict | None = None
+
+    def _read(self) -> dict | None:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f) or None
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, state: dict | None) -> None:
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state or {}, f)
+        os.replace(tmp_path, self.path)
+
+    def _locked(self):
+        lock_file = open(os.path.join(self.directory, '.lock'), 'a+')
+        if HAS_FCNTL:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def state(self) -> dict | None:
+        """当前有效状态（按 mtime 缓存；名额用完或过期返回 None）"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self._state = self._read() if mtime is not None else None
+        state = self._state
+        if not state or state.get('remaining', 0) <= 0 or state.get('expires_at', 0) < time.time():
+            return None
+        return state
+
+    def enable(self, remaining: int, endpoint: str | None, user_id: int | None,
+               duration_minutes: int, enabled_by: str) -> dict:
+        state = {
+            'remaining': remaining,
+            'endpoint': endpoint or None,
+            'user_id': user_id,
+            'expires_at': time.time() + duration_minutes * 60,
+            'enabled_by': enabled_by,
+        }
+        lock_file = self._locked()
+        try:
+            self._write(state)
+        finally:
+            lock_file.close()
+        return state
+
+    def disable(self) -> None:
+        lock_file = self._locked()
+        try:
+            self._write(None)
+        finally:
+            lock_file.close()
+
+    def matches(self, state: dict, endpoint: str | None) -> bool:
+        if state.get('endpoint') and state['endpoint'] != endpoint:
+            return False
+        if state.get('user_id') is not None and session_user_id() != int(state['user_id']):
+            return False
+        return True
+
+    def claim(self) -> bool:
+        """跨进程扣减一个名额，成功返回 True（以文件中的最新值为准）"""
+        lock_file = self._locked()
+        try:
+            state = self._read()
+            if not state or state.get('remaining', 0) <= 0 or state.get('expires_at', 0) < time.time():
+                return False
+            state['remaining'] -= 1
+            self._write(state)
+            return True
+        finally:
+            lock_file.close()
+
+
+def _prune(directory: str, max_files: int) -> None:
+    """只保留最新的 max_files 份分析结果"""
+    files = list_profiles(directory)
+    for item in files[max_files:]:
+        try:
+            os.remove(os.path.join(directory, item['name']))
+        except OSError:
+            pass
+
+
+def list_profiles(directory: str) -> list[dict]:
+    """分析结果文件列表（新的在前），供后台页面展示"""
+    items = []
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return items
+    for entry in entries:
+        if entry.name.endswith(PROFILE_SUFFIX):
+            stat = entry.stat()
+            items.append({
+                'name': entry.name,
+                'size': stat.st_size,
+                'mtime': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+                '_sort': stat.st_mtime,
+            })
+    items.sort(key=lambda item: item['_sort'], reverse=True)
+    return items
+
+
+def init_profiler(app) -> None:
+    """在 create_app() 中调用：注册按需采样钩子，控制状态与结果目录为 app/instance/profiles"""
+    if not app.config.get('PROFILER_ENABLED', True):
+        return
+
+    directory = os.path.join(app.root_path, 'instance', 'profiles')
+    control = ProfilerControl(directory)
+    sampler = StackSampler(
+        interval=int(app.config.get('PROFILER_INTERVAL_MS', 5)) / 1000,
+        root=os.path.dirname(app.root_path)
+    )
+    max_files = int(app.config.get('PROFILER_MAX_FILES', 200))
+    app.extensions['profiler'] = control
+
+    @app.before_request
+    def start_profiling():
+        state = control.state()
+        if state is None or request.endpoint in SKIP_ENDPOINTS:
+            return
+        if not control.matches(state, request.endpoint) or not control.claim():
+            return
+        g._profile_ident = threading.get_ident()
+        g._profile_start = time.perf_counter()
+        sampler.start(g._profile_ident)
+
+    @app.teardown_request
+    def finish_profiling(exc):
+        ident = g.pop('_profile_ident', None)
+        if ident is None:
+            return
+        stacks = sampler.stop(ident)
+        elapsed_ms = (time.perf_counter() - g.pop('_profile_start')) * 1000
+        if not stacks:
+            # 请求耗时短于采样间隔，没有抓到任何调用栈，不写空文件
+            app.logger.info(f"请求分析完成: {request.method} {request.path} {elapsed_ms:.0f}ms, 耗时短于采样间隔，无采样")
+            return
+        endpoint = (request.endpoint or 'unmatched').replace('.', '_')
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{endpoint}-{os.getpid()}-{int(elapsed_ms)}ms{PROFILE_SUFFIX}"
+        try:
+            with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f'{stack} {count}\n')
+            _prune(directory, max_files)
+        except OSError as e:
+            app.logger.warning(f"写入请求分析结果失败: {e}")
+            return
+        app.logger.info(f"请求分析完成: {request.method} {request.path} {elapsed_ms:.0f}ms, {sum(stacks.values())} 次采样 → {name}")
@@ -0,0 +1,373 @@
+# 文件路径：app/utils/prometheus.py
+# 更新日期：2026-10-19
+# 功能说明：无第三方依赖的 Prometheus 文本格式指标，提供 Counter / Gauge / Histogram 与业务指标定义；各 worker 进程定期把自身数值写入 instance/metrics/<pid>-<进程启动时间>.json（PID 被复用时不会覆盖已退出进程的文件），/metrics 抓取时合并全部进程文件后输出；抓取端点须带令牌或来自白名单地址（生产环境默认拒绝其他请求）
+
+import atexit
+import hmac
+import json
+import os
+import threading
+import time
+from flask import Response, abort, g, request
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:  # Windows 开发环境：单进程运行，无需文件锁
+    HAS_FCNTL = False
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+ARCHIVE_FILE = '_archive.json'
+
+_registry: list['_Metric'] = []
+_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: tuple = ()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.samples: dict[tuple, object] = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def reset(self) -> None:
+        with _lock:
+            self.samples = {}
+
+
+class Counter(_Metric):
+    """单调递增计数器（跨进程求和）"""
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def set_total(self, value: float, **labels) -> None:
+        """由外部累计值（如缓存命中数）同步为计数器当前值"""
+        with _lock:
+            self.samples[self._key(labels)] = value
+
+
+class Gauge(_Metric):
+    """瞬时值（跨进程只合计存活进程）"""
+    type = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        with _lock:
+            self.samples[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """累积分桶直方图（跨进程按桶求和）"""
+    type = 'histogram'
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample['buckets'][index] += 1
+                    break
+            sample['sum'] += value
+            sample['count'] += 1
+
+
+# ──────────────────────────────────────────────
+# 业务指标定义
+# ──────────────────────────────────────────────
+
+HTTP_REQUESTS = Counter('ffe_http_requests_total', 'HTTP 请求数', ('endpoint', 'method', 'status'))
+HTTP_DURATION = Histogram('ffe_http_request_duration_seconds', 'HTTP 请求耗时（秒）', ('endpoint',))
+LOGIN_ATTEMPTS = Counter(
+    'ffe_login_attempts_total',
+    '登录尝试次数（result: success / failure / lockout / locked / disabled / unknown_user / rate_limited）',
+    ('result',)
+)
+HASH_QUEUE_DEPTH = Gauge('ffe_password_hash_queue_depth', '等待计算的密码哈希任务数')
+CACHE_REQUESTS = Counter('ffe_cache_requests_total', '进程内缓存查询次数', ('cache', 'result'))
+EXPORT_DURATION = Histogram(
+    'ffe_export_duration_seconds', '导出任务耗时（秒，含流式输出）', ('format',),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+CALC_BATCH_SIZE = Histogram(
+    'ffe_calc_batch_size', '计算引擎单批条目数', ('engine',),
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+)
+
+
+def _collect_cache_stats(app) -> None:
+    """同步各进程内缓存的累计命中 / 未命中数（来源为缓存对象自身的计数）"""
+    fragment_cache = app.extensions.get('fragment_cache')
+    if fragment_cache is not None:
+        CACHE_REQUESTS.set_total(fragment_cache.hits, cache='fragment', result='hit')
+        CACHE_REQUESTS.set_total(fragment_cache.misses, cache='fragment', result='miss')
+
+    from app.services.calc import volume_kd
+    info = volume_kd._calculate_cached.cache_info()
+    CACHE_REQUESTS.set_total(info.hits, cache='kd_volume', result='hit')
+    CACHE_REQUESTS.set_total(info.misses, cache='kd_volume', result='miss')
+
+
+# ──────────────────────────────────────────────
+# 多进程：每进程一个文件，抓取时合并
+# ──────────────────────────────────────────────
+
+def _dump_samples() -> dict:
+    with _lock:
+        return {
+            metric.name: [[list(key), value] for key, value in metric.samples.items()]
+            for metric in _registry
+        }
+
+
+def _reset_after_fork() -> None:
+    """子进程继承了父进程（gunicorn preload 主进程）的内存数值，清零避免重复计数"""
+    for metric in _registry:
+        metric.samples = {}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_start(pid: int) -> str:
+    """进程启动时间（/proc/<pid>/stat 第 22 列，单位为时钟滴答）；与 PID 一起唯一标识一个进程，取不到时返回 '0'"""
+    try:
+        with open(f'/proc/{pid}/stat', encoding='ascii') as f:
+            # 第 2 列进程名可能含空格 / 括号，从最后一个 ')' 之后开始数
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return '0'
+
+
+def _process_alive(pid: int, start: str | None) -> bool:
+    """PID 仍存在且启动时间一致（PID 被新进程复用时视为已退出）"""
+    if not _pid_alive(pid):
+        return False
+    return start is None or start == '0' or _process_start(pid) == start
+
+
+class MultiProcessStore:
+    """instance/metrics 目录：<pid>-<启动时间>.json 为各进程当前值，_archive.json 为已退出进程的累计值"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.last_flush = 0.0
+        self._process_key = (None, '')
+
+    def _own_filename(self) -> str:
+        # fork 之后 PID 变化，按 PID 缓存本进程的文件名
+        pid = os.getpid()
+        if self._process_key[0] != pid:
+            self._process_key = (pid, f'{pid}-{_process_start(pid)}.json')
+        return self._process_key[1]
+
+    def _locked(self):
+        lock_file = open(os.path.join(self.directory, '.lock'), 'a+')
+        if HAS_FCNTL:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    @staticmethod
+    def _read(path: str) -> dict:
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write(path: str, data: dict) -> None:
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def flush(self) -> None:
+        """写出本进程当前值（原子替换）"""
+        self._write(os.path.join(self.directory, self._own_filename()), _dump_samples())
+        self.last_flush = time.time()
+
+    def collect(self) -> dict:
+        """
+        合并全部进程：计数器 / 直方图累加（含已退出进程，保证单调），仪表值只取存活进程
+        已退出进程的文件并入 _archive.json 后删除，避免 worker 轮换后文件无限增长
+        """
+        metric_types = {metric.name: metric.type for metric in _registry}
+
+        def merge(target: dict, data: dict, include_gauges: bool) -> None:
+            for name, samples in data.items():
+                kind = metric_types.get(name)
+                if kind is None or (kind == 'gauge' and not include_gauges):
+                    continue
+                bucket = target.setdefault(name, {})
+                for key, value in samples:
+                    key = tuple(key)
+                    if kind == 'histogram':
+                        current = bucket.setdefault(key, {'buckets': [0] * len(value['buckets']), 'sum': 0.0, 'count': 0})
+                        current['buckets'] = [a + b for a, b in zip(current['buckets'], value['buckets'])]
+                        current['sum'] += value['sum']
+                        current['count'] += value['count']
+                    else:
+                        bucket[key] = bucket.get(key, 0) + value
+
+        merged: dict[str, dict] = {}
+        lock_file = self._locked()
+        try:
+            archive_path = os.path.join(self.directory, ARCHIVE_FILE)
+            archive: dict[str, dict] = {}
+            merge(archive, self._read(archive_path), include_gauges=False)
+            archive_changed = False
+
+            for filename in os.listdir(self.directory):
+                if not filename.endswith('.json') or filename == ARCHIVE_FILE:
+                    continue
+                pid_text, _, start = filename[:-5].partition('-')
+                try:
+                    pid = int(pid_text)
+                except ValueError:
+                    continue
+                path = os.path.join(self.directory, filename)
+                data = self._read(path)
+                if filename == self._own_filename() or _process_alive(pid, start or None):
+                    merge(merged, data, include_gauges=True)
+                    continue
+                # 已退出进程：计数器与直方图并入归档
+                merge(archive, data, include_gauges=False)
+                os.remove(path)
+                archive_changed = True
+
+            if archive_changed:
+                self._write(archive_path, {
+                    name: [[list(key), value] for key, value in samples.items()]
+                    for name, samples in archive.items()
+                })
+            for name, samples in archive.items():
+                merge(merged, {name: [[key, value] for key, value in samples.items()]}, include_gauges=False)
+        finally:
+            lock_file.close()
+        return merged
+
+
+def render_text(merged: dict) -> str:
+    """按 Prometheus 0.0.4 文本格式输出"""
+    lines = []
+    for metric in _registry:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        for key, value in sorted(merged.get(metric.name, {}).items()):
+            if metric.type == 'histogram':
+                cumulative = 0
+                for bound, count in zip(metric.buckets, value['buckets']):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f'{metric.name}_bucket{_format_labels(metric.labelnames, key, (le,))} {cumulative}')
+                labels = _format_labels(metric.labelnames, key)
+                lines.append(f'{metric.name}_sum{labels} {_format_value(value["sum"])}')
+                lines.append(f'{metric.name}_count{labels} {value["count"]}')
+            else:
+                lines.append(f'{metric.name}{_format_labels(metric.labelnames, key)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_prometheus(app) -> None:
+    """在 create_app() 中调用：请求计数 / 耗时钩子、定期写出进程文件、注册 /metrics 抓取端点"""
+    if not app.config.get('PROMETHEUS_ENABLED', True):
+        return
+
+    store = MultiProcessStore(os.path.join(app.root_path, 'instance', 'metrics'))
+    app.extensions['prometheus'] = store
+    flush_interval = float(app.config.get('PROMETHEUS_FLUSH_INTERVAL', 5))
+    token = app.config.get('PROMETHEUS_TOKEN')
+    allowed_ips = set(app.config.get('PROMETHEUS_ALLOWED_IPS') or ())
+    public = bool(app.config.get('PROMETHEUS_PUBLIC', True)) and not token
+    if not (token or allowed_ips or public):
+        app.logger.warning("/metrics 未设置 PROMETHEUS_TOKEN 或 PROMETHEUS_ALLOWED_IPS，抓取请求将全部被拒绝")
+
+    @atexit.register
+    def _flush_on_exit():
+        try:
+            _collect_cache_stats(app)
+            store.flush()
+        except Exception:
+            pass
+
+    @app.before_request
+    def start_prometheus_timer():
+        g._prom_start = time.perf_counter()
+
+    @app.after_request
+    def record_prometheus_request(response):
+        start = g.get('_prom_start')
+        if start is not None:
+            endpoint = request.endpoint or '<unmatched>'
+            HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+            HTTP_DURATION.observe(time.perf_counter() - start, endpoint=endpoint)
+        if time.time() - store.last_flush >= flush_interval:
+            _collect_cache_stats(app)
+            store.flush()
+        return response
+
+    def metrics_endpoint():
+        authorized = (
+            public
+            or request.remote_addr in allowed_ips
+            or (token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'))
+        )
+        if not authorized:
+            abort(401 if token else 403)
+        _collect_cache_stats(app)
+        store.flush()
+        return Response(render_text(store.collect()), content_type=CONTENT_TYPE)
+
+    app.add_url_rule('/metrics', 'prometheus_metrics', metrics_endpoint, methods=['GET'])
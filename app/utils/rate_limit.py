@@ -0,0 +1,160 @@
+# 文件路径：app/utils/rate_limit.py
+# 更新日期：2026-10-19
+# 功能说明：登录限流（令牌桶），按客户端 IP 与用户名分别限速（两个桶都有令牌才一起扣减），超限的 POST /auth/login 在查询数据库与计算密码哈希之前直接返回 429；桶状态可放在进程内存或 instance 目录下的 SQLite 文件（多 worker 共享）
+
+"""
+令牌桶：每个键（ip:<地址> / user:<用户名>）容量 burst，按 per_minute / 60 每秒匀速回填，每次登录提交消耗 1 个令牌。
+一次提交涉及的桶先全部检查，都有令牌才一起扣减；被拒绝的提交不消耗任何桶（否则针对某个用户名的持续尝试会顺带耗尽同 IP 其他用户的额度，反之亦然）。
+客户端地址取 request.remote_addr，部署在反向代理之后需配置 TRUSTED_PROXY_COUNT（见 create_app 中的 ProxyFix）。
+- memory：进程内字典，gunicorn 多 worker 时每个 worker 各算各的（实际上限约为 worker 数 × 配置值）
+- sqlite：instance/rate_limit.sqlite，BEGIN IMMEDIATE 串行化扣减，所有 worker 共享同一上限；
+  与业务数据库分离，限流检查不占用业务连接池；存储异常时放行并记录警告（限流失效好过登录不可用）
+"""
+
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import jsonify, request
+from app.utils.prometheus import LOGIN_ATTEMPTS
+
+MAX_MEMORY_KEYS = 10000             # 进程内最多保留的桶数（超出淘汰最久未用的，已回满的桶丢弃无影响）
+SQLITE_PRUNE_PROBABILITY = 0.01     # 每次扣减时顺带清理过期桶的概率
+LIMITED_ENDPOINTS = ('auth.login',)
+
+
+def refill(tokens: float, updated_at: float, now: float, burst: float, rate: float) -> float:
+    return min(burst, tokens + (now - updated_at) * rate)
+
+
+def bucket_wait(states: list[tuple[str, float, float]]) -> float:
+    """(键, 回填后的令牌数, rate)：全部 >= 1 返回 0，否则返回最慢的桶攒够 1 个令牌所需秒数"""
+    return max(((1 - tokens) / rate for _, tokens, rate in states if tokens < 1), default=0.0)
+
+
+class MemoryBucketStore:
+    def __init__(self, max_keys: int = MAX_MEMORY_KEYS):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def take(self, limits: list[tuple[str, float, float]], now: float) -> float:
+        """limits 为 (键, burst, rate) 列表：全部有令牌时各扣减 1 个并返回 0，否则不扣减、返回需等待的秒数"""
+        with self._lock:
+            states = []
+            for key, burst, rate in limits:
+                tokens, updated_at = self._buckets.pop(key, (burst, now))
+                states.append((key, refill(tokens, updated_at, now, burst, rate), rate))
+            wait = bucket_wait(states)
+            for key, tokens, _ in states:
+                self._buckets[key] = (tokens - 1 if wait == 0 else tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class SqliteBucketStore:
+    """多 worker 共享的令牌桶表；每个线程一个连接，fork 后按进程号重建"""
+
+    def __init__(self, path: str, max_idle: float = 3600):
+        self.path = path
+        self.max_idle = max_idle
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+
+    def _connection(self) -> sqlite3.Connection:
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            self._local.conn = self._connect()
+            self._local.pid = pid
+        return self._local.conn
+
+    def take(self, limits: list[tuple[str, float, float]], now: float) -> float:
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            states = []
+            for key, burst, rate in limits:
+                row = conn.execute('SELECT tokens, updated_at FROM buckets WHERE key = ?', (key,)).fetchone()
+                states.append((key, refill(*row, now, burst, rate) if row else burst, rate))
+            wait = bucket_wait(states)
+            conn.executemany(
+                'INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)',
+                [(key, tokens - 1 if wait == 0 else tokens, now) for key, tokens, _ in states]
+            )
+            if random.random() < SQLITE_PRUNE_PROBABILITY:
+                conn.execute('DELETE FROM buckets WHERE updated_at < ?', (now - self.max_idle,))
+            conn.execute('COMMIT')
+            return wait
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+
+class LoginRateLimiter:
+    """IP 桶与用户名桶都要有令牌才放行；返回需等待秒数（0 表示放行）"""
+
+    def __init__(self, store, ip_burst: int, ip_per_minute: int, user_burst: int, user_per_minute: int):
+        self.store = store
+        self.ip_limit = (float(ip_burst), ip_per_minute / 60.0)
+        self.user_limit = (float(user_burst), user_per_minute / 60.0)
+
+    def check(self, ip: str, username: str | None) -> float:
+        limits = [(f'ip:{ip}', *self.ip_limit)]
+        if username and username.strip():
+            limits.append((f'user:{username.strip().lower()}', *self.user_limit))
+        return self.store.take(limits, time.time())
+
+
+def init_rate_limit(app) -> None:
+    """在 create_app() 中调用：为登录提交注册限流钩子（在读取会话用户、查询数据库之前执行）"""
+    if not app.config.get('LOGIN_RATE_LIMIT_ENABLED', True):
+        return
+
+    if app.config.get('LOGIN_RATE_LIMIT_STORAGE', 'memory') == 'sqlite':
+        store = SqliteBucketStore(os.path.join(app.root_path, 'instance', 'rate_limit.sqlite'))
+    else:
+        store = MemoryBucketStore()
+    limiter = LoginRateLimiter(
+        store,
+        ip_burst=int(app.config.get('LOGIN_RATE_IP_BURST', 10)),
+        ip_per_minute=int(app.config.get('LOGIN_RATE_IP_PER_MINUTE', 10)),
+        user_burst=int(app.config.get('LOGIN_RATE_USER_BURST', 5)),
+        user_per_minute=int(app.config.get('LOGIN_RATE_USER_PER_MINUTE', 5)),
+    )
+    app.extensions['login_rate_limiter'] = limiter
+
+    @app.before_request
+    def limit_login_attempts():
+        if request.method != 'POST' or request.endpoint not in LIMITED_ENDPOINTS:
+            return None
+        try:
+            wait = limiter.check(request.remote_addr or 'unknown', request.form.get('username'))
+        except sqlite3.Error as e:
+            app.logger.warning(f"登录限流存储异常，本次放行: {e}")
+            return None
+        if not wait:
+            return None
+
+        LOGIN_ATTEMPTS.inc(result='rate_limited')
+        retry_after = max(1, math.ceil(wait))
+        app.logger.warning(f"登录限流: ip={request.remote_addr} username={request.form.get('username', '')[:50]} retry_after={retry_after}s")
+        message = f'登录尝试过于频繁，请 {retry_after} 秒后再试'
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            response = jsonify({'error': 'rate_limited', 'message': message, 'retry_after': retry_after})
+        else:
+            response = app.response_class(message, mimetype='text/plain')
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
@@ -0,0 +1,90 @@
+# 文件路径：app/utils/session_activity.py
+# 更新日期：2026-10-19
+# 功能说明：会话空闲超时，按系统设置 session_timeout_minutes 判断已登录会话最近一次活动距今是否超时，超时自动登出；最近活动时间记在签名会话中（按间隔刷新，不必每个请求重写 Cookie），并按间隔节流写入 User.last_seen_at
+
+"""
+会话中的两个时间戳（Unix 秒）：
+- _last_seen       ：最近活动时间，距上次刷新超过 SESSION_ACTIVITY_REFRESH_SECONDS 才重写（Cookie 随之更新）
+- _last_seen_saved ：本会话最近一次写库时间，距今超过 LAST_SEEN_PERSIST_SECONDS 才调用 persist_last_seen()
+空闲判断只读会话，不查库；静态资源 / 探针请求不参与（不算活动，也不触发登出）；
+后台自动发起的请求（通知角标长轮询）照常检查超时，但不算活动，否则打开的页面永不超时
+"""
+
+import time
+from datetime import datetime
+from flask import flash, jsonify, redirect, request, session, url_for
+from flask_login import logout_user, user_logged_in, user_logged_out
+from app.utils.health import PROBE_ENDPOINTS
+from app.utils.session_epoch import session_user_id
+
+IGNORED_ENDPOINTS = ('static', 'theme_css', 'prometheus_metrics') + PROBE_ENDPOINTS
+# 检查超时但不刷新活动时间的端点（页面后台自动发起的请求）
+PASSIVE_ENDPOINTS = ('notification.poll',)
+# 已超时仍放行的端点（登录页 / 登出本身）
+PASS_THROUGH_ENDPOINTS = ('auth.login', 'auth.logout')
+DEFAULT_TIMEOUT_MINUTES = 30
+
+
+def _idle_timeout_seconds(logger) -> int:
+    from app.services.settings_service import SettingsService
+    try:
+        minutes = int(SettingsService.get_snapshot().get('session_timeout_minutes') or DEFAULT_TIMEOUT_MINUTES)
+    except Exception as e:
+        logger.debug(f"读取会话超时设置失败，使用默认值: {e}")
+        minutes = DEFAULT_TIMEOUT_MINUTES
+    return minutes * 60
+
+
+def init_session_activity(app) -> None:
+    """在 create_app() 中调用：注册空闲超时检查与活动时间刷新钩子"""
+    if not app.config.get('SESSION_IDLE_TIMEOUT_ENABLED', True):
+        return
+
+    refresh_seconds = int(app.config.get('SESSION_ACTIVITY_REFRESH_SECONDS', 60))
+    persist_seconds = int(app.config.get('LAST_SEEN_PERSIST_SECONDS', 300))
+
+    @user_logged_in.connect_via(app)
+    def start_activity(sender, user, **extra):
+        # 重新登录时旧会话里可能残留很早的时间戳，必须重置
+        session['_last_seen'] = time.time()
+        session.pop('_last_seen_saved', None)
+
+    @user_logged_out.connect_via(app)
+    def clear_activity(sender, user, **extra):
+        session.pop('_last_seen', None)
+        session.pop('_last_seen_saved', None)
+
+    @app.before_request
+    def enforce_idle_timeout():
+        # 未登录（会话中无用户）直接跳过，不触发 user_loader 查询
+        if '_user_id' not in session or request.endpoint in IGNORED_ENDPOINTS:
+            return None
+
+        now = time.time()
+        last_seen = session.get('_last_seen')
+        if last_seen is not None and now - last_seen > _idle_timeout_seconds(app.logger):
+            app.logger.info(f"会话空闲超时自动登出: user_id={session_user_id()} 空闲 {int(now - last_seen)} 秒")
+            logout_user()
+            if request.endpoint in PASS_THROUGH_ENDPOINTS:
+                return None
+            message = '长时间未操作，已自动退出登录，请重新登录'
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or 'application/json' in request.headers.get('Accept', ''):
+                return jsonify({'error': 'session_expired', 'message': message}), 401
+            flash(message, 'warning')
+            return redirect(url_for('auth.login', next=request.full_path))
+
+        if request.endpoint in PASSIVE_ENDPOINTS:
+            return None
+        if last_seen is None or now - last_seen >= refresh_seconds:
+            session['_last_seen'] = now
+
+        if now - session.get('_last_seen_saved', 0) >= persist_seconds:
+            session['_last_seen_saved'] = now
+            from app.services.auth_service import persist_last_seen
+            try:
+                persist_last_seen(session_user_id(), datetime.utcfromtimestamp(now), persist_seconds)
+            except Exception as e:
+                from app import db
+                db.session.rollback()
+                app.logger.warning(f"最近活动时间写入失败: {e}")
+        return None
@@ -0,0 +1,72 @@
+# 文件路径：app/utils/session_epoch.py
+# 更新日期：2026-10-19
+# 功能说明：按用户的会话纪元（User.session_epoch），禁用账号 / 重置密码后递增纪元，会话与记住我 Cookie 中的旧标识立即失效；各 worker 在内存中保存 用户ID → 纪元 映射，经变更戳文件感知其他进程的修改，正常请求的校验只是一次字典查找
+
+"""
+Flask-Login 的用户标识（User.get_id()）为 '<用户ID>:<纪元>'，写入 session['_user_id'] 与记住我 Cookie：
+- user_loader 先比对标识中的纪元与内存映射，不一致直接视为未登录（不查库）
+- 映射只保存纪元 > 0 的用户（从未吊销过的用户不占内存），变更戳变化时整表重新加载
+- 吊销流程：user.revoke_sessions() → db.session.commit() → notify_sessions_revoked()
+旧格式标识（纯数字，功能上线前签发）按纪元 0 处理
+"""
+
+import os
+import threading
+from flask import current_app, has_request_context, session
+from app.utils.change_stamp import ChangeStamp
+
+
+def parse_user_token(token) -> tuple[int | None, int]:
+    """'<用户ID>:<纪元>' → (用户ID, 纪元)；格式不合法时用户ID为 None"""
+    user_part, _, epoch_part = str(token or '').partition(':')
+    try:
+        return int(user_part), int(epoch_part or 0)
+    except ValueError:
+        return None, 0
+
+
+def session_user_id() -> int | None:
+    """当前会话中的用户ID（不触发 user_loader 查询），请求上下文之外为 None"""
+    if not has_request_context() or '_user_id' not in session:
+        return None
+    return parse_user_token(session['_user_id'])[0]
+
+
+class SessionEpochs:
+    def __init__(self, stamp: ChangeStamp):
+        self.stamp = stamp
+        self._lock = threading.Lock()
+        self.epochs: dict[int, int] = {}
+
+    def _reload(self) -> None:
+        from app.models import User
+        rows = User.query.with_entities(User.id, User.session_epoch).filter(User.session_epoch > 0).all()
+        self.epochs = {user_id: epoch for user_id, epoch in rows}
+
+    def current(self, user_id: int) -> int:
+        # 检查戳、重新加载、读取映射都在锁内：changed() 会先记下新戳，
+        # 若在锁外检查，其他线程会在重新加载完成前看到"未变化"并读到旧映射，放行已吊销的会话
+        with self._lock:
+            if self.stamp.changed():
+                try:
+                    self._reload()
+                except Exception:
+                    self.stamp.forget()   # 加载失败（如数据库暂不可用）时下次请求重试
+                    raise
+            return self.epochs.get(user_id, 0)
+
+    def is_valid(self, user_id: int, epoch: int) -> bool:
+        return self.current(user_id) == epoch
+
+
+def notify_sessions_revoked() -> None:
+    """在递增纪元并提交之后调用：通知所有 worker 重新加载纪元映射"""
+    epochs = current_app.extensions.get('session_epochs')
+    if epochs is not None:
+        epochs.stamp.bump()
+
+
+def init_session_epochs(app) -> None:
+    """在 create_app() 中调用（须在注册 user_loader 之前）：创建纪元映射与变更戳"""
+    stamp = ChangeStamp(os.path.join(app.root_path, 'instance', 'stamps', 'session_epoch'))
+    app.extensions['session_epochs'] = SessionEpochs(stamp)
@@ -0,0 +1,172 @@
+# 文件路径：app/utils/slow_query.py
+# 更新日期：2026-10-19
+# 功能说明：慢查询日志，基于 SQLAlchemy 游标事件记录超过阈值的 SQL（参数脱敏、来源端点；耗时达到阈值若干倍时附 SQLite 执行计划），阈值与采样比例由系统设置管理，进程内按语句汇总供后台查看耗时排行
+
+import random
+import re
+import threading
+import time
+from collections import Counter
+from flask import has_request_context, request
+from sqlalchemy import event
+
+UNMATCHED_ENDPOINT = '<unmatched>'
+MAX_STATEMENTS = 500            # 进程内最多汇总的不同语句数
+STATEMENT_LOG_LENGTH = 500
+
+# IN (?, ?, ?) 展开参数个数不同视为同一语句
+_IN_LIST_PATTERN = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+
+
+def fingerprint(statement: str) -> str:
+    return _IN_LIST_PATTERN.sub('(?...)', ' '.join(statement.split()))
+
+
+def redact(parameters, executemany: bool):
+    """参数脱敏：字符串 / 二进制只保留类型与长度（可能是密码哈希、邮箱等），数值与空值原样保留"""
+    def one(value):
+        if isinstance(value, str):
+            return f'<str:{len(value)}>'
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return f'<bytes:{len(value)}>'
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        return f'<{type(value).__name__}>'
+
+    if executemany:
+        return f'<{len(parameters)} 组参数>'
+    if isinstance(parameters, dict):
+        return {key: one(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [one(value) for value in parameters]
+    return one(parameters)
+
+
+def explain_sqlite(conn, statement: str, parameters) -> list[str] | None:
+    """SQLite 下对查询语句（SELECT / WITH）取 EXPLAIN QUERY PLAN（走原始 DBAPI 游标，不再触发 SQLAlchemy 事件）"""
+    if conn.dialect.name != 'sqlite' or not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    try:
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            return [row[-1] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception as e:
+        return [f'EXPLAIN 失败: {type(e).__name__}']
+
+
+class SlowQueryStore:
+    """进程内慢查询汇总：按语句指纹累计次数 / 总耗时 / 最大耗时 / 来源端点，保留最近一次的脱敏参数与执行计划"""
+
+    def __init__(self, max_statements: int = MAX_STATEMENTS):
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self.entries: dict[str, dict] = {}
+        self.started_at = time.time()
+
+    def record(self, statement: str, elapsed_ms: float, endpoint: str, params, plan) -> dict:
+        with self._lock:
+            entry = self.entries.get(statement)
+            if entry is None:
+                if len(self.entries) >= self.max_statements:
+                    # 满了淘汰总耗时最小的一条
+                    del self.entries[min(self.entries, key=lambda key: self.entries[key]['total_ms'])]
+                entry = self.entries[statement] = {
+                    'statement': statement, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'endpoints': Counter(), 'params': None, 'plan': None,
+                }
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['endpoints'][endpoint] += 1
+            entry['params'] = params
+            if plan is not None:
+                entry['plan'] = plan
+            return entry
+
+    def has_plan(self, statement: str) -> bool:
+        entry = self.entries.get(statement)
+        return entry is not None and entry['plan'] is not None
+
+    def reset(self) -> None:
+        with self._lock:
+            self.entries = {}
+            self.started_at = time.time()
+
+    def top(self, limit: int = 50) -> list[dict]:
+        """按总耗时降序的慢查询排行"""
+        with self._lock:
+            rows = [
+                {
+                    **entry,
+                    'avg_ms': entry['total_ms'] / entry['count'],
+                    'endpoints': entry['endpoints'].most_common(3),
+                }
+                for entry in self.entries.values()
+            ]
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows[:limit]
+
+
+def init_slow_query_log(app) -> None:
+    """在 create_app() 中调用：注册游标计时事件，每个请求开始时从设置快照同步阈值与采样比例"""
+    if not app.config.get('SLOW_QUERY_LOG_ENABLED', True):
+        return
+
+    store = SlowQueryStore()
+    app.extensions['slow_query'] = store
+    logger = app.logger
+    # 当前阈值（由请求钩子从设置快照同步；请求之外的语句沿用最近一次的值）
+    current = {'threshold_ms': 200.0, 'sample_rate': 1.0}
+    # EXPLAIN 在请求自己的连接上同步执行，只对明显超阈值的语句取计划（0 表示不取）
+    explain_factor = float(app.config.get('SLOW_QUERY_EXPLAIN_FACTOR', 2))
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_slow_query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_slow_query_start')
+        if not starts:
+            return
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+        if elapsed_ms < current['threshold_ms'] or random.random() >= current['sample_rate']:
+            return
+
+        key = fingerprint(statement)
+        endpoint = (request.endpoint or UNMATCHED_ENDPOINT) if has_request_context() else '<后台任务>'
+        # 同一语句只取一次执行计划，且只针对耗时达到阈值 explain_factor 倍的语句
+        plan = None
+        if (explain_factor > 0 and elapsed_ms >= current['threshold_ms'] * explain_factor
+                and not executemany and not store.has_plan(key)):
+            plan = explain_sqlite(conn, statement, parameters)
+        params = redact(parameters, executemany)
+        store.record(key, elapsed_ms, endpoint, params, plan)
+        logger.warning(f"慢查询 {elapsed_ms:.1f}ms [{endpoint}] {key[:STATEMENT_LOG_LENGTH]} 参数={params}")
+
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get('_slow_query_start') if conn is not None else None
+        if starts:
+            starts.pop()
+
+    # 监听挂在当前应用的引擎上（每个应用实例各自一套阈值与汇总）
+    from app import db
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    event.listen(engine, 'handle_error', handle_error)
+
+    @app.before_request
+    def sync_slow_query_settings():
+        from app.services.settings_service import SettingsService
+        try:
+            snapshot = SettingsService.get_snapshot()
+            current['threshold_ms'] = float(snapshot.get('slow_query_threshold_ms', 200))
+            current['sample_rate'] = float(snapshot.get('slow_query_sample_rate', 1.0))
+        except Exception as e:
+            # 设置表尚未建立（首次部署 / 迁移前）时保持当前阈值
+            db.session.rollback()
+            logger.debug(f"慢查询阈值同步失败，沿用当前值: {e}")
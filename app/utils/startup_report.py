@@ -0,0 +1,96 @@
+# 文件路径：app/utils/startup_report.py
+# 更新日期：2026-10-19
+# 功能说明：冷启动耗时报告（python run.py --startup-report），在全新子进程中以 -X importtime 执行 create_app()，汇总模块导入耗时排行、应用初始化与各预热步骤耗时，对照 worker 冷启动预算
+
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+# worker 回收后重新拉起的目标冷启动耗时
+STARTUP_BUDGET_MS = 300
+
+# 子进程：分别计时 "导入 app 包" 与 "create_app()"，结果以 JSON 打印到 stdout 最后一行
+_PROBE_SCRIPT = '''
+import json, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+warmup = app.extensions.get("warmup", {"steps": [], "total_ms": 0})
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "create_app_ms": (t2 - t1) * 1000, "warmup": warmup}))
+'''
+
+# import time:      self [us] |  cumulative | imported package
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """解析 -X importtime 输出：每个模块的自身耗时、累计耗时（微秒）与嵌套深度"""
+    modules = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({
+                'name': name,
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                'depth': (len(indent) - 1) // 2,
+            })
+    return modules
+
+
+def run_probe(project_root: str) -> tuple[dict, list[dict]]:
+    env = dict(os.environ, PYTHONPATH=project_root + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE_SCRIPT],
+        cwd=project_root, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else '子进程启动失败')
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    return timings, parse_importtime(completed.stderr)
+
+
+def print_startup_report(project_root: str, top: int = 25) -> int:
+    """打印报告；总耗时超出预算时返回 1（便于 CI 中作为检查项）"""
+    try:
+        timings, modules = run_probe(project_root)
+    except Exception as e:
+        print(f"启动耗时探测失败: {e}", file=sys.stderr)
+        return 2
+
+    total_ms = timings['import_ms'] + timings['create_app_ms']
+    import_total_ms = sum(m['self_us'] for m in modules) / 1000
+
+    # 按顶层包汇总自身耗时（flask / sqlalchemy / app ...）
+    by_package = defaultdict(int)
+    for module in modules:
+        by_package[module['name'].split('.')[0]] += module['self_us']
+
+    print("\n" + "=" * 70)
+    print("FFE 项目跟进系统 - 冷启动耗时报告")
+    print("=" * 70)
+    print(f"导入 app 包:      {timings['import_ms']:8.1f} ms")
+    print(f"create_app():     {timings['create_app_ms']:8.1f} ms（含其间的延迟导入）")
+    print(f"合计:             {total_ms:8.1f} ms   预算 {STARTUP_BUDGET_MS} ms  "
+          f"{'✓ 达标' if total_ms <= STARTUP_BUDGET_MS else '✗ 超出'}")
+    warmup = timings.get('warmup') or {'steps': [], 'total_ms': 0}
+    print(f"  其中预热:       {warmup['total_ms']:8.1f} ms")
+    for step in warmup['steps']:
+        print(f"    {step['elapsed_ms']:8.1f} ms  {step['name']}{'' if step['ok'] else '（失败）'}  {step['detail']}")
+    print(f"模块导入自身耗时合计: {import_total_ms:.1f} ms（{len(modules)} 个模块）")
+
+    print("\n按顶层包（自身耗时）:")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    print(f"\n累计耗时最高的模块（前 {top}）:")
+    for module in sorted(modules, key=lambda m: m['cumulative_us'], reverse=True)[:top]:
+        print(f"  {module['cumulative_us'] / 1000:8.1f} ms  {'  ' * module['depth']}{module['name']}")
+    print("=" * 70 + "\n")
+    return 0 if total_ms <= STARTUP_BUDGET_MS else 1
@@ -0,0 +1,50 @@
+# 文件路径：app/utils/template_cache.py
+# 更新日期：2026-10-19
+# 功能说明：Jinja2 模板编译缓存，配置 instance 目录下多进程共享的文件字节码缓存，生产环境关闭模板自动重载，预热阶段预编译 app/templates 下全部模板，新启动的 worker 首个请求即为稳态耗时
+
+import os
+import time
+from jinja2 import FileSystemBytecodeCache
+from app.utils.warmup import add_warmup_step
+
+TEMPLATE_EXTENSIONS = ('.html',)
+
+
+def precompile_templates(app) -> tuple[int, float]:
+    """
+    预编译全部模板并放入 Jinja 环境内存缓存（字节码同时写入文件缓存，供其他 worker 直接加载）
+    返回 (模板数, 耗时毫秒)；单个模板编译失败只记录警告，不阻止启动
+    """
+    env = app.jinja_env
+    started = time.perf_counter()
+    count = 0
+    for name in env.list_templates(extensions=[ext.lstrip('.') for ext in TEMPLATE_EXTENSIONS]):
+        try:
+            env.get_template(name)
+            count += 1
+        except Exception as e:
+            app.logger.warning(f"模板预编译失败: {name} ({e})")
+    return count, (time.perf_counter() - started) * 1000
+
+
+def init_template_cache(app) -> None:
+    """在 create_app() 中调用：字节码缓存 + 生产环境关闭自动重载 + 登记预编译（预热阶段执行）"""
+    env = app.jinja_env
+
+    if app.config.get('JINJA_BYTECODE_CACHE', True):
+        cache_dir = os.path.join(app.root_path, 'instance', 'jinja_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        env.bytecode_cache = FileSystemBytecodeCache(cache_dir, pattern='__jinja2_%s.cache')
+
+    # 生产环境模板只随发布变化，不再每次渲染检查文件 mtime
+    if app.config.get('ENV') == 'production':
+        app.config['TEMPLATES_AUTO_RELOAD'] = False
+        env.auto_reload = False
+
+    # 内存缓存需容纳全部模板，否则预编译的结果会被 LRU 淘汰
+    template_count = len(env.list_templates())
+    if env.cache is not None and getattr(env.cache, 'capacity', 0) < template_count:
+        env.cache = type(env.cache)(template_count * 2)
+
+    if app.config.get('TEMPLATE_PRECOMPILE', True):
+        add_warmup_step(app, '模板预编译', lambda: f'{precompile_templates(app)[0]} 个（auto_reload={env.auto_reload}）')
@@ -0,0 +1,213 @@
+# 文件路径：app/utils/tracing.py
+# 更新日期：2026-10-19
+# 功能说明：轻量请求链路追踪，为每个请求分配关联ID（X-Request-ID），按采样率记录路由 → 服务层 → 计算引擎 → 数据库语句的嵌套耗时区段，以 JSON Lines 写入旋转日志文件
+
+"""
+使用方式：
+- 函数：@traced('calc.kd_volume.batch')
+- 服务类：@trace_class 包装类上全部 @staticmethod，区段名为 "类名.方法名"；
+  每个请求都会调用的热路径方法（如设置快照）用 @untraced 排除，避免每条追踪都多一个无意义的区段
+- 代码块：with start_span('xxx', key=value): ...
+未被采样的请求（或请求上下文之外的调用，如 flask shell / 启动预热）直接调用原函数，只多一次 g 查找
+"""
+
+import functools
+import json
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.utils.log_queue import queued, rotating_file_handler
+from app.utils.session_epoch import session_user_id
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+# 只接受上游代理传入的合法关联ID，防止日志注入
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{8,64}$')
+STATEMENT_MAX_LENGTH = 300
+
+trace_logger = logging.getLogger('ffe.trace')
+
+
+class _Trace:
+    """单个请求的追踪上下文：已完成区段列表 + 当前打开的区段栈"""
+
+    __slots__ = ('trace_id', 'spans', 'stack', '_next_id')
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: list[dict] = []
+        self.stack: list[dict] = []
+        self._next_id = 0
+
+    def open(self, name: str, attrs: dict) -> dict:
+        self._next_id += 1
+        span = {
+            'trace_id': self.trace_id,
+            'span_id': self._next_id,
+            'parent_id': self.stack[-1]['span_id'] if self.stack else None,
+            'name': name,
+            'start': round(time.time(), 6),
+            '_t0': time.perf_counter(),
+        }
+        if attrs:
+            span['attrs'] = attrs
+        self.stack.append(span)
+        return span
+
+    def close(self, span: dict) -> None:
+        span['duration_ms'] = round((time.perf_counter() - span.pop('_t0')) * 1000, 3)
+        # 出栈到该区段为止（内层区段因异常未正常关闭时一并丢弃其栈位置）
+        while self.stack:
+            if self.stack.pop() is span:
+                break
+        self.spans.append(span)
+
+
+def current_request_id() -> str | None:
+    """当前请求的关联ID（请求上下文之外返回 None），供日志格式化等使用"""
+    return g.get('request_id') if has_request_context() else None
+
+
+def _current_trace() -> _Trace | None:
+    return g.get('_trace') if has_request_context() else None
+
+
+@contextmanager
+def start_span(name: str, **attrs):
+    trace = _current_trace()
+    if trace is None:
+        yield None
+        return
+    span = trace.open(name, attrs)
+    try:
+        yield span
+    except Exception as e:
+        span['error'] = type(e).__name__
+        raise
+    finally:
+        trace.close(span)
+
+
+def traced(name: str | None = None):
+    """函数装饰器：采样请求内记录一个区段，默认区段名为 模块名.函数名"""
+    def decorator(func):
+        span_name = name or f'{func.__module__.rsplit(".", 1)[-1]}.{func.__name__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_trace() is None:
+                return func(*args, **kwargs)
+            with start_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def untraced(func):
+    """标记函数不被 @trace_class 包装（写在 @staticmethod 之下）"""
+    func.__untraced__ = True
+    return func
+
+
+def trace_class(cls):
+    """类装饰器：为服务类的全部 @staticmethod 加上 traced("类名.方法名")，@untraced 标记的除外"""
+    for attr, value in list(vars(cls).items()):
+        if isinstance(value, staticmethod) and not getattr(value.__func__, '__untraced__', False):
+            setattr(cls, attr, staticmethod(traced(f'{cls.__name__}.{attr}')(value.__func__)))
+    return cls
+
+
+# ──────────────────────────────────────────────
+# 数据库语句区段
+# ──────────────────────────────────────────────
+
+def _on_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current_trace()
+    if trace is not None:
+        span = trace.open('db', {'statement': ' '.join(statement.split())[:STATEMENT_MAX_LENGTH], 'executemany': executemany})
+        conn.info.setdefault('_trace_spans', []).append(span)
+
+
+def _on_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get('_trace_spans')
+    trace = _current_trace()
+    if spans and trace is not None:
+        trace.close(spans.pop())
+
+
+def _on_handle_error(exception_context):
+    conn = exception_context.connection
+    spans = conn.info.get('_trace_spans') if conn is not None else None
+    trace = _current_trace()
+    if spans and trace is not None:
+        span = spans.pop()
+        span['error'] = type(exception_context.original_exception).__name__
+        trace.close(span)
+
+
+def init_tracing(app) -> None:
+    """
+    在 create_app() 中调用：
+    - 每个请求生成（或沿用上游合法的）X-Request-ID，写入 g.request_id 并回传响应头
+    - 按 TRACING_SAMPLE_RATE 采样，被采样请求的全部区段在请求结束时写入 TRACING_FILE（JSON Lines，按大小轮转）
+    """
+    if not app.config.get('TRACING_ENABLED', True):
+        return
+
+    sample_rate = float(app.config.get('TRACING_SAMPLE_RATE', 0.1))
+    if sample_rate > 0 and not trace_logger.handlers:
+        trace_file = app.config.get('TRACING_FILE') or os.path.join('logs', 'trace.jsonl')
+        handler = rotating_file_handler(
+            trace_file,
+            max_bytes=int(app.config.get('TRACING_MAX_BYTES', 20 * 1024 * 1024)),
+            backup_count=int(app.config.get('TRACING_BACKUP_COUNT', 5)),
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        # 区段在请求结束时批量写出，经队列交给后台线程，不阻塞请求线程
+        trace_logger.addHandler(queued(handler) if app.config.get('LOG_QUEUE', True) else handler)
+        trace_logger.setLevel(logging.INFO)
+        trace_logger.propagate = False
+
+    if not event.contains(Engine, 'before_cursor_execute', _on_before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _on_before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _on_after_cursor_execute)
+        event.listen(Engine, 'handle_error', _on_handle_error)
+
+    @app.before_request
+    def start_trace():
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = incoming if _REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+        if sample_rate > 0 and random.random() < sample_rate:
+            trace = g._trace = _Trace(g.request_id)
+            g._trace_root = trace.open(f'{request.method} {request.endpoint or request.path}', {'path': request.path})
+
+    @app.after_request
+    def add_request_id_header(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        root = g.get('_trace_root')
+        if root is not None:
+            root['attrs']['status'] = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_trace(exc):
+        trace = g.pop('_trace', None)
+        root = g.pop('_trace_root', None)
+        if trace is None or root is None:
+            return
+        user_id = session_user_id()
+        if user_id:
+            root['attrs']['user_id'] = user_id
+        if exc is not None:
+            root['error'] = type(exc).__name__
+        trace.close(root)
+        for span in trace.spans:
+            trace_logger.info(json.dumps(span, ensure_ascii=False, default=str))
@@ -0,0 +1,103 @@
+# 文件路径：app/utils/warmup.py
+# 更新日期：2026-10-19
+# 功能说明：接收流量前的预热阶段，create_app() 末尾依次执行各模块登记的预热步骤（数据库连接池、系统设置快照、模板预编译、静态资源清单、CSS 合并包、KD 规则表、路由匹配表），逐项计时并汇总到日志，避免发布后的首个请求承担 1~2 秒的延迟初始化
+
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+
+def add_warmup_step(app, name: str, func, required: bool = False) -> None:
+    """
+    登记预热步骤：func() 返回简短说明（可为 None）
+    required=True 的步骤是功能必需的构建（静态资源清单等），始终执行且失败即中止启动；
+    其余步骤只为缩短首个请求耗时，WARMUP_ENABLED=false 时跳过，失败只记录警告
+    """
+    app.extensions.setdefault('warmup_steps', []).append((name, func, required))
+
+
+def run_warmup(app) -> dict:
+    """按登记顺序执行全部预热步骤，返回 {'steps': [...], 'total_ms': 合计}"""
+    enabled = app.config.get('WARMUP_ENABLED', True)
+    steps = []
+    started = time.perf_counter()
+    for name, func, required in app.extensions.get('warmup_steps', []):
+        if not required and not enabled:
+            continue
+        step_started = time.perf_counter()
+        try:
+            detail, ok = func(), True
+        except Exception as e:
+            if required:
+                raise
+            detail, ok = f'{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ""}', False
+        steps.append({
+            'name': name,
+            'elapsed_ms': (time.perf_counter() - step_started) * 1000,
+            'ok': ok,
+            'detail': detail or '',
+        })
+    return {'steps': steps, 'total_ms': (time.perf_counter() - started) * 1000}
+
+
+# ──────────────────────────────────────────────
+# 内置预热步骤
+# ──────────────────────────────────────────────
+
+def warm_database(app) -> str:
+    """配置 ORM 映射器并取出一个连接执行 SELECT 1（gunicorn worker fork 后也调用，为子进程建立自己的连接）"""
+    from app import db
+    configure_mappers()
+    with app.app_context():
+        db.session.execute(text('SELECT 1'))
+        db.session.remove()
+        return db.engine.url.get_backend_name()
+
+
+def warm_settings(app) -> str:
+    from app import db
+    from app.services.settings_service import SettingsService
+    with app.app_context():
+        try:
+            return f'{len(SettingsService.get_snapshot())} 项'
+        finally:
+            # 设置表尚未建立时查询失败，归还连接避免遗留失败事务
+            db.session.remove()
+
+
+def warm_kd_tables() -> str:
+    """按各品类默认尺寸预先计算全部包装方式 / 压薄组合，填充 KD 计算缓存"""
+    from app.services.calc import volume_kd
+    count = 0
+    for category in volume_kd.CATEGORIES:
+        for packing in volume_kd.PACKING_TYPES:
+            for kd_level in volume_kd.KD_LEVELS:
+                volume_kd.calculate(category, packing=packing, kd_level=kd_level)
+                count += 1
+    return f'{count} 个组合'
+
+
+def warm_url_map(app) -> str:
+    # werkzeug 在首次匹配时才编译路由状态机
+    app.url_map.update()
+    return f'{len(list(app.url_map.iter_rules()))} 条路由'
+
+
+def init_warmup(app) -> dict:
+    """在 create_app() 最后调用：登记内置步骤后执行全部预热，结果保存在 app.extensions['warmup']"""
+    add_warmup_step(app, '数据库连接', lambda: warm_database(app))
+    add_warmup_step(app, '系统设置快照', lambda: warm_settings(app))
+    add_warmup_step(app, 'KD 规则表', warm_kd_tables)
+    add_warmup_step(app, '路由匹配表', lambda: warm_url_map(app))
+
+    report = run_warmup(app)
+    app.extensions['warmup'] = report
+
+    summary = '，'.join(
+        f"{step['name']} {step['elapsed_ms']:.1f}ms{'' if step['ok'] else '(失败)'}" for step in report['steps']
+    )
+    app.logger.info(f"预热完成，合计 {report['total_ms']:.1f} ms：{summary}")
+    for step in report['steps']:
+        if not step['ok']:
+            app.logger.warning(f"预热步骤失败（首个请求将延迟初始化）：{step['name']} - {step['detail']}")
+    return report
@@ -0,0 +1,105 @@
+# 文件路径：app/utils/wsgi_server.py
+# 更新日期：2026-10-19
+# 功能说明：生产 WSGI 启动器（python run.py --serve），以编程方式运行 gunicorn：主进程预加载应用后 fork worker（代码与预热缓存写时复制共享），按 CPU 数自动确定 worker / 线程数，处理 N 个请求后回收 worker，SIGHUP 平滑重启
+
+"""
+信号说明（gunicorn 主进程）：
+- HUP  ：重新读取配置并平滑替换全部 worker（旧 worker 处理完手头请求再退出），用于清空进程内缓存、应用新的系统设置
+- USR2 ：启动新的主进程（重新导入代码），确认无误后向旧主进程发送 TERM —— 代码升级时使用（preload 模式下 HUP 不会重新导入代码）
+- TERM / INT：优雅 / 立即停止
+"""
+
+import os
+from app.utils.optional_deps import is_available
+from app.utils.warmup import warm_database
+
+
+def cpu_count() -> int:
+    """当前进程可用的 CPU 数（容器内以 CPU 亲和性为准）"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def gunicorn_options(app, host: str, port: int) -> dict:
+    """根据配置与 CPU 数生成 gunicorn 参数（配置为 0 表示自动）"""
+    cpus = cpu_count()
+    config = app.config
+    # gthread：每个 worker 多线程处理 I/O 等待（数据库 / 文件），worker 数取 CPU + 1 即可占满 CPU
+    workers = int(config.get('WSGI_WORKERS') or 0) or max(2, cpus + 1)
+    threads = int(config.get('WSGI_THREADS') or 0) or 4
+    return {
+        'bind': f'{host}:{port}',
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'max_requests': int(config.get('WSGI_MAX_REQUESTS', 2000)),
+        # 回收时间点加随机抖动，避免所有 worker 同时重启
+        'max_requests_jitter': int(config.get('WSGI_MAX_REQUESTS_JITTER', 200)),
+        'timeout': int(config.get('WSGI_TIMEOUT', 120)),
+        'graceful_timeout': int(config.get('WSGI_GRACEFUL_TIMEOUT', 30)),
+        'keepalive': int(config.get('WSGI_KEEPALIVE', 5)),
+        'accesslog': config.get('WSGI_ACCESS_LOG') or None,
+        'errorlog': '-',
+        'proc_name': 'ffe-tracker',
+    }
+
+
+def _dispose_engines(app, close: bool) -> None:
+    from app import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+
+def serve(app, host: str, port: int) -> int:
+    """启动 gunicorn（阻塞直到主进程退出），返回进程退出码"""
+    if not is_available('gunicorn'):
+        print("未安装 gunicorn，无法启动生产服务：pip install gunicorn（仅支持 Linux / macOS）")
+        return 1
+    if app.debug:
+        print("【致命错误】生产服务禁止开启 debug 模式！请设置 FLASK_DEBUG=false")
+        return 1
+
+    from gunicorn.app.base import BaseApplication
+
+    options = gunicorn_options(app, host, port)
+
+    class FFEApplication(BaseApplication):
+        """直接复用已创建的 app 对象：preload_app 下主进程只执行一次 create_app()"""
+
+        def load_config(self):
+            for key, value in options.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+            self.cfg.set('when_ready', when_ready)
+            self.cfg.set('post_fork', post_fork)
+            self.cfg.set('on_reload', on_reload)
+
+        def load(self):
+            return app
+
+    def when_ready(server):
+        # fork 之前关闭主进程在预热阶段打开的数据库连接，避免子进程共享同一套连接
+        _dispose_engines(app, close=True)
+        server.log.info(
+            f"FFE 生产服务就绪：{options['bind']}，{options['workers']} 个 worker × {options['threads']} 线程，"
+            f"每 worker 处理约 {options['max_requests']} 个请求后回收"
+        )
+
+    def post_fork(server, worker):
+        # 连接池对象随 fork 复制而来：只丢弃引用不关闭连接（close=False），随后为本 worker 预先建立连接
+        _dispose_engines(app, close=False)
+        if app.config.get('WARMUP_ENABLED', True):
+            try:
+                warm_database(app)
+            except Exception as e:
+                server.log.warning(f"worker {worker.pid} 数据库预热失败: {e}")
+
+    def on_reload(server):
+        server.log.info("收到 SIGHUP：重新读取配置并平滑替换 worker")
+
+    FFEApplication().run()
+    return 0
@@ -74,7 +74,10 @@ class BaseConfig:
     SESSION_COOKIE_NAME = 'ffe_session'
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
-    PERMANENT_SESSION_LIFETIME = timedelta(days=14)
+    PERMANENT_SESSION_LIFETIME = timedelta(days=14)    # 会话绝对有效期；空闲超时由系统设置 session_timeout_minutes 控制
+    SESSION_IDLE_TIMEOUT_ENABLED = os.environ.get('SESSION_IDLE_TIMEOUT_ENABLED', 'true').lower() in ('true', '1', 'yes', 'on')
+    SESSION_ACTIVITY_REFRESH_SECONDS = int(os.environ.get('SESSION_ACTIVITY_REFRESH_SECONDS', 60))   # 会话内活动时间刷新间隔
+    LAST_SEEN_PERSIST_SECONDS = int(os.environ.get('LAST_SEEN_PERSIST_SECONDS', 300))                # User.last_seen_at 写库间隔
 
     # =============================================
     # 分页 & 业务通用
@@ -84,6 +87,105 @@ class BaseConfig:
     MAX_PROJECT_NAME_LENGTH = 120
     MAX_USERNAME_LENGTH = 64
 
+    # 批量导入用户：每批插入行数 / 并行哈希线程数（0 表示按 CPU 核数自动）
+    USER_IMPORT_BATCH_SIZE = 500
+    USER_IMPORT_HASH_WORKERS = int(os.environ.get('USER_IMPORT_HASH_WORKERS', 0))
+
+    # FFE 清单导入：每块校验 / KD 计算的行数
+    FFE_IMPORT_CHUNK_SIZE = int(os.environ.get('FFE_IMPORT_CHUNK_SIZE', 500))
+
+    # =============================================
+    # 响应压缩（gzip，按 Accept-Encoding 协商）
+    # =============================================
+    GZIP_ENABLED = os.environ.get('GZIP_ENABLED', 'true').lower() in ('true', '1', 'yes', 'on')
+    GZIP_BLUEPRINTS = ('export', 'calculator')     # 仅对导出与计算器接口生效
+    GZIP_MIN_SIZE = int(os.environ.get('GZIP_MIN_SIZE', 1024))              # 小于该字节数不压缩
+    GZIP_COMPRESS_LEVEL = int(os.environ.get('GZIP_COMPRESS_LEVEL', 6))     # 1（最快）~ 9（最小）
+
+    # =============================================
+    # 日志（非调试模式写 logs/ffe.log：队列 + 后台写入线程，多进程安全轮转）
+    # =============================================
+    LOG_QUEUE = os.environ.get('LOG_QUEUE', 'true').lower() in ('true', '1', 'yes', 'on')
+    LOG_JSON = os.environ.get('LOG_JSON', 'false').lower() in ('true', '1', 'yes', 'on')   # JSON Lines（含请求ID / 用户ID / 耗时）
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+
+    # =============================================
+    # 请求性能指标（进程内直方图，后台 /admin/metrics 查看）
+    # =============================================
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('true', '1', 'yes', 'on')
+    # Server-Timing 响应头（仅对拥有性能诊断权限的登录用户输出）
+    METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'true').lower() in ('true', '1', 'yes', 'on')
+
+    # Prometheus 抓取端点 /metrics（各 worker 定期写出 app/instance/metrics/<pid>-<启动时间>.json，抓取时合并）
+    PROMETHEUS_ENABLED = os.environ.get('PROMETHEUS_ENABLED', 'true').lower() in ('true', '1', 'yes', 'on')
+    PROMETHEUS_FLUSH_INTERVAL = float(os.environ.get('PROMETHEUS_FLUSH_INTERVAL', 5))   # 秒
+    PROMETHEUS_TOKEN = os.environ.get('PROMETHEUS_TOKEN')   # 设置后抓取须带 Authorization: Bearer <token>
+    # 免令牌抓取的来源地址（逗号分隔，如 Prometheus 所在主机）
+    PROMETHEUS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('PROMETHEUS_ALLOWED_IPS', '').split(',') if ip.strip()]
+    # 未设置令牌、来源也不在白名单时是否放行（生产环境默认拒绝）
+    PROMETHEUS_PUBLIC = os.environ.get('PROMETHEUS_PUBLIC', 'true').lower() in ('true', '1', 'yes', 'on')
+
+    # 按需请求采样分析（后台 /admin/profiler 开启，折叠栈写入 app/instance/profiles）
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'true').lower() in ('true', '1', 'yes', 'on')
+    PROFILER_INTERVAL_MS = int(os.environ.get('PROFILER_INTERVAL_MS', 5))     # 采样间隔
+    PROFILER_MAX_FILES = int(os.environ.get('PROFILER_MAX_FILES', 200))       # 最多保留的结果文件数
+
+    # 请求链路追踪（X-Request-ID 关联ID + 服务层 / 数据库区段，JSON Lines 写入 logs/trace.jsonl）
+    TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'true').lower() in ('true', '1', 'yes', 'on')
+    TRACING_SAMPLE_RATE = float(os.environ.get('TRACING_SAMPLE_RATE', 0.1))   # 0 关闭记录（仍分配关联ID），1 全部记录
+    TRACING_FILE = os.environ.get('TRACING_FILE', os.path.join('logs', 'trace.jsonl'))
+    TRACING_MAX_BYTES = int(os.environ.get('TRACING_MAX_BYTES', 20 * 1024 * 1024))
+    TRACING_BACKUP_COUNT = int(os.environ.get('TRACING_BACKUP_COUNT', 5))
+
+    # =============================================
+    # 模板编译缓存（字节码文件缓存在 app/instance/jinja_cache，多 worker 共享）
+    # =============================================
+    JINJA_BYTECODE_CACHE = os.environ.get('JINJA_BYTECODE_CACHE', 'true').lower() in ('true', '1', 'yes', 'on')
+    TEMPLATE_PRECOMPILE = os.environ.get('TEMPLATE_PRECOMPILE', 'true').lower() in ('true', '1', 'yes', 'on')
+    # 启动预热（数据库连接、设置快照、KD 规则表等，静态资源清单 / CSS 合并包始终构建）
+    WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', 'true').lower() in ('true', '1', 'yes', 'on')
+
+    # 登录限流（令牌桶：burst 为可连续尝试次数，per_minute 为每分钟回填次数）
+    LOGIN_RATE_LIMIT_ENABLED = os.environ.get('LOGIN_RATE_LIMIT_ENABLED', 'true').lower() in ('true', '1', 'yes', 'on')
+    LOGIN_RATE_LIMIT_STORAGE = os.environ.get('LOGIN_RATE_LIMIT_STORAGE', 'memory')    # memory / sqlite（多 worker 共享）
+    LOGIN_RATE_IP_BURST = int(os.environ.get('LOGIN_RATE_IP_BURST', 10))
+    LOGIN_RATE_IP_PER_MINUTE = int(os.environ.get('LOGIN_RATE_IP_PER_MINUTE', 10))
+    LOGIN_RATE_USER_BURST = int(os.environ.get('LOGIN_RATE_USER_BURST', 5))
+    LOGIN_RATE_USER_PER_MINUTE = int(os.environ.get('LOGIN_RATE_USER_PER_MINUTE', 5))
+    # 反向代理（nginx / 负载均衡）层数：> 0 时按 X-Forwarded-For / X-Forwarded-Proto 还原客户端地址，
+    # 否则所有请求的 remote_addr 都是代理地址，登录限流的 IP 桶会变成全站共用一个
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+
+    # 站内通知：扇出写入每批行数 / 长轮询最长挂起秒数 / 跨 worker 变更检查间隔 / 每 worker 同时挂起的长轮询上限（0 表示线程数的一半）
+    NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 500))
+    NOTIFICATION_LONG_POLL_SECONDS = int(os.environ.get('NOTIFICATION_LONG_POLL_SECONDS', 25))
+    NOTIFICATION_FALLBACK_SECONDS = float(os.environ.get('NOTIFICATION_FALLBACK_SECONDS', 3))
+    NOTIFICATION_MAX_WAITERS = int(os.environ.get('NOTIFICATION_MAX_WAITERS', 0))
+
+    # 就绪探针 /readyz 结果缓存秒数（负载均衡每秒探测时不必每次查库）
+    READINESS_CACHE_SECONDS = float(os.environ.get('READINESS_CACHE_SECONDS', 2))
+
+    # 生产 WSGI 服务（python run.py --serve，gunicorn gthread；0 表示按 CPU 数自动确定）
+    WSGI_WORKERS = int(os.environ.get('WSGI_WORKERS', 0))                    # 默认 CPU 数 + 1（至少 2）
+    WSGI_THREADS = int(os.environ.get('WSGI_THREADS', 0))                    # 默认每 worker 4 线程
+    WSGI_MAX_REQUESTS = int(os.environ.get('WSGI_MAX_REQUESTS', 2000))       # 处理多少请求后回收 worker
+    WSGI_MAX_REQUESTS_JITTER = int(os.environ.get('WSGI_MAX_REQUESTS_JITTER', 200))
+    WSGI_TIMEOUT = int(os.environ.get('WSGI_TIMEOUT', 120))
+    WSGI_GRACEFUL_TIMEOUT = int(os.environ.get('WSGI_GRACEFUL_TIMEOUT', 30))
+    WSGI_KEEPALIVE = int(os.environ.get('WSGI_KEEPALIVE', 5))
+    WSGI_ACCESS_LOG = os.environ.get('WSGI_ACCESS_LOG')                       # 访问日志路径，'-' 输出到标准输出，默认不记录
+
+    # 慢查询日志（阈值与记录比例在后台系统设置中调整，此处只控制总开关）
+    SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', 'true').lower() in ('true', '1', 'yes', 'on')
+    # 耗时达到慢查询阈值的多少倍才附带执行计划（EXPLAIN 占用请求自身的数据库连接，0 表示不取）
+    SLOW_QUERY_EXPLAIN_FACTOR = float(os.environ.get('SLOW_QUERY_EXPLAIN_FACTOR', 2))
+    # 系统设置进程内快照有效期（秒）：其他 worker 保存的设置最迟在此时间后生效
+    SETTINGS_SNAPSHOT_TTL = int(os.environ.get('SETTINGS_SNAPSHOT_TTL', 30))
+
+    # 页面片段缓存（进程内 LRU，按用户保存一份，键含数据版本号）
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 1024))
+
     # =============================================
     # 其他 Flask 推荐配置
     # =============================================
@@ -116,6 +218,9 @@ class ProductionConfig(BaseConfig):
     PREFERRED_URL_SCHEME = 'https'
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = 86400
+    TEMPLATES_AUTO_RELOAD = False     # 模板只随发布变化，不检查文件修改时间
+    PROMETHEUS_PUBLIC = os.environ.get('PROMETHEUS_PUBLIC', 'false').lower() in ('true', '1', 'yes', 'on')
+    METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'false').lower() in ('true', '1', 'yes', 'on')
 
     if BaseConfig._using_random_key:
         raise RuntimeError(
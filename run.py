@@ -4,7 +4,8 @@
 run.py - FFE 项目跟进系统启动入口
 
 开发环境直接运行：python run.py
-生产环境强烈推荐使用 WSGI 服务器（如 gunicorn / uvicorn）
+冷启动耗时报告：python run.py --startup-report（-X importtime 子进程中执行 create_app，不启动服务）
+生产环境：python run.py --serve（gunicorn 多 worker，预加载 + 按 CPU 自动确定 worker 数 + 定期回收，SIGHUP 平滑重启）
 
 环境变量支持：
 - FLASK_ENV          : development | production (默认 development)
@@ -23,6 +24,13 @@ from dotenv import load_dotenv
 
 load_dotenv()  # 加载 .env 文件（如果有）
 
+# ──────────────────────────────────────────────
+# 冷启动耗时报告（须在 create_app 之前处理，避免本进程的初始化干扰测量）
+# ──────────────────────────────────────────────
+if '--startup-report' in sys.argv:
+    from app.utils.startup_report import print_startup_report
+    sys.exit(print_startup_report(os.path.dirname(os.path.abspath(__file__))))
+
 # ──────────────────────────────────────────────
 # 环境变量读取
 # ──────────────────────────────────────────────
@@ -40,6 +48,11 @@ app = create_app()
 # 主入口保护
 # ──────────────────────────────────────────────
 if __name__ == '__main__':
+    # ── 生产服务（gunicorn，非交互，不执行下面的开发服务器流程） ──
+    if '--serve' in sys.argv:
+        from app.utils.wsgi_server import serve
+        sys.exit(serve(app, host=HOST, port=PORT))
+
     # ── 数据库初始化（交互式安全版） ────────────────────────────────────────
     db_path = os.path.join(app.instance_path, 'site.db')
     perform_init = False
@@ -110,9 +123,8 @@ if __name__ == '__main__':
     # ── 生产部署推荐 ────────────────────────────────────────────
     if ENV == 'production' or not DEBUG:
         print("生产环境推荐启动命令：")
-        print("  gunicorn -w 4 -b 0.0.0.0:5000 --timeout 120 run:app")
-        print("或 uvicorn：")
-        print("  uvicorn run:app --host 0.0.0.0 --port 5000 --workers 4")
+        print("  FLASK_ENV=production python run.py --serve")
+        print("  （gunicorn 预加载 + 自动 worker 数 + 定期回收；kill -HUP <主进程> 平滑重启）")
         print("-"*70 + "\n")
 
     # ── 实际启动 ─────────────────────────────────────────────────
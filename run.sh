@@ -49,6 +49,7 @@ show_help() {
     echo "  ./run.sh 3              安装/更新依赖"
     echo "  ./run.sh 4              初始化数据库（建表 + admin）"
     echo "  ./run.sh 5              清理所有临时文件 & 缓存"
+    echo "  ./run.sh 6              启动生产服务（gunicorn 多 worker）"
     echo "  ./run.sh 0 / --help     退出 / 显示帮助"
     echo
     exit 0
@@ -105,6 +106,25 @@ run_app() {
     exec flask run --host=0.0.0.0 --port "${APP_PORT}"
 }
 
+# ───────────────────────────────────────────────
+# 启动生产服务（gunicorn，预加载 + 自动 worker 数 + 定期回收）
+# ───────────────────────────────────────────────
+run_serve() {
+    echo -e "\n${GREEN}>>> 启动 FFE 项目跟进系统 (生产模式)${NC}\n"
+
+    mkdir -p instance persistent_uploads
+
+    echo "  监听地址 : http://0.0.0.0:${APP_PORT}"
+    echo "  平滑重启 : kill -HUP <gunicorn 主进程号>"
+    echo
+
+    export FLASK_ENV=production
+    export FLASK_DEBUG=0
+    export FLASK_PORT="${APP_PORT}"
+
+    exec python run.py --serve
+}
+
 # ───────────────────────────────────────────────
 # 生成 code2ai 源码审查文件（原选项 4 → 新选项 2）
 # ───────────────────────────────────────────────
@@ -217,6 +237,7 @@ show_menu() {
     echo -e "  ${BLUE}3${NC} → 安装/更新依赖"
     echo -e "  ${BLUE}4${NC} → 初始化数据库（建表 + admin）"
     echo -e "  ${BLUE}5${NC} → 清理所有临时文件 & 缓存"
+    echo -e "  ${BLUE}6${NC} → 启动生产服务（gunicorn）"
     echo -e "  ${BLUE}0${NC} → 退出脚本"
     echo
     echo -e "  ${BLUE}h${NC} → 显示帮助"
@@ -233,6 +254,7 @@ if [[ $# -ge 1 ]]; then
         3) run_update_deps ;;
         4) run_init_db ;;
         5) clean_all_temp ;;
+        6) prepare_venv; run_serve ;;
         0|-h|--help) show_help ;;
         *) echo -e "${RED}未知选项: $1${NC}"; show_help ;;
     esac
@@ -257,7 +279,7 @@ while true; do
         break
     fi
 
-    echo -n "请输入选项 (0/1/2/3/4/5/h) 并按回车: "
+    echo -n "请输入选项 (0/1/2/3/4/5/6/h) 并按回车: "
     read -r raw_input
 
     choice=$(echo "$raw_input" | sed 's/[^0-9a-zA-ZhH]//g' | head -c 1 | tr '[:upper:]' '[:lower:]')
@@ -269,6 +291,7 @@ while true; do
         3) echo "→ 更新依赖"; run_update_deps ;;
         4) echo "→ 初始化数据库"; run_init_db ;;
         5) echo "→ 清理所有临时文件 & 缓存"; clean_all_temp ;;
+        6) echo "→ 启动生产服务"; run_serve; break ;;
         h) show_help ;;
         *) echo -e "${YELLOW}无效选项 '$choice'，请重新输入${NC}" ;;
     esac